@@ -0,0 +1,85 @@
+# agents/latency.py
+"""
+Job-start latency histogram for the shark agent.
+
+Each LiveKit job runs in its own process, so observations are appended as JSON lines to
+SHARK_LATENCY_LOG (when set) and aggregated offline:
+
+    python -m agents.latency data/agent_latency.jsonl
+"""
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+
+# Upper bounds in ms; last bucket is +inf
+BUCKETS_MS = (25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+_write_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms: Iterable[float] = BUCKETS_MS):
+        self.bounds = tuple(buckets_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.samples: List[float] = []
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.samples.append(ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def render(self) -> str:
+        lines = []
+        total = max(sum(self.counts), 1)
+        labels = [f"<= {b:g}ms" for b in self.bounds] + [f"> {self.bounds[-1]:g}ms"]
+        for label, count in zip(labels, self.counts):
+            lines.append(f"{label:>12} {count:6d} {'#' * round(40 * count / total)}")
+        for q in (0.5, 0.95, 0.99):
+            value = self.quantile(q)
+            lines.append(f"p{int(q * 100):<3} {value:.1f}ms" if value is not None else f"p{int(q * 100)} n/a")
+        return "\n".join(lines)
+
+
+class JobTimer:
+    """Marks phases of a job start; elapsed times are relative to construction."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        self.phases[phase] = round((time.perf_counter() - self.started) * 1000, 1)
+
+    def record(self, **fields) -> None:
+        entry = {"ts": time.time(), "pid": os.getpid(), **fields, "phases_ms": self.phases}
+        print(f"[shark_agent] job start {json.dumps(entry)}")
+        path = os.getenv("SHARK_LATENCY_LOG")
+        if not path:
+            return
+        with _write_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def load_histogram(path: str, phase: str = "session_started") -> LatencyHistogram:
+    hist = LatencyHistogram()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            value = json.loads(line).get("phases_ms", {}).get(phase)
+            if value is not None:
+                hist.observe(value)
+    return hist
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m agents.latency <latency.jsonl> [phase]")
+    print(load_histogram(sys.argv[1], *(sys.argv[2:3] or [])).render())
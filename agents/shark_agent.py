@@ -1,11 +1,126 @@
 # agents/shark_agent.py
-import os, json, pathlib
+# Run from the repo root: python -m agents.shark_agent dev
+import os, json, pathlib, importlib, asyncio, time
 from dotenv import load_dotenv
-from livekit.agents import JobContext, WorkerOptions, cli
+from livekit.agents import AgentServer, JobContext, JobProcess, WorkerOptions, cli, function_tool
 from livekit.agents import voice
 from livekit.plugins import google
 
+try:
+    import psutil  # installed with livekit-agents
+except ImportError:  # optional: load is then the job count alone
+    psutil = None
+
+from agents.latency import JobTimer
+from app.services.persona_prompts import PERSONA_BULLETS, build_persona_bundle
+from app.services.session_instructions import resolve_instructions
+from app.services.slide_index import SlideIndex, load_slide_index
+
+ENV_PATH = pathlib.Path(__file__).resolve().parents[1] / ".env"
+
+# Load-based job acceptance: stop taking rooms once CPU or the job count is near capacity
+MAX_JOBS_PER_WORKER = int(os.getenv("SHARK_MAX_JOBS", "8"))
+LOAD_THRESHOLD = float(os.getenv("SHARK_LOAD_THRESHOLD", "0.75"))
+
+# Appended to the instructions when the deck's slide index loaded; the deck text itself stays out
+DECK_TOOL_HINT = (
+    "The founder's deck is searchable: call deck_lookup for a slide's exact wording or numbers "
+    "instead of guessing or asking the founder to repeat them."
+)
+
+
+def _default_model_factory(*, voice_name: str, instructions: str):
+    http_options = None
+    base_url = os.getenv("SHARK_REALTIME_BASE_URL")  # local stand-in for latency measurements
+    if base_url:
+        from google.genai import types
+        http_options = types.HttpOptions(base_url=base_url)
+    return google.realtime.RealtimeModel(
+        model=os.getenv("SHARK_REALTIME_MODEL", "gemini-live-2.5-flash-preview"),
+        voice=voice_name,
+        temperature=float(os.getenv("SHARK_TEMPERATURE", "0.8")),
+        instructions=instructions,
+        **({"http_options": http_options} if http_options else {}),
+    )
+
+
+def _load_model_factory():
+    # SHARK_MODEL_FACTORY="package.module:callable" swaps in e.g. a fake model for benchmarks
+    # (bench.fake_realtime:make_model; python -m bench.agent_start drives job starts with it)
+    spec = os.getenv("SHARK_MODEL_FACTORY")
+    if not spec:
+        return _default_model_factory
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def prewarm(proc: JobProcess):
+    """Runs once per job process before any job is assigned to it."""
+    load_dotenv(ENV_PATH)
+    proc.userdata["persona_defaults"] = build_persona_bundle(None)
+    proc.userdata["model_factory"] = _load_model_factory()
+
+
+def worker_load(server: AgentServer) -> float:
+    # cpu_percent(None) is non-blocking: utilisation since the previous call, i.e. averaged over
+    # the worker's load-reporting interval
+    cpu = psutil.cpu_percent(interval=None) / 100 if psutil is not None else 0.0
+    jobs = len(server.active_jobs) / max(MAX_JOBS_PER_WORKER, 1)
+    return max(cpu, jobs)
+
+
+async def _resolve_instructions(md: dict, persona: str, persona_defaults: dict) -> str:
+    # Token metadata carries a short key; the text lives in Redis (see boardroom session endpoint)
+    key = md.get("instructionsKey")
+    if key:
+        try:
+            text = await resolve_instructions(key)
+            if text:
+                return text
+        except Exception as exc:
+            print(f"[shark_agent] instructions lookup failed for {key}: {exc}")
+    # Local fallback: inlined text (older tokens / Redis outage), else the generic persona prompt
+    if md.get("instructions"):
+        return md["instructions"]
+    if persona in PERSONA_BULLETS:
+        return persona_defaults[persona]
+    return "You are a helpful assistant."
+
+
+async def _load_index(deck_id: str | None) -> SlideIndex | None:
+    if not deck_id:
+        return None
+    try:
+        return await load_slide_index(deck_id)
+    except Exception as exc:
+        print(f"[shark_agent] slide index load failed for {deck_id}: {exc}")
+        return None
+
+
+def _deck_lookup_tool(index: SlideIndex, deck_id: str):
+    @function_tool
+    async def deck_lookup(query: str = "", slide: int = 0) -> str:
+        """Look up what the founder's pitch deck actually says.
+
+        Args:
+            query: Words to search the deck for, e.g. "churn", "pricing tiers", "CAC payback".
+            slide: A 1-based slide number to read in full; leave 0 to search the whole deck.
+        """
+        started = time.perf_counter()
+        answer = index.lookup(query, slide)
+        print(f"[shark_agent] deck_lookup {deck_id} slide={slide} query={query!r}: "
+              f"{(time.perf_counter() - started) * 1000:.2f}ms")
+        return answer
+
+    return deck_lookup
+
+
 async def entrypoint(ctx: JobContext):
+    timer = JobTimer()
+    userdata = ctx.proc.userdata
+    if "persona_defaults" not in userdata:  # prewarm skipped (e.g. console mode)
+        prewarm(ctx.proc)
+
     md = {}
     if ctx.job and ctx.job.metadata:
         try:
@@ -14,24 +129,36 @@ async def entrypoint(ctx: JobContext):
             pass
 
     persona = md.get("persona", "mark")
-    instructions = md.get("instructions", "You are a helpful assistant.")
+    deck_id = md.get("deckId")
+    instructions, index = await asyncio.gather(
+        _resolve_instructions(md, persona, userdata["persona_defaults"]),
+        _load_index(deck_id),
+    )
+    tools = []
+    if index is not None:
+        instructions = f"{instructions}\n{DECK_TOOL_HINT}"
+        tools.append(_deck_lookup_tool(index, deck_id))
     voice_name = md.get("voice", "Puck")
+    timer.mark("instructions")
 
-    model = google.realtime.RealtimeModel(
-        model="gemini-live-2.5-flash-preview",
-        voice=voice_name,
-        temperature=0.8,
-        instructions=instructions,
-    )
-    agent = voice.Agent(instructions=instructions)
+    model = userdata["model_factory"](voice_name=voice_name, instructions=instructions)
+    agent = voice.Agent(instructions=instructions, tools=tools)
     session = voice.AgentSession(llm=model)
+    timer.mark("model_built")
     await ctx.connect()
+    timer.mark("connected")
     await session.start(agent=agent, room=ctx.room)
+    timer.mark("session_started")
+    timer.record(persona=persona, room=ctx.room.name, slide_index=index is not None)
     await session.run()
 
 if __name__ == "__main__":
-    load_dotenv(pathlib.Path(__file__).resolve().parents[1] / ".env")
+    load_dotenv(ENV_PATH)
 
-    # This older form only takes the entrypoint function.
-    opts = WorkerOptions(entrypoint_fnc=entrypoint)
+    opts = WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        load_fnc=worker_load,
+        load_threshold=LOAD_THRESHOLD,
+    )
     cli.run_app(opts)
@@ -0,0 +1,80 @@
+# app/api/health.py
+"""
+Operational endpoints (mounted at the root, outside /api):
+  GET /health   DB + broker connectivity, cached for HEALTH_CACHE_S so probes stay cheap
+  GET /metrics  Prometheus exposition, aggregated across API and worker processes
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from app.core.config import HEALTH_CACHE_S, HEALTH_CHECK_TIMEOUT_S
+from app.core.metrics import render_latest
+from app.core.redis import get_async_redis
+from app.db.session import db
+
+router = APIRouter()
+
+_cached: Optional[Dict[str, Any]] = None
+_cached_at = 0.0
+_lock: Optional[asyncio.Lock] = None
+
+
+async def _probe(name: str, check) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), timeout=HEALTH_CHECK_TIMEOUT_S)
+        ok, error = True, None
+    except Exception as exc:
+        ok, error = False, f"{exc.__class__.__name__}: {exc}"[:200]
+    result = {"ok": ok, "ms": round((time.perf_counter() - started) * 1000, 1)}
+    if error:
+        result["error"] = error
+        print(f"[health] {name} check failed: {error}")
+    return result
+
+
+async def _check_db() -> None:
+    if not db.is_connected():
+        raise ConnectionError("prisma client not connected")
+    await db.query_raw("SELECT 1")
+
+
+async def _check_broker() -> None:
+    await get_async_redis().ping()
+
+
+async def _run_checks() -> Dict[str, Any]:
+    db_result, broker_result = await asyncio.gather(_probe("db", _check_db), _probe("broker", _check_broker))
+    return {"db": db_result, "broker": broker_result}
+
+
+@router.get("/health")
+async def health():
+    global _cached, _cached_at, _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    # One probe at a time; concurrent callers wait for it and share the result
+    async with _lock:
+        if _cached is None or time.monotonic() - _cached_at > HEALTH_CACHE_S:
+            _cached, _cached_at = await _run_checks(), time.monotonic()
+        checks, age = _cached, time.monotonic() - _cached_at
+
+    ok = all(c["ok"] for c in checks.values())
+    return JSONResponse(
+        {"status": "ok" if ok else "degraded", "checks": checks, "ageS": round(age, 1)},
+        status_code=200 if ok else 503,
+    )
+
+
+@router.get("/metrics")
+async def metrics():
+    # Reads one small file per process; off the loop all the same
+    body, content_type = await run_in_threadpool(render_latest)
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,112 @@
+# app/api/middleware.py
+from __future__ import annotations
+
+import time
+from typing import Iterable
+
+from fastapi import HTTPException
+
+from app.core.metrics import HTTP_REQUEST_SECONDS
+
+
+class BodySizeLimitMiddleware:
+    """
+    Pure-ASGI guard that rejects oversized request bodies before the multipart parser spools
+    them: a too-large Content-Length is refused up front, and chunked bodies are cut off with
+    413 as soon as the running total crosses the limit. Only the size is checked here; content
+    checks (the %PDF header) happen in the endpoint after File(...) has spooled the body.
+    Register it before CORSMiddleware so CORS wraps its 413s.
+    """
+
+    def __init__(self, app, *, max_bytes: int, paths: Iterable[str], methods: Iterable[str] = ("POST",)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(p.rstrip("/") for p in paths)
+        self.methods = {m.upper() for m in methods}
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in self.methods
+            or scope["path"].rstrip("/") not in self.paths
+        ):
+            return await self.app(scope, receive, send)
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    if int(value) > self.max_bytes:
+                        return await self._reject(send)
+                except ValueError:
+                    return await self._reject(send, status=400, detail=b"Invalid Content-Length")
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await self._reject(send)
+
+    async def _reject(self, send, status: int = 413, detail: bytes = b"Request body too large"):
+        body = b'{"detail":"' + detail + b'"}'
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class MetricsMiddleware:
+    """
+    Pure-ASGI request timer. Labels by route template (/api/decks/{deck_id}/status), never the raw
+    path, so cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, *, exclude: Iterable[str] = ("/metrics", "/health")):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def tracking_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, tracking_send)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+
+
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it as a 413 instead of a generic 400.
+    def __init__(self):
+        super().__init__(status_code=413, detail="Request body too large")
@@ -5,8 +5,12 @@ from typing import Optional
 
 from app.security.clerk import get_auth_claims
 from app.db.session import db
+from app.db.queries import get_latest_analysis
 from app.services.livekit_tokens import mint_token
+from app.services.persona_bundles import get_bundle
 from app.services.persona_prompts import build_persona_instructions
+from app.services.read_cache import get_deck_ref
+from app.services.session_instructions import store_instructions
 
 router = APIRouter()
 
@@ -15,6 +19,7 @@ class CreateSessionRequest(BaseModel):
     deckId: Optional[str] = None
     roomName: Optional[str] = None
     voice: Optional[str] = None  # e.g., "Puck"
+    includeInstructions: bool = False  # echo the instruction text (debug UI only)
 
 @router.post("/session")
 async def create_boardroom_session(body: CreateSessionRequest, claims=Depends(get_auth_claims)):
@@ -23,37 +28,56 @@ async def create_boardroom_session(body: CreateSessionRequest, claims=Depends(ge
         raise HTTPException(400, detail="Unknown persona")
 
     owner = claims.get("sub")
-    deck_analysis = None
+    bundle = None
 
-    # Optional deck context
+    # Optional deck context: instructions for all personas are precomputed per analysis
     if body.deckId:
-        deck = await db.deck.find_unique(where={"id": body.deckId}, include={"analyses": True})
+        deck = await get_deck_ref(db, body.deckId)
         if not deck or deck.ownerClerkId != owner:
             raise HTTPException(404, detail="Deck not found")
-        if deck.status == "ready" and deck.analyses:
-            latest = max(deck.analyses, key=lambda a: a.createdAt)
-            deck_analysis = latest.resultJson
+        if deck.status == "ready":
+            analysis_id = deck.latestAnalysisId
+            if not analysis_id:
+                latest = await get_latest_analysis(db, deck.id)
+                analysis_id = latest.id if latest else None
+            if analysis_id:
+                bundle = await get_bundle(
+                    analysis_id,
+                    lambda aid: db.deckanalysis.find_unique(where={"id": aid}),
+                )
 
     # Compose instructions for the agent
-    instructions = build_persona_instructions(persona=persona, analysis=deck_analysis)
-    has_deck_context = deck_analysis is not None
+    if bundle is not None:
+        instructions = bundle[persona]
+    else:
+        instructions = build_persona_instructions(persona=persona, analysis=None)
+    has_deck_context = bundle is not None
 
     # Room + tokens
     room_name = body.roomName or (f"boardroom-{body.deckId}" if body.deckId else f"boardroom-persona-{persona}")
     user_token = mint_token(identity=owner, name="Founder", room_name=room_name, role="participant")
 
+    # The agent resolves its instructions by key at join time; inline only if Redis is down
+    instructions_key = await store_instructions(instructions)
     agent_metadata = {
         "persona": persona,
-        "instructions": instructions,
         "voice": body.voice or "Puck",
     }
+    if has_deck_context:
+        agent_metadata["deckId"] = body.deckId  # agent loads the deck's slide index for lookups
+    if instructions_key:
+        agent_metadata["instructionsKey"] = instructions_key
+    else:
+        agent_metadata["instructions"] = instructions
     agent_token = mint_token(identity=f"agent-{persona}", name=f"{persona.title()} Shark", room_name=room_name, role="agent", metadata=agent_metadata)
 
-    return {
+    response = {
         "roomName": room_name,
         "userToken": user_token,
         "agentToken": agent_token,       # you’ll use this to start the agent (see step 6)
         "persona": persona,
         "hasDeckContext": has_deck_context,
-        "instructions": instructions,    # optional: display in UI for debugging
     }
+    if body.includeInstructions:
+        response["instructions"] = instructions    # optional: display in UI for debugging
+    return response
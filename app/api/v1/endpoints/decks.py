@@ -1,9 +1,21 @@
 # app/api/v1/endpoints/decks.py
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
+import asyncio
+import json
+from pathlib import Path
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.security.clerk import get_auth_claims
-from app.services.storage import save_upload
-from app.background.tasks import process_deck
+from app.services.storage import UploadRejected, commit_upload, inspect_pdf, stream_upload
+from app.background.producer import enqueue_process_deck
 from app.db.session import db
+from app.db.queries import get_latest_analysis
+from app.services.analysis_bodies import choose_encoding, etag_matches, load_body, response_headers, store_bodies
+from app.services.deck_events import TERMINAL_STAGES, apublish_deck_event, deck_event_hub
+from app.services.read_cache import get_deck_ref
+from app.services.thumbnails import THUMB_SIZES, ThumbnailNotFound, get_thumbnail, thumbnail_etag
+
+SSE_KEEPALIVE_S = 15
 
 router = APIRouter()
 
@@ -16,9 +28,20 @@ async def upload_deck(
         raise HTTPException(status_code=400, detail="Only PDF files are accepted")
 
     owner = claims.get("sub")
-    contents = await file.read()
-    upload_path = save_upload(contents, file.filename)
 
+    # Stream to a staging file (bounded memory, hashed on the fly), validate, then commit it to
+    # storage (content-addressed: a PDF uploaded before is stored once) before enqueueing
+    try:
+        stored = await run_in_threadpool(stream_upload, file.file, file.filename)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    try:
+        await run_in_threadpool(inspect_pdf, stored.path)
+    except UploadRejected as e:
+        Path(stored.path).unlink(missing_ok=True)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    upload_path = await run_in_threadpool(commit_upload, stored)
     deck = await db.deck.create(
         data={
             "ownerClerkId": owner,
@@ -28,7 +51,8 @@ async def upload_deck(
         }
     )
 
-    process_deck.delay(deck.id, upload_path)
+    await run_in_threadpool(enqueue_process_deck, deck.id, upload_path, stored.sha256, owner_id=owner)
+    await apublish_deck_event(deck.id, "queued")
     return {"deckId": deck.id, "status": "uploaded"}
 
 
@@ -38,25 +62,110 @@ async def get_deck_status(
     claims: dict = Depends(get_auth_claims),
 ):
     owner = claims.get("sub")
-    deck = await db.deck.find_unique(where={"id": deck_id})
+    deck = await get_deck_ref(db, deck_id)
     if not deck or deck.ownerClerkId != owner:
         raise HTTPException(status_code=404, detail="Deck not found")
 
     return {"deckId": deck.id, "status": deck.status, "error": deck.error}
 
 
+@router.get("/{deck_id}/events")
+async def stream_deck_events(
+    deck_id: str,
+    request: Request,
+    claims: dict = Depends(get_auth_claims),
+):
+    """
+    Server-Sent Events stream of processing stages (queued → preprocessing → model_call →
+    persisting → ready|failed). The first event carries the current Deck.status, so late
+    subscribers catch up. Replaces polling /status; closes after a terminal stage.
+    """
+    owner = claims.get("sub")
+    deck = await get_deck_ref(db, deck_id)
+    if not deck or deck.ownerClerkId != owner:
+        raise HTTPException(status_code=404, detail="Deck not found")
+
+    def _sse(event: dict) -> str:
+        return f"event: stage\ndata: {json.dumps(event)}\n\n"
+
+    async def _events():
+        # Subscribe before reading current status so no transition is missed in between
+        async with deck_event_hub.subscribe(deck_id) as queue:
+            current = await db.deck.find_unique(where={"id": deck_id})
+            stage = current.status if current else "failed"
+            yield _sse({"deckId": deck_id, "stage": stage, "error": current.error if current else None})
+            if stage in TERMINAL_STAGES:
+                return
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event)
+                if event.get("stage") in TERMINAL_STAGES:
+                    return
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{deck_id}/analysis")
-async def get_deck_analysis(deck_id: str, claims: dict = Depends(get_auth_claims)):
+async def get_deck_analysis(deck_id: str, request: Request, claims: dict = Depends(get_auth_claims)):
+    """
+    The deck's latest analysis. ETag is derived from the analysis id, so a revalidation costs the
+    (cached) ownership check only; bodies are served pre-serialized and pre-compressed (see analysis_bodies).
+    """
     owner = claims.get("sub")
-    deck = await db.deck.find_unique(where={"id": deck_id}, include={"analyses": True})
+    deck = await get_deck_ref(db, deck_id)
     if not deck or deck.ownerClerkId != owner:
         raise HTTPException(status_code=404, detail="Deck not found")
 
     if deck.status != "ready":
         raise HTTPException(status_code=409, detail=f"Deck not ready (status={deck.status})")
 
-    if not deck.analyses:
-        raise HTTPException(status_code=404, detail="Analysis not found")
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    analysis_id = deck.latestAnalysisId
+    if analysis_id and etag_matches(request.headers.get("if-none-match"), analysis_id):
+        return Response(status_code=304, headers=response_headers(analysis_id, encoding, not_modified=True))
+
+    body = await run_in_threadpool(load_body, analysis_id, encoding) if analysis_id else None
+    if body is None:
+        latest = await get_latest_analysis(db, deck.id, analysis_id)
+        if not latest:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        analysis_id = latest.id
+        body = (await run_in_threadpool(store_bodies, latest.id, latest.resultJson))[encoding]
+
+    return Response(content=body, media_type="application/json", headers=response_headers(analysis_id, encoding))
+
+
+@router.get("/{deck_id}/pages/{page}/thumbnail")
+async def get_page_thumbnail(
+    deck_id: str,
+    page: int,
+    request: Request,
+    size: str = Query("md", pattern="^(" + "|".join(THUMB_SIZES) + ")$"),
+    claims: dict = Depends(get_auth_claims),
+):
+    """JPEG preview of a 1-based slide, e.g. for EvidenceItem.pages. A deck's PDF never changes."""
+    owner = claims.get("sub")
+    deck = await get_deck_ref(db, deck_id)
+    if not deck or deck.ownerClerkId != owner:
+        raise HTTPException(status_code=404, detail="Deck not found")
+
+    # Revalidation is answered from the deck/page/size alone, without touching the file
+    etag = thumbnail_etag(deck.id, page, size)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
 
-    latest = max(deck.analyses, key=lambda a: a.createdAt)
-    return latest.resultJson
+    try:
+        data, _ = await get_thumbnail(deck.id, deck.uploadPath, page, size)
+    except ThumbnailNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=data, media_type="image/jpeg", headers=headers)
@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.security.clerk import get_auth_claims
 from app.db.session import db
+from app.services.read_cache import get_user_record
 
 router = APIRouter()
 
@@ -16,10 +17,10 @@ async def get_current_user(claims: dict = Depends(get_auth_claims)):
         if not clerk_id:
             raise HTTPException(status_code=401, detail="User ID not found in token")
 
-        user = await db.user.find_unique(where={"clerkId": clerk_id})
+        user = await get_user_record(db, clerk_id)  # cached; webhook user events invalidate it
         if not user:
             raise HTTPException(status_code=404, detail="User not found in local database")
 
-        return user.dict()
+        return user
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
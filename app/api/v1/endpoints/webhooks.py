@@ -1,41 +1,75 @@
 # app/api/v1/endpoints/webhooks.py
+import asyncio
+from typing import Optional
+
 from fastapi import APIRouter, Request, HTTPException
 from svix.webhooks import Webhook, WebhookVerificationError
-from app.core.config import CLERK_WEBHOOK_SECRET
-from app.db.session import db
+from app.core.config import CLERK_WEBHOOK_SECRET, USER_SYNC_ACK_TIMEOUT_S
+from app.core.metrics import CLERK_WEBHOOK_EVENTS
+from app.services.clerk_sync import delivery_log, parse_user_event, user_event_writer
 
 router = APIRouter()
 
+_webhook: Optional[Webhook] = None
+
+
+def _get_webhook() -> Webhook:
+    # Built once (decodes the signing secret); created on first use so a missing secret only fails webhooks
+    global _webhook
+    if _webhook is None:
+        _webhook = Webhook(CLERK_WEBHOOK_SECRET)
+    return _webhook
+
+
 @router.post("/clerk")
 async def clerk_webhook(request: Request):
     """
     Handles incoming webhooks from Clerk to sync user data with the local database.
+    The User writes are batched across concurrent deliveries (app.services.clerk_sync); the
+    response waits until the batch holding this event has committed. If it can't be queued,
+    fails or takes too long, the svix-id is forgotten and the answer is 5xx so svix redelivers.
+    Redeliveries (same svix-id) are acknowledged without being applied again.
     """
+    headers = dict(request.headers)
+    body = await request.body()
     try:
-        headers = dict(request.headers)
-        body = await request.body()
-        wh = Webhook(CLERK_WEBHOOK_SECRET)
-        payload = wh.verify(body, headers)
-        event_type = payload.get("type")
-        data = payload.get("data")
-
-        print(f"Received webhook event: {event_type}")
-
-        if event_type == "user.created":
-            email_info = data.get("email_addresses", [])
-            if email_info:
-                user_data = {
-                    "clerkId": data.get("id"),
-                    "email": email_info[0].get("email_address")
-                }
-                if all(user_data.values()):
-                    await db.user.create(data=user_data)
-                    print(f"User {user_data['clerkId']} created in database.")
-        
-        # Add other event types like user.deleted here if needed
-
-        return {"status": "success", "message": f"Event '{event_type}' processed."}
-    except WebhookVerificationError as e:
+        payload = _get_webhook().verify(body, headers)
+    except WebhookVerificationError:
+        CLERK_WEBHOOK_EVENTS.labels("unknown", "invalid").inc()
         raise HTTPException(status_code=400, detail="Webhook verification failed")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+
+    event_type = payload.get("type") or "unknown"
+    svix_id = headers.get("svix-id")  # present on every verified delivery
+    if not await delivery_log.first_delivery(svix_id):
+        CLERK_WEBHOOK_EVENTS.labels(event_type, "duplicate").inc()
+        return {"status": "success", "message": f"Event '{event_type}' already received."}
+
+    event = parse_user_event(payload)
+    if event is None:
+        CLERK_WEBHOOK_EVENTS.labels(event_type, "ignored").inc()
+        return {"status": "success", "message": f"Event '{event_type}' ignored."}
+
+    done = user_event_writer.submit(event)
+    if done is None:
+        # Writer is saturated: let svix retry later rather than drop the event
+        await delivery_log.forget(svix_id)
+        CLERK_WEBHOOK_EVENTS.labels(event_type, "overloaded").inc()
+        raise HTTPException(status_code=503, detail="Busy, retry later", headers={"Retry-After": "5"})
+
+    try:
+        # shield: giving up on the wait must not cancel the future the writer resolves
+        applied = await asyncio.wait_for(asyncio.shield(done), USER_SYNC_ACK_TIMEOUT_S)
+        outcome = "applied" if applied else "failed"
+    except asyncio.TimeoutError:
+        # May still commit; a redelivery is harmless (upserts, newest event wins)
+        outcome = "timeout"
+    except asyncio.CancelledError:
+        await asyncio.shield(delivery_log.forget(svix_id))  # client went away: unacknowledged
+        raise
+    if outcome != "applied":
+        await delivery_log.forget(svix_id)
+        CLERK_WEBHOOK_EVENTS.labels(event_type, outcome).inc()
+        raise HTTPException(status_code=503, detail="User sync failed, retry later", headers={"Retry-After": "5"})
+
+    CLERK_WEBHOOK_EVENTS.labels(event_type, "applied").inc()
+    return {"status": "success", "message": f"Event '{event_type}' applied."}
@@ -0,0 +1,42 @@
+# app/background/producer.py
+"""
+Enqueue-side view of the background tasks, for the API process.
+
+Jobs are sent by task NAME, so producing one never imports app.background.tasks (and through
+it deck_processor, PyMuPDF, google-genai, the worker runtime). The enqueued_at stamp comes from
+celery_app's signals, same as .delay() would; the lane (queue) is picked here, per owner
+(see app.services.fair_queue).
+"""
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from app.core.celery_app import celery_app
+from app.services import fair_queue
+
+PROCESS_DECK = "app.background.tasks.process_deck"
+
+
+def enqueue_process_deck(
+    deck_id: str,
+    pdf_path: str,
+    pdf_sha256: Optional[str] = None,
+    *,
+    owner_id: Optional[str] = None,
+    lane: Optional[str] = None,
+):
+    """Blocking (Redis + broker round trips): call from a thread in async code."""
+    pending = fair_queue.register_pending(owner_id, deck_id)
+    lane = fair_queue.choose_lane(pending, lane)
+    return celery_app.send_task(
+        PROCESS_DECK,
+        args=[deck_id, pdf_path, pdf_sha256],
+        kwargs={
+            "owner_id": owner_id,
+            "lane": lane,
+            "owner_load": fair_queue.owner_load_bucket(pending),
+            "submitted_at": time.time(),
+        },
+        queue=fair_queue.LANE_QUEUES[lane],
+    )
@@ -0,0 +1,186 @@
+# app/background/runtime.py
+"""
+Per-worker-process async runtime for Celery tasks.
+
+prisma-client-py is asyncio-only, but Celery tasks are sync. Instead of paying for
+asyncio.run() + a fresh Prisma() engine spawn/connect on every task, each worker process
+keeps one event loop (running in a daemon thread) and one connected Prisma client.
+Tasks submit coroutines to that loop with run(). Everything is keyed on the pid, so a
+forked child never reuses its parent's loop or engine.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from celery import signals
+from prisma import Prisma
+from prisma import errors as prisma_errors
+from prisma.engine import errors as engine_errors
+
+from app.core.config import DECK_WORKER_CONCURRENCY
+from app.core.metrics import instrument_prisma
+
+T = TypeVar("T")
+
+# Errors after which the client is thrown away and reconnected
+CONNECTION_ERRORS = (
+    prisma_errors.ClientNotConnectedError,
+    prisma_errors.HTTPClientClosedError,
+    engine_errors.EngineConnectionError,
+    engine_errors.NotConnectedError,
+    httpx.TransportError,
+    ConnectionError,
+)
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_db: Optional[Prisma] = None
+_db_lock: Optional[asyncio.Lock] = None
+_job_slots: Optional[asyncio.Semaphore] = None
+
+
+# ========= Event loop =========
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    global _pid, _loop, _thread, _db, _db_lock, _job_slots
+    with _lock:
+        if _loop is not None and _pid == os.getpid() and _loop.is_running():
+            return _loop
+
+        # New process (or first use): never touch state inherited across fork
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def _serve():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(started.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=_serve, name="deck-worker-loop", daemon=True)
+        thread.start()
+        started.wait()
+
+        _pid, _loop, _thread = os.getpid(), loop, thread
+        _db, _db_lock, _job_slots = None, None, None
+        return loop
+
+
+def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run a coroutine on the worker's long-lived loop and block for its result."""
+    loop = _ensure_loop()
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def job_slot() -> asyncio.Semaphore:
+    """Caps concurrent deck jobs on the loop, whatever the Celery pool size. Use on the runtime loop."""
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(DECK_WORKER_CONCURRENCY)
+    return _job_slots
+
+
+# ========= Prisma client =========
+
+async def _connect() -> Prisma:
+    # --- Windows/Celery/Prisma stdio workaround ---
+    orig_stdout, orig_stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    os.environ.setdefault("PRISMA_ENGINE_STDIO", "inherit")
+
+    client = instrument_prisma(Prisma())
+    try:
+        await client.connect()
+    finally:
+        # restore Celery logging proxies after engine spawned
+        sys.stdout, sys.stderr = orig_stdout, orig_stderr
+    return client
+
+
+async def get_db() -> Prisma:
+    """The process-wide connected client; (re)connects lazily. Must run on the runtime loop."""
+    global _db, _db_lock
+    if _db_lock is None:
+        _db_lock = asyncio.Lock()
+    async with _db_lock:
+        if _db is None or not _db.is_connected():
+            started = time.perf_counter()
+            _db = await _connect()
+            print(f"[runtime] prisma connected in {(time.perf_counter() - started) * 1000:.0f}ms (pid={os.getpid()})")
+        return _db
+
+
+async def reset_db() -> None:
+    global _db
+    client, _db = _db, None
+    if client is not None:
+        try:
+            await client.disconnect()
+        except Exception:
+            pass
+
+
+async def db_call(fn: Callable[[Prisma], Awaitable[T]], *, retry: bool = True) -> T:
+    """
+    Run one DB operation; on a connection-level failure reconnect and, if retry, run it again.
+    A dropped connection doesn't say whether the write landed, so pass retry=False for anything
+    not idempotent (creates): the error propagates after the reconnect.
+    """
+    try:
+        return await fn(await get_db())
+    except CONNECTION_ERRORS as exc:
+        print(f"[runtime] prisma connection lost ({exc.__class__.__name__}); reconnecting")
+        await reset_db()
+        if not retry:
+            raise
+        return await fn(await get_db())
+
+
+# ========= Lifecycle =========
+
+def open_runtime() -> None:
+    run(get_db())
+
+
+def close_runtime() -> None:
+    global _loop, _thread, _pid
+    with _lock:
+        loop, thread = _loop, _thread
+        if loop is None or _pid != os.getpid():
+            return
+    try:
+        asyncio.run_coroutine_threadsafe(reset_db(), loop).result(10)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+    if thread is not None:
+        thread.join(timeout=5)
+    with _lock:
+        _loop, _thread, _pid = None, None, None
+
+
+@signals.worker_process_init.connect
+def _on_worker_process_init(**_: Any) -> None:
+    # prefork child: connect eagerly so the first task doesn't pay for it
+    open_runtime()
+
+
+@signals.worker_ready.connect
+def _on_worker_ready(sender=None, **_: Any) -> None:
+    # solo/threads pools execute tasks in this process; prefork children connect themselves
+    pool = getattr(sender, "pool", None)
+    if pool is not None and "prefork" not in type(pool).__module__:
+        open_runtime()
+
+
+@signals.worker_process_shutdown.connect
+@signals.worker_shutdown.connect
+def _on_worker_shutdown(**_: Any) -> None:
+    close_runtime()
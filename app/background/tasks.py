@@ -2,14 +2,39 @@
 from __future__ import annotations
 
 import asyncio
-import os
-import sys
+import time
 import traceback
-from typing import Any, Dict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
+from app.background import runtime
+from app.background.producer import PROCESS_DECK
 from app.core.celery_app import celery_app
-from app.services.deck_processor import analyze_pdf_doc_understanding
-from prisma import Prisma
+from app.core.config import DECK_QUEUE_BULK, INCREMENTAL_CANDIDATES, INCREMENTAL_ENABLED, INCREMENTAL_MAX_CHAIN
+from app.core.config import OWNER_MAX_DEFERRALS
+from app.core.metrics import (
+    DECK_DEFERRALS,
+    DECK_JOBS,
+    DECK_PAGES,
+    DECK_QUEUE_WAIT_SECONDS,
+    DECK_STAGE_SECONDS,
+    DECK_TIME_TO_READY_SECONDS,
+    observe_stage,
+    timed,
+)
+from app.services import fair_queue
+from app.db.queries import get_latest_analysis, get_recent_ready_decks
+from app.services.deck_processor import SCHEMA_VERSION, analyze_deck_async, analyze_pdf_incremental, resolve_model_name
+from app.services.analysis_bodies import store_bodies
+from app.services.analysis_cache import analysis_cache, cache_namespace
+from app.services.page_fingerprints import fingerprint_pdf, fingerprint_record, pick_base, record_pages
+from app.services.deck_events import apublish_deck_event
+from app.services.read_cache import invalidate_deck
+from app.services.storage import DeckBuffer, PdfBuffer, open_deck
+from app.services.thumbnails import prerender_deck
+from app.services.persona_bundles import bundle_column, publish_bundle
+from app.services.persona_prompts import build_persona_bundle
+from app.services.slide_index import build_slide_index, store_slide_index
 
 # Try to import Prisma's Json wrapper (older/newer versions differ).
 try:
@@ -25,30 +50,134 @@ def _trim(s: str, limit: int = 2000) -> str:
     return (s[: limit - 3] + "...") if len(s) > limit else s
 
 
-@celery_app.task(name="app.background.tasks.process_deck", bind=True)
-def process_deck(self, deck_id: str, pdf_path: str) -> Dict[str, Any]:
+async def _fingerprint(pdf_path: str, data: PdfBuffer) -> Optional[List[Dict[str, str]]]:
+    started = time.perf_counter()
+    try:
+        return await asyncio.to_thread(fingerprint_pdf, pdf_path, data)
+    except Exception as exc:
+        print(f"[process_deck] fingerprinting failed for {pdf_path}: {exc}")
+        return None
+    finally:
+        observe_stage("fingerprint", time.perf_counter() - started)
+
+
+async def _find_revision_base(
+    deck: Any,
+    pages: List[Dict[str, str]],
+) -> Optional[Tuple[Dict[str, Any], Dict[int, int], Dict[str, Any]]]:
+    """
+    A previous version of this deck: one of the owner's recent ready decks whose pages mostly
+    match. Returns (its analysis, {new page: old page}, reference for meta) or None.
+    Lookup errors just mean a full analysis.
+    """
+    try:
+        rows = await runtime.db_call(
+            lambda db: get_recent_ready_decks(db, deck.ownerClerkId, deck.id, INCREMENTAL_CANDIDATES)
+        )
+        namespace = cache_namespace()
+        candidates = [(row, p) for row in rows if (p := record_pages(row.pageFingerprints, namespace))]
+        match = pick_base(pages, candidates)
+        if match is None:
+            return None
+        base_deck, page_map = match
+        analysis = await runtime.db_call(
+            lambda db: get_latest_analysis(db, base_deck.id, base_deck.latestAnalysisId)
+        )
+    except Exception as exc:
+        print(f"[process_deck] revision lookup failed for {deck.id}: {exc}")
+        return None
+
+    result = getattr(analysis, "resultJson", None)
+    meta = result.get("meta", {}) if isinstance(result, dict) else {}
+    if meta.get("schema_version") != SCHEMA_VERSION:
+        return None
+    if int((meta.get("incremental") or {}).get("chain", 0)) >= INCREMENTAL_MAX_CHAIN:
+        return None  # merged results drift a little each time; start over from a full analysis
+    return result, page_map, {"base_deck_id": base_deck.id, "base_analysis_id": analysis.id}
+
+
+def _result_model(result: Dict[str, Any]) -> Optional[str]:
+    """The one model every part of an analysis came from, or None when hedges mixed models in."""
+    models = ((result.get("meta") or {}).get("calls") or {}).get("models") or []
+    return models[0] if len(models) == 1 else None
+
+
+async def _index_slides(deck_id: str, pdf_path: str, data: PdfBuffer) -> None:
+    # Best effort: without it the live agent just has no deck lookup tool
+    started = time.perf_counter()
+    try:
+        index = await asyncio.to_thread(build_slide_index, pdf_path, data)
+        await store_slide_index(deck_id, index)
+    except Exception as exc:
+        print(f"[process_deck] slide index failed for {deck_id}: {exc}")
+    finally:
+        observe_stage("slide_index", time.perf_counter() - started)
+
+
+@celery_app.task(name=PROCESS_DECK, bind=True)
+def process_deck(
+    self,
+    deck_id: str,
+    pdf_path: str,
+    pdf_sha256: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    lane: str = fair_queue.LANE_INTERACTIVE,
+    owner_load: str = "1",
+    submitted_at: Optional[float] = None,
+) -> Dict[str, Any]:
     """
-    Celery entrypoint (sync). Runs the async Prisma flow via asyncio.run()
-    because prisma-client-py is generated with interface="asyncio".
+    Celery entrypoint (sync). Runs the async Prisma flow on the worker's long-lived event loop
+    (see app.background.runtime) because prisma-client-py is generated with interface="asyncio".
+    The Prisma client is connected once per worker process and reused across tasks.
+    With the threads pool, many deck jobs run concurrently on that loop (capped by job_slot()).
     Uses Deck (artifact) and DeckAnalysis. Persona is NOT part of the deck.
-    Also applies a Windows/Celery stdio workaround so Prisma engine can spawn.
+    At most OWNER_MAX_RUNNING jobs per owner run at once; extra ones are deferred (Celery retry with
+    a growing countdown, see app.services.fair_queue), at most OWNER_MAX_DEFERRALS times.
     """
-    async def _run() -> Dict[str, Any]:
-        # --- Windows/Celery/Prisma stdio workaround ---
-        orig_stdout, orig_stderr = sys.stdout, sys.stderr
-        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
-        os.environ.setdefault("PRISMA_ENGINE_STDIO", "inherit")
+    task_started = time.perf_counter()
+    enqueued_at = getattr(self.request, "enqueued_at", None)
+    if enqueued_at:
+        DECK_QUEUE_WAIT_SECONDS.labels(lane, owner_load).observe(max(0.0, time.time() - float(enqueued_at)))
 
-        local = Prisma()
+    if not fair_queue.try_start(owner_id, deck_id):
+        deferrals = self.request.retries  # deferral is this task's only retry
+        if deferrals < OWNER_MAX_DEFERRALS:
+            # Owner already has its share of workers: retried later (held by a worker until its ETA,
+            # not queued), still counted as pending
+            DECK_DEFERRALS.inc()
+            fair_queue.register_pending(owner_id, deck_id)  # its pending lease covers the extra wait
+            raise self.retry(countdown=fair_queue.defer_countdown(deferrals), queue=DECK_QUEUE_BULK,
+                             max_retries=OWNER_MAX_DEFERRALS)
+        print(f"[process_deck] {deck_id}: deferred {deferrals} times, running over {owner_id}'s cap")
+
+    async def _heartbeat() -> None:
+        # Keeps the owner's running/pending leases alive; if this process dies they lapse on their own
+        while True:
+            await asyncio.sleep(fair_queue.HEARTBEAT_S)
+            await asyncio.to_thread(fair_queue.renew, owner_id, deck_id)
+
+    async def _run() -> Dict[str, Any]:
+        heartbeat = asyncio.create_task(_heartbeat()) if owner_id else None
         try:
-            await local.connect()
+            async with runtime.job_slot():
+                return await _process()
         finally:
-            # restore Celery logging proxies after engine spawned
-            sys.stdout, sys.stderr = orig_stdout, orig_stderr
+            if heartbeat is not None:
+                heartbeat.cancel()
 
+    async def _db_write(fn, *, retry: bool = True):
+        with timed(DECK_STAGE_SECONDS, "db_write"):
+            return await runtime.db_call(fn, retry=retry)
+
+    async def _process() -> Dict[str, Any]:
+        await runtime.get_db()
+        overhead_ms = (time.perf_counter() - task_started) * 1000
+        print(f"[process_deck] {deck_id}: runtime overhead {overhead_ms:.1f}ms")
+
+        buf: Optional[DeckBuffer] = None
         try:
             # 1) Fetch deck
-            deck = await local.deck.find_unique(where={"id": deck_id})
+            deck = await runtime.db_call(lambda db: db.deck.find_unique(where={"id": deck_id}))
             if not deck:
                 return {"ok": False, "error": f"Deck {deck_id} not found"}
 
@@ -57,29 +186,96 @@ def process_deck(self, deck_id: str, pdf_path: str) -> Dict[str, Any]:
                 return {"ok": True, "skipped": "already_ready"}
 
             # 3) Mark processing
-            await local.deck.update(
+            await _db_write(lambda db: db.deck.update(
                 where={"id": deck_id},
                 data={"status": "processing", "error": None},
-            )
+            ))
+            await invalidate_deck(deck_id)
+            await apublish_deck_event(deck_id, "preprocessing")
+
+            # One read-only mapping of the stored PDF (downloaded first for S3) serves hashing,
+            # fingerprints, PyMuPDF and the model request for the rest of the job
+            buf = await asyncio.to_thread(open_deck, pdf_path)
 
-            # 4) Run analysis (single-shot, Gemini 2.5 Pro/Flash from config)
-            result_obj = analyze_pdf_doc_understanding(pdf_path)
+            # 4) Run analysis (single-shot or page-batched by deck size, Gemini from config),
+            #    unless the exact same PDF was already analyzed with this model/prompt/schema.
+            #    Model calls use the async client, so many jobs share the loop while waiting on Gemini.
+            #    A revision of one of the owner's analyzed decks only sends its changed pages.
+            model_name = resolve_model_name()
+            sha = pdf_sha256 or await asyncio.to_thread(buf.sha256)  # upload path hashes while streaming
+            pages = await _fingerprint(pdf_path, buf.data)
+            result_obj = await asyncio.to_thread(analysis_cache.get, sha, model_name)  # file IO off the loop
+            if result_obj is not None:
+                result_obj.setdefault("meta", {})
+                result_obj["meta"]["processed_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+                print(f"[process_deck] cache hit for {deck_id} ({analysis_cache.stats()})")
+                DECK_JOBS.labels("cache_hit").inc()
+            else:
+                base = await _find_revision_base(deck, pages) if INCREMENTAL_ENABLED and pages else None
+                await apublish_deck_event(deck_id, "model_call")
+                if base is not None:
+                    result_obj = await analyze_pdf_incremental(
+                        pdf_path, base[0], base[1], model_name, base_ref=base[2], data=buf.data,
+                    )
+                    incremental = result_obj["meta"]["incremental"]
+                    print(f"[process_deck] {deck_id}: revision of {incremental['base_deck_id']}, reused "
+                          f"{len(incremental['reused_pages'])}/{result_obj['meta']['pages_count']} pages")
+                    DECK_PAGES.labels("reused").inc(len(incremental["reused_pages"]))
+                    DECK_PAGES.labels("analyzed").inc(len(incremental["analyzed_pages"]))
+                else:
+                    result_obj = await analyze_deck_async(pdf_path, model_name, data=buf.data)
+                    DECK_PAGES.labels("analyzed").inc(result_obj.get("meta", {}).get("pages_count", 0))
+                # Only full analyses: a merged revision carries another deck's reference and chain
+                # count, and isn't what a fresh analysis of these bytes would return
+                produced_by = _result_model(result_obj) if base is None else None
+                if produced_by is not None:
+                    # Keyed by the model that actually answered (a won hedge may be HEDGE_MODEL).
+                    # Best effort: a cache write error must not fail an analysis we already paid for
+                    try:
+                        await asyncio.to_thread(analysis_cache.put, sha, produced_by, result_obj)
+                    except Exception as exc:
+                        print(f"[process_deck] analysis cache store failed for {deck_id}: {exc}")
 
             # 5) Persist DeckAnalysis:
             #    - Use relation connect, not FK scalar
             #    - Wrap JSON with PrismaJson if needed
-            await local.deckanalysis.create(
+            #    - Precompute every persona's instructions alongside it
+            await apublish_deck_event(deck_id, "persisting")
+            persona_bundle = build_persona_bundle(result_obj)
+            analysis = await _db_write(lambda db: db.deckanalysis.create(
                 data={
-                    "deck": {"connect": {"id": deck_id}},   
+                    "deck": {"connect": {"id": deck_id}},
                     "resultJson": as_json(result_obj),
+                    "personaBundle": as_json(bundle_column(persona_bundle)),
                 }
-            )
+            ), retry=False)  # a retried create after a lost connection could insert it twice
+            await publish_bundle(analysis.id, persona_bundle)
+            try:
+                await asyncio.to_thread(store_bodies, analysis.id, result_obj)  # first GET is a file read
+            except Exception as exc:
+                print(f"[process_deck] analysis body store failed for {deck_id}: {exc}")
 
-            # 6) Mark ready
-            await local.deck.update(
-                where={"id": deck_id},
-                data={"status": "ready"},
-            )
+            # Slide text index for the live agent, before ready so a session started right away has it
+            await _index_slides(deck_id, pdf_path, buf.data)
+
+            # 6) Mark ready, point the deck at its newest analysis and keep its page fingerprints
+            #    so a later revision can reuse this analysis
+            ready = {"status": "ready", "latestAnalysisId": analysis.id}
+            if pages:
+                ready["pageFingerprints"] = as_json(fingerprint_record(pages, cache_namespace()))
+            await _db_write(lambda db: db.deck.update(where={"id": deck_id}, data=ready))
+            await invalidate_deck(deck_id)
+            await apublish_deck_event(deck_id, "ready", analysisId=analysis.id)
+            DECK_JOBS.labels("ready").inc()
+            observe_stage("total", time.perf_counter() - task_started)
+            if submitted_at:
+                DECK_TIME_TO_READY_SECONDS.labels(lane, owner_load).observe(max(0.0, time.time() - submitted_at))
+
+            # 7) Warm slide thumbnails (best effort, after ready so it never delays the client)
+            try:
+                await asyncio.to_thread(prerender_deck, deck_id, pdf_path, data=buf.data)
+            except Exception as exc:
+                print(f"[process_deck] thumbnail prerender failed for {deck_id}: {exc}")
 
             return {"ok": True, "deck_id": deck_id}
 
@@ -87,14 +283,22 @@ def process_deck(self, deck_id: str, pdf_path: str) -> Dict[str, Any]:
             msg = f"{exc.__class__.__name__}: {str(exc)}"
             stack = traceback.format_exc()
             try:
-                await local.deck.update(
+                await runtime.db_call(lambda db: db.deck.update(
                     where={"id": deck_id},
                     data={"status": "failed", "error": _trim(f"{msg}\n{stack}")},
-                )
+                ))
             except Exception:
                 pass
+            await invalidate_deck(deck_id)
+            await apublish_deck_event(deck_id, "failed", error=_trim(msg, 300))
+            DECK_JOBS.labels("failed").inc()
             raise
         finally:
-            await local.disconnect()
+            if buf is not None:
+                buf.close()
 
-    return asyncio.run(_run())
+    try:
+        return runtime.run(_run())
+    finally:
+        fair_queue.finish_running(owner_id, deck_id)
+        fair_queue.finish_pending(owner_id, deck_id)
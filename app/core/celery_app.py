@@ -1,7 +1,8 @@
 # app/core/celery_app.py
 import ssl
-from celery import Celery
-from app.core.config import REDIS_URL
+import time
+from celery import Celery, signals
+from app.core.config import REDIS_URL, DECK_WORKER_CONCURRENCY, DECK_QUEUE_INTERACTIVE
 
 celery_app = Celery("sharktank", broker=REDIS_URL, backend=REDIS_URL)
 
@@ -9,8 +10,18 @@ celery_app.conf.update(
     # 👇 ensure the worker imports your tasks module on startup
     imports=("app.background.tasks",),
 
-    task_routes={"app.background.tasks.*": {"queue": "deck"}},
+    # Default lane; the producer sends bulk/over-quota work to DECK_QUEUE_BULK instead.
+    # Workers consume both (-Q deck,deck_bulk) and, with "priority" ordering, always drain
+    # the queues in the order given, so interactive uploads jump ahead of a bulk backlog.
+    task_routes={"app.background.tasks.*": {"queue": DECK_QUEUE_INTERACTIVE}},
+    broker_transport_options={"queue_order_strategy": "priority"},
     task_time_limit=60 * 25,
+
+    # Deck jobs are I/O-bound on Gemini: a threads pool where every thread parks on the
+    # worker's shared event loop (app.background.runtime). Don't prefetch beyond free slots.
+    worker_pool="threads",
+    worker_concurrency=DECK_WORKER_CONCURRENCY,
+    worker_prefetch_multiplier=1,
     worker_send_task_events=True,
     task_send_sent_event=True,
     accept_content=["json"],
@@ -20,6 +31,12 @@ celery_app.conf.update(
     enable_utc=True,
 )
 
+# Stamp every message so the worker can report queue wait (enqueue -> start)
+@signals.before_task_publish.connect
+def _stamp_enqueued_at(headers=None, **_):
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
 # Upstash TLS
 if REDIS_URL.startswith("rediss://"):
     celery_app.conf.broker_use_ssl = {"ssl_cert_reqs": ssl.CERT_NONE}
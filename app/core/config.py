@@ -20,4 +20,119 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 LIVEKIT_URL = os.getenv("LIVEKIT_URL", "")  # e.g., wss://yourdomain.livekit.cloud
 LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY", "")
-LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET", "")
\ No newline at end of file
+LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET", "")
+
+# Content-addressed analysis cache (worker-side; keyed on PDF sha256 + model + prompt + schema)
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "1") not in ("0", "false", "False")
+ANALYSIS_CACHE_DIR = Path(os.environ.get("ANALYSIS_CACHE_DIR", "./data/analysis_cache")).resolve()
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "2000"))
+ANALYSIS_CACHE_MAX_AGE_S = int(os.getenv("ANALYSIS_CACHE_MAX_AGE_S", str(30 * 24 * 3600)))
+
+# Upload limits (enforced while streaming, before anything is enqueued)
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+MAX_DECK_PAGES = int(os.getenv("MAX_DECK_PAGES", "150"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# Map-reduce analysis for large decks (auto-selected above either threshold)
+CHUNK_THRESHOLD_BYTES = int(float(os.getenv("CHUNK_THRESHOLD_MB", "15")) * 1024 * 1024)
+CHUNK_THRESHOLD_PAGES = int(os.getenv("CHUNK_THRESHOLD_PAGES", "40"))
+CHUNK_BATCH_PAGES = int(os.getenv("CHUNK_BATCH_PAGES", "12"))
+CHUNK_MAX_PARALLEL = int(os.getenv("CHUNK_MAX_PARALLEL", "4"))
+
+# Deck worker concurrency (threads pool; each thread parks on the shared event loop)
+DECK_WORKER_CONCURRENCY_MAX = 32
+DECK_WORKER_CONCURRENCY = max(1, min(int(os.getenv("DECK_WORKER_CONCURRENCY", "8")), DECK_WORKER_CONCURRENCY_MAX))
+
+# Gemini quota (enforced by a token bucket shared by all jobs in the worker process)
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "300"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+
+# Local Clerk session-token verification (JWKS cached in-process; SDK is the fallback)
+CLERK_LOCAL_VERIFY = os.getenv("CLERK_LOCAL_VERIFY", "1") not in ("0", "false", "False")
+CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL", "https://api.clerk.com/v1/jwks")
+CLERK_JWT_KEY = os.getenv("CLERK_JWT_KEY")  # optional PEM public key: no JWKS fetch at all
+CLERK_ISSUER = os.getenv("CLERK_ISSUER")    # e.g. https://clerk.yourdomain.com; unchecked if unset
+
+# PDF pre-compression before the model call (PyMuPDF image downsampling + object/font cleanup)
+PDF_COMPRESS_ENABLED = os.getenv("PDF_COMPRESS_ENABLED", "1") not in ("0", "false", "False")
+PDF_COMPRESS_MIN_BYTES = int(float(os.getenv("PDF_COMPRESS_MIN_MB", "2")) * 1024 * 1024)
+PDF_COMPRESS_DPI_THRESHOLD = int(os.getenv("PDF_COMPRESS_DPI_THRESHOLD", "200"))
+PDF_COMPRESS_DPI_TARGET = int(os.getenv("PDF_COMPRESS_DPI_TARGET", "150"))
+PDF_COMPRESS_JPEG_QUALITY = int(os.getenv("PDF_COMPRESS_JPEG_QUALITY", "75"))
+
+# Slide thumbnails (disk cache shared by API and worker; rendered in a process pool by the API)
+THUMB_CACHE_DIR = Path(os.environ.get("THUMB_CACHE_DIR", "./data/thumbnails")).resolve()
+THUMB_CACHE_MAX_BYTES = int(float(os.getenv("THUMB_CACHE_MAX_MB", "512")) * 1024 * 1024)
+THUMB_RENDER_PROCESSES = int(os.getenv("THUMB_RENDER_PROCESSES", "2"))
+
+# Gemini call layer: per-attempt timeout, retries with jittered backoff, optional hedging
+GEMINI_ATTEMPT_TIMEOUT_S = float(os.getenv("GEMINI_ATTEMPT_TIMEOUT_S", "300"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+GEMINI_BACKOFF_BASE_S = float(os.getenv("GEMINI_BACKOFF_BASE_S", "2"))
+GEMINI_BACKOFF_MAX_S = float(os.getenv("GEMINI_BACKOFF_MAX_S", "30"))
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "0") not in ("0", "false", "False")
+HEDGE_MODEL = os.getenv("HEDGE_MODEL")  # e.g. gemini-2.5-flash; defaults to the primary model
+HEDGE_DELAY_DEFAULT_S = float(os.getenv("HEDGE_DELAY_DEFAULT_S", "90"))  # until enough latency samples
+HEDGE_DELAY_MIN_S = float(os.getenv("HEDGE_DELAY_MIN_S", "10"))
+
+# Process-wide Gemini HTTP client (pooled keep-alive connections)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")  # override, e.g. a local fake server for benchmarks
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "32"))
+GEMINI_KEEPALIVE_S = float(os.getenv("GEMINI_KEEPALIVE_S", "120"))
+GEMINI_CONNECT_TIMEOUT_S = float(os.getenv("GEMINI_CONNECT_TIMEOUT_S", "10"))
+
+# Prometheus metrics (multiprocess: API and Celery worker write to the same directory)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+METRICS_DIR = Path(os.environ.get("PROMETHEUS_MULTIPROC_DIR", "./data/metrics")).resolve()
+HEALTH_CACHE_S = float(os.getenv("HEALTH_CACHE_S", "5"))
+HEALTH_CHECK_TIMEOUT_S = float(os.getenv("HEALTH_CHECK_TIMEOUT_S", "2"))
+
+# Deck queue lanes and per-owner fairness
+DECK_QUEUE_INTERACTIVE = os.getenv("DECK_QUEUE_INTERACTIVE", "deck")
+DECK_QUEUE_BULK = os.getenv("DECK_QUEUE_BULK", "deck_bulk")
+OWNER_MAX_RUNNING = int(os.getenv("OWNER_MAX_RUNNING", "2"))        # concurrent jobs per owner, all workers
+OWNER_INTERACTIVE_MAX = int(os.getenv("OWNER_INTERACTIVE_MAX", "3"))  # owner's pending jobs before uploads go bulk
+OWNER_DEFER_S = float(os.getenv("OWNER_DEFER_S", "10"))                # first deferral; doubles per deferral
+OWNER_DEFER_MAX_S = float(os.getenv("OWNER_DEFER_MAX_S", "120"))
+OWNER_MAX_DEFERRALS = int(os.getenv("OWNER_MAX_DEFERRALS", "20"))     # then the job runs over the cap
+OWNER_RUNNING_LEASE_S = int(os.getenv("OWNER_RUNNING_LEASE_S", "120"))        # renewed while a job runs
+OWNER_PENDING_LEASE_S = int(os.getenv("OWNER_PENDING_LEASE_S", str(3 * 60 * 60)))  # queued job never started
+
+# Incremental re-analysis: a new upload that mostly matches one of the owner's analyzed decks
+# (per-page fingerprints) only sends the changed pages to the model
+INCREMENTAL_ENABLED = os.getenv("INCREMENTAL_ENABLED", "1") not in ("0", "false", "False")
+INCREMENTAL_MIN_MATCH = float(os.getenv("INCREMENTAL_MIN_MATCH", "0.6"))  # share of pages unchanged
+INCREMENTAL_CANDIDATES = int(os.getenv("INCREMENTAL_CANDIDATES", "5"))    # owner's most recent ready decks
+INCREMENTAL_MAX_CHAIN = int(os.getenv("INCREMENTAL_MAX_CHAIN", "3"))      # then a full re-analysis
+PAGE_IMAGE_MAX_DISTANCE = int(os.getenv("PAGE_IMAGE_MAX_DISTANCE", "4"))  # dHash bits (of 64)
+
+# Pre-serialized, pre-compressed analysis response bodies (disk, shared by API and worker)
+ANALYSIS_BODY_DIR = Path(os.environ.get("ANALYSIS_BODY_DIR", "./data/analysis_bodies")).resolve()
+ANALYSIS_BODY_MAX_BYTES = int(float(os.getenv("ANALYSIS_BODY_MAX_MB", "256")) * 1024 * 1024)
+
+# Deck PDF storage: "local" (content-addressed under UPLOAD_DIR) or "s3" (any S3-compatible store)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "decks")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. MinIO / a local stand-in; AWS when unset
+S3_REGION = os.getenv("S3_REGION")
+S3_CACHE_DIR = Path(os.environ.get("S3_CACHE_DIR", "./data/s3_cache")).resolve()  # local copies for PyMuPDF
+
+# Per-deck slide text index (BM25) for the live agent's deck lookup tool; also kept in Redis
+SLIDE_INDEX_DIR = Path(os.environ.get("SLIDE_INDEX_DIR", "./data/slide_index")).resolve()
+
+# Clerk webhooks: svix-id dedupe window (svix retries for ~a day) and the batched user writer
+CLERK_WEBHOOK_DEDUPE_TTL_S = int(os.getenv("CLERK_WEBHOOK_DEDUPE_TTL_S", str(48 * 3600)))
+CLERK_WEBHOOK_DEDUPE_LOCAL_MAX = int(os.getenv("CLERK_WEBHOOK_DEDUPE_LOCAL_MAX", "10000"))
+USER_SYNC_BATCH_MAX = int(os.getenv("USER_SYNC_BATCH_MAX", "100"))     # user events per DB transaction
+USER_SYNC_FLUSH_MS = float(os.getenv("USER_SYNC_FLUSH_MS", "25"))      # coalescing window after the first event
+USER_SYNC_QUEUE_MAX = int(os.getenv("USER_SYNC_QUEUE_MAX", "5000"))    # beyond this, 503 and let svix retry
+USER_SYNC_ACK_TIMEOUT_S = float(os.getenv("USER_SYNC_ACK_TIMEOUT_S", "10"))  # < svix's 15s request timeout
+
+# Read-through cache for hot lookups (deck ownership/status by id, User by clerkId): in-process
+# LRU with TTL, shared through Redis when READ_CACHE_REDIS is on; invalidated over Redis pub/sub
+READ_CACHE_REDIS = os.getenv("READ_CACHE_REDIS", "1") not in ("0", "false", "False")
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "10000"))  # per entity, per process
+DECK_CACHE_TTL_S = float(os.getenv("DECK_CACHE_TTL_S", "60"))
+DECK_CACHE_PENDING_TTL_S = float(os.getenv("DECK_CACHE_PENDING_TTL_S", "2"))  # decks still uploaded/processing
+USER_CACHE_TTL_S = float(os.getenv("USER_CACHE_TTL_S", "300"))
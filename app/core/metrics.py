@@ -0,0 +1,157 @@
+# app/core/metrics.py
+"""
+Prometheus metrics shared by the API and the Celery worker.
+
+Both processes write to PROMETHEUS_MULTIPROC_DIR (prometheus_client's multiprocess mode), and
+the API's /metrics endpoint aggregates every pid's samples. The env var has to be set before
+prometheus_client is imported, hence this module owns the import. The directory is wiped when
+the container starts (see Dockerfile), never while processes are writing to it. Outside Docker
+(and in addition to that), every process drops the files of pids that are no longer running as
+it starts, so samples from before a local restart aren't summed in forever.
+"""
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from app.core.config import METRICS_DIR, METRICS_ENABLED
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(METRICS_DIR))
+METRICS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _prune_dead_pid_files(directory: Path) -> int:
+    """
+    Remove <type>[_<mode>]_<pid>.db files of exited processes (and any left under our own pid,
+    which can only be a previous process's: this runs before we write a sample). Live processes'
+    files are kept, so the API and the worker can start in any order.
+    """
+    removed = 0
+    for path in directory.glob("*.db"):
+        try:
+            pid = int(path.stem.rsplit("_", 1)[-1])
+        except ValueError:
+            continue
+        if pid == os.getpid() or not _pid_alive(pid):
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+_prune_dead_pid_files(Path(os.environ["PROMETHEUS_MULTIPROC_DIR"]))
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest  # noqa: E402
+from prometheus_client import multiprocess  # noqa: E402
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+
+# Buckets in seconds: fast paths (auth cache, DB) need sub-ms resolution, the model call minutes
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency by route template",
+    ["method", "route", "status"], buckets=FAST_BUCKETS,
+)
+CLERK_VERIFY_SECONDS = Histogram(
+    "clerk_verify_seconds", "Session token verification time by path taken",
+    ["path"], buckets=FAST_BUCKETS,
+)
+PRISMA_QUERY_SECONDS = Histogram(
+    "prisma_query_seconds", "Prisma query time by model and method",
+    ["model", "method"], buckets=FAST_BUCKETS,
+)
+DECK_STAGE_SECONDS = Histogram(
+    "deck_stage_seconds", "process_deck time per stage",
+    ["stage"], buckets=SLOW_BUCKETS,
+)
+# lane: interactive|bulk; owner_load: the owner's pending jobs at enqueue, bucketed (never raw ids)
+DECK_QUEUE_WAIT_SECONDS = Histogram(
+    "deck_queue_wait_seconds", "Celery enqueue -> task start (per attempt)",
+    ["lane", "owner_load"], buckets=SLOW_BUCKETS,
+)
+DECK_TIME_TO_READY_SECONDS = Histogram(
+    "deck_time_to_ready_seconds", "Upload enqueued -> deck ready, including deferrals",
+    ["lane", "owner_load"], buckets=SLOW_BUCKETS,
+)
+DECK_JOBS = Counter("deck_jobs_total", "Finished process_deck jobs by outcome", ["outcome"])
+DECK_PAGES = Counter("deck_pages_total", "Analyzed deck pages: sent to the model or reused from a previous version", ["how"])
+# result: hit|miss|expired (a miss on an entry older than ANALYSIS_CACHE_MAX_AGE_S); evicted counts entries dropped
+ANALYSIS_CACHE_EVENTS = Counter("analysis_cache_events_total", "Analysis cache lookups by result, and evictions", ["result"])
+DECK_DEFERRALS = Counter("deck_deferrals_total", "Jobs re-queued because their owner was at the running cap")
+# type: Clerk event type; outcome: applied|duplicate|ignored|overloaded|failed|timeout|invalid
+CLERK_WEBHOOK_EVENTS = Counter("clerk_webhook_events_total", "Clerk webhook deliveries by outcome", ["type", "outcome"])
+# outcome: upserted|deleted|coalesced|stale|failed
+USER_SYNC_EVENTS = Counter("user_sync_events_total", "User events applied by the background writer", ["outcome"])
+# entity: deck|user; result: local|redis|coalesced (waited on another request's miss)|miss.
+# Hit ratio = 1 - rate(miss) / rate(all)
+READ_CACHE_LOOKUPS = Counter("read_cache_lookups_total", "Read-through cache lookups by layer that answered", ["entity", "result"])
+USER_SYNC_BATCH_SIZE = Histogram(
+    "user_sync_batch_size", "User events per writer flush (before coalescing)",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        DECK_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+@contextmanager
+def timed(histogram: Histogram, *labels: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if METRICS_ENABLED:
+            (histogram.labels(*labels) if labels else histogram).observe(time.perf_counter() - started)
+
+
+def instrument_prisma(client: Any) -> Any:
+    """Times every query a Prisma client executes (wraps the instance's _execute)."""
+    original = client._execute
+
+    async def _execute(*, method: str, arguments: dict, model: Optional[type] = None,
+                       root_selection: Optional[list] = None) -> Any:
+        with timed(PRISMA_QUERY_SECONDS, model.__name__ if model else "raw", method):
+            return await original(method=method, arguments=arguments, model=model, root_selection=root_selection)
+
+    if METRICS_ENABLED:
+        client._execute = _execute
+    return client
+
+
+# ========= Exposition =========
+
+class _QueueDepthCollector:
+    """Broker queue lengths, read from Redis at scrape time (a gauge no single process owns)."""
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        from app.services.fair_queue import queue_depths
+
+        family = GaugeMetricFamily("deck_queue_depth", "Deck jobs waiting in the broker", labels=["lane"])
+        try:
+            for lane, depth in queue_depths().items():
+                family.add_metric([lane], depth)
+        except Exception as exc:
+            print(f"[metrics] queue depth unavailable: {exc}")
+        yield family
+
+
+def render_latest() -> Tuple[bytes, str]:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(METRICS_DIR))
+    registry.register(_QueueDepthCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,51 @@
+# app/core/redis.py
+"""
+Shared Redis clients (the same instance Celery uses as broker/backend).
+Created lazily and per process, so forked workers never share a socket with their parent.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import REDIS_URL
+
+_sync_client: Optional[redis.Redis] = None
+_sync_pid: Optional[int] = None
+_async_client: Optional[aioredis.Redis] = None
+_async_pid: Optional[int] = None
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"health_check_interval": 30, "socket_keepalive": True}
+    # Upstash TLS (mirrors celery_app.py)
+    if REDIS_URL.startswith("rediss://"):
+        kwargs["ssl_cert_reqs"] = "none"
+    return kwargs
+
+
+def get_redis() -> redis.Redis:
+    global _sync_client, _sync_pid
+    if _sync_client is None or _sync_pid != os.getpid():
+        _sync_client = redis.Redis.from_url(REDIS_URL, **_client_kwargs())
+        _sync_pid = os.getpid()
+    return _sync_client
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Async client; bind it to a single long-lived loop (the API loop, or the worker runtime loop)."""
+    global _async_client, _async_pid
+    if _async_client is None or _async_pid != os.getpid():
+        _async_client = aioredis.Redis.from_url(REDIS_URL, **_client_kwargs())
+        _async_pid = os.getpid()
+    return _async_client
+
+
+async def close_async_redis() -> None:
+    global _async_client
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.aclose()
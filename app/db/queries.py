@@ -0,0 +1,42 @@
+# app/db/queries.py
+from __future__ import annotations
+
+from typing import List, Optional
+
+from prisma import Prisma
+from prisma.models import Deck, DeckAnalysis
+
+
+async def get_latest_analysis(
+    client: Prisma,
+    deck_id: str,
+    latest_analysis_id: Optional[str] = None,
+) -> Optional[DeckAnalysis]:
+    """
+    Fetch exactly one DeckAnalysis row: the newest for the deck.
+    Uses Deck.latestAnalysisId (maintained by process_deck) when the caller already has it;
+    otherwise falls back to the (deckId, createdAt) index.
+    """
+    if latest_analysis_id:
+        analysis = await client.deckanalysis.find_unique(where={"id": latest_analysis_id})
+        if analysis is not None:
+            return analysis
+
+    return await client.deckanalysis.find_first(
+        where={"deckId": deck_id},
+        order={"createdAt": "desc"},
+    )
+
+
+async def get_recent_ready_decks(
+    client: Prisma,
+    owner_clerk_id: str,
+    exclude_deck_id: str,
+    take: int,
+) -> List[Deck]:
+    """The owner's most recently analyzed decks (candidates for incremental re-analysis)."""
+    return await client.deck.find_many(
+        where={"ownerClerkId": owner_clerk_id, "status": "ready", "id": {"not": exclude_deck_id}},
+        order={"createdAt": "desc"},
+        take=take,
+    )
@@ -1,5 +1,7 @@
 # app/db/session.py
 from prisma import Prisma
 
+from app.core.metrics import instrument_prisma
+
 # Initialize Prisma client
-db = Prisma(auto_register=True)
\ No newline at end of file
+db = instrument_prisma(Prisma(auto_register=True))
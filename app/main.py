@@ -2,11 +2,28 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.api_router import api_router
+from app.api import health
+from app.api.middleware import BodySizeLimitMiddleware, MetricsMiddleware
+from app.core.config import MAX_UPLOAD_BYTES, METRICS_ENABLED
+from app.core.redis import close_async_redis
 from app.db.session import db
+from app.services.clerk_sync import user_event_writer
+from app.services.deck_events import deck_event_hub
+from app.services.read_cache import invalidation_listener
+from app.services.thumbnails import shutdown_pool as shutdown_thumbnail_pool
 
 # Initialize FastAPI app
 app = FastAPI(title="Shark Tank AI Backend")
 
+# Refuse oversized deck uploads before the multipart body is spooled (64 KB multipart slack).
+# Registered before CORS so CORS wraps it: the browser sees a readable 413, not a CORS failure.
+# Only the size is checked this early; the %PDF header is checked after File(...) has spooled.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=MAX_UPLOAD_BYTES + 64 * 1024,
+    paths=["/api/decks"],
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -16,18 +33,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histogram (outermost, so it also times rejected uploads)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # App Lifespan (Connect/Disconnect Prisma)
 @app.on_event("startup")
 async def startup():
     await db.connect()
+    invalidation_listener.start()  # evicts cached decks/users other processes changed
 
 @app.on_event("shutdown")
 async def shutdown():
+    await deck_event_hub.close()
+    await invalidation_listener.close()
+    await user_event_writer.close()  # apply queued webhook user events before the DB goes away
+    await close_async_redis()
+    shutdown_thumbnail_pool()
     if db.is_connected():
         await db.disconnect()
 
 # Include the main API router
 app.include_router(api_router, prefix="/api")
+app.include_router(health.router, tags=["Ops"])
 
 # Simple root endpoint for testing
 @app.get("/")
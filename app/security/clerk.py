@@ -2,25 +2,117 @@
 from __future__ import annotations
 
 import os
+import threading
 import httpx
+import jwt
 from fastapi import Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from clerk_backend_api import Clerk
-from clerk_backend_api.security.types import AuthenticateRequestOptions
 from app.core.config import CLERK_SECRET_KEY, CLERK_AUTHORIZED_PARTY
+from app.core.config import CLERK_JWKS_URL, CLERK_JWT_KEY, CLERK_ISSUER, CLERK_LOCAL_VERIFY
+from app.core.metrics import CLERK_VERIFY_SECONDS, timed
+from app.security.jwks import ClaimsCache, JWKSCache, JWKSUnavailable, LocalVerifier
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 if not CLERK_SECRET_KEY:
     raise RuntimeError("CLERK_SECRET_KEY not set in .env")
 
-# Use parameter bearer_auth per SDK docs
-clerk_client = Clerk(bearer_auth=CLERK_SECRET_KEY)
+_clerk_client = None
+_clerk_lock = threading.Lock()
 
-def get_auth_claims(
+
+def get_clerk_client():
+    """
+    Clerk SDK client, built on first use. The SDK takes ~0.8s to import and is only needed when
+    local verification can't be used, so API startup doesn't pay for it.
+    """
+    global _clerk_client
+    with _clerk_lock:
+        if _clerk_client is None:
+            from clerk_backend_api import Clerk
+            # Use parameter bearer_auth per SDK docs
+            _clerk_client = Clerk(bearer_auth=CLERK_SECRET_KEY)
+        return _clerk_client
+
+
+# ========= Local fast path (JWKS + verified-claims cache) =========
+
+def _fetch_clerk_jwks() -> dict:
+    resp = httpx.get(
+        CLERK_JWKS_URL,
+        headers={"Authorization": f"Bearer {CLERK_SECRET_KEY}"},
+        timeout=5.0,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _static_keys() -> dict:
+    # CLERK_JWT_KEY (PEM public key from the Clerk dashboard) enables fully networkless verification
+    if not CLERK_JWT_KEY:
+        return {}
+    from cryptography.hazmat.primitives.serialization import load_pem_public_key
+    return {"": load_pem_public_key(CLERK_JWT_KEY.replace("\\n", "\n").encode())}
+
+
+local_verifier = LocalVerifier(
+    JWKSCache(_fetch_clerk_jwks, static_keys=_static_keys()),
+    authorized_parties=[CLERK_AUTHORIZED_PARTY] if CLERK_AUTHORIZED_PARTY else None,
+    issuer=CLERK_ISSUER,
+    claims_cache=ClaimsCache(),
+)
+
+
+def _session_token(request: Request, auth: HTTPAuthorizationCredentials | None) -> str | None:
+    if auth and auth.scheme.lower() == "bearer":
+        return auth.credentials
+    return request.cookies.get("__session")
+
+
+def _unauthorized(reason) -> HTTPException:
+    return HTTPException(status_code=401, detail=f"Unauthorized: {reason}")
+
+
+async def get_auth_claims(
     request: Request,
     auth: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
 ) -> dict:
+    """
+    Verifies the Clerk session token. Hot path: a verified-claims cache hit (no I/O, no thread hop).
+    Cold path: local RS256 verification against the cached JWKS. Clerk's SDK is only used when
+    local verification is disabled or the key set can't be fetched.
+    The returned dict is shared across requests with the same token: read it, don't mutate it.
+    """
+    token = _session_token(request, auth)
+    if CLERK_LOCAL_VERIFY and token:
+        with timed(CLERK_VERIFY_SECONDS, "cache"):
+            claims = local_verifier.cached(token)
+        if claims is not None:
+            return claims
+        try:
+            header = jwt.get_unverified_header(token)
+            if local_verifier.jwks.has_key(header.get("kid")):
+                with timed(CLERK_VERIFY_SECONDS, "local"):
+                    return local_verifier.verify(token)
+            # Unknown kid (first request or key rotation): the JWKS fetch blocks, keep it off the loop
+            with timed(CLERK_VERIFY_SECONDS, "jwks_fetch"):
+                return await run_in_threadpool(local_verifier.verify, token)
+        except JWKSUnavailable as e:
+            print(f"[auth] JWKS unavailable, falling back to Clerk SDK: {e}")
+        except jwt.InvalidTokenError as e:
+            raise _unauthorized(e)
+
+    with timed(CLERK_VERIFY_SECONDS, "clerk_api"):
+        return await run_in_threadpool(_authenticate_with_clerk, request, auth)
+
+
+def _authenticate_with_clerk(
+    request: Request,
+    auth: HTTPAuthorizationCredentials | None,
+) -> dict:
+    from clerk_backend_api.security.types import AuthenticateRequestOptions
+
     # Build httpx.Request object for Clerk to verify
     headers = dict(request.headers)
     cookies = request.cookies
@@ -39,13 +131,13 @@ def get_auth_claims(
     )
 
     try:
-        state = clerk_client.authenticate_request(hx_req, opts)
+        state = get_clerk_client().authenticate_request(hx_req, opts)
     except Exception as e:
-        raise HTTPException(status_code=401, detail=f"Unauthorized: {e}")
+        raise _unauthorized(e)
 
     if not getattr(state, "is_signed_in", False):
         reason = getattr(state, "reason", "invalid session")
-        raise HTTPException(status_code=401, detail=f"Unauthorized: {reason}")
+        raise _unauthorized(reason)
 
     payload = getattr(state, "payload", {}) or {}
     # Normalize common claims
@@ -0,0 +1,188 @@
+# app/security/jwks.py
+"""
+Local verification of Clerk session JWTs.
+
+Keys come from a cached JWKS (refreshed in the background once stale, and on demand when a
+token names an unknown `kid`, i.e. after a key rotation). Verified claims are kept in an LRU
+keyed by the token's sha256 until the token's `exp`, so a repeat request does one hash and
+one dict lookup: no network I/O, no signature check.
+
+Everything takes plain callables/keys, so it can be exercised with a locally generated
+RSA key pair and a fetch function returning {"keys": [...]}.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import jwt
+from jwt import InvalidTokenError, PyJWK
+
+
+class JWKSUnavailable(Exception):
+    """The key set could not be fetched; callers should fall back to remote verification."""
+
+
+class JWKSCache:
+    def __init__(
+        self,
+        fetch: Callable[[], Dict[str, Any]],
+        *,
+        ttl_s: float = 3600,
+        min_refresh_interval_s: float = 30,
+        static_keys: Optional[Dict[str, Any]] = None,
+    ):
+        self._fetch = fetch
+        self.ttl_s = ttl_s
+        self.min_refresh_interval_s = min_refresh_interval_s
+        self._keys: Dict[str, Any] = dict(static_keys or {})
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def refresh(self) -> None:
+        """Fetch the key set now (blocking). Keeps the previous keys if the fetch fails."""
+        with self._lock:
+            self._last_attempt = time.monotonic()
+        try:
+            jwks = self._fetch()
+            keys = {}
+            for jwk in jwks.get("keys", []):
+                if jwk.get("use", "sig") != "sig":
+                    continue
+                keys[jwk.get("kid", "")] = PyJWK(jwk).key
+        except Exception as exc:
+            raise JWKSUnavailable(str(exc)) from exc
+        with self._lock:
+            self._keys.update(keys)
+            # Drop rotated-out keys, but keep statically configured ones
+            for kid in list(self._keys):
+                if kid not in keys and kid != "":
+                    del self._keys[kid]
+            self._fetched_at = time.monotonic()
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                self.refresh()
+            except JWKSUnavailable as exc:
+                print(f"[jwks] background refresh failed: {exc}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_run, name="jwks-refresh", daemon=True).start()
+
+    def get_key(self, kid: Optional[str]) -> Optional[Any]:
+        """
+        Fast path is a dict lookup. Stale sets are refreshed in the background; an unknown kid
+        triggers a blocking refresh, rate-limited to one per min_refresh_interval_s.
+        """
+        now = time.monotonic()
+        key = self._keys.get(kid or "") or self._keys.get("")  # "" = statically configured PEM key
+        if key is not None:
+            if self._fetched_at and now - self._fetched_at > self.ttl_s:
+                self._refresh_in_background()
+            return key
+
+        if now - self._last_attempt < self.min_refresh_interval_s:
+            if not self._fetched_at:
+                raise JWKSUnavailable("JWKS fetch failed recently")
+            return None
+        self.refresh()
+        return self._keys.get(kid or "")
+
+    def has_key(self, kid: Optional[str]) -> bool:
+        return (kid or "") in self._keys or "" in self._keys
+
+
+class ClaimsCache:
+    """LRU of verified claims keyed by sha256(token); entries die at the token's exp."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[bytes, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: bytes, exp: float, claims: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[key] = (exp, claims)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class LocalVerifier:
+    def __init__(
+        self,
+        jwks: JWKSCache,
+        *,
+        authorized_parties: Optional[Iterable[str]] = None,
+        issuer: Optional[str] = None,
+        leeway_s: float = 5,
+        claims_cache: Optional[ClaimsCache] = None,
+    ):
+        self.jwks = jwks
+        self.authorized_parties = set(authorized_parties or ())
+        self.issuer = issuer
+        self.leeway_s = leeway_s
+        self.claims_cache = claims_cache or ClaimsCache()
+
+    def cached(self, token: str) -> Optional[Dict[str, Any]]:
+        return self.claims_cache.get(ClaimsCache.key_for(token))
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Returns verified (normalized) claims. The returned dict is shared with the cache:
+        treat it as read-only. Raises InvalidTokenError or JWKSUnavailable.
+        """
+        cache_key = ClaimsCache.key_for(token)
+        claims = self.claims_cache.get(cache_key)
+        if claims is not None:
+            return claims
+
+        header = jwt.get_unverified_header(token)
+        key = self.jwks.get_key(header.get("kid"))
+        if key is None:
+            raise InvalidTokenError("Signing key not found")
+
+        claims = jwt.decode(
+            token,
+            key=key,
+            algorithms=["RS256"],
+            leeway=self.leeway_s,
+            issuer=self.issuer,
+            options={"require": ["exp", "iat", "sub"], "verify_aud": False},
+        )
+        azp = claims.get("azp")
+        if azp and self.authorized_parties and azp not in self.authorized_parties:
+            raise InvalidTokenError(f"Invalid authorized party: {azp}")
+
+        # Normalize common claims
+        claims.setdefault("user_id", claims.get("sub"))
+        self.claims_cache.put(cache_key, float(claims["exp"]), claims)
+        return claims
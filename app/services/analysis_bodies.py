@@ -0,0 +1,150 @@
+# app/services/analysis_bodies.py
+"""
+Pre-serialized, pre-compressed response bodies for GET /api/decks/{id}/analysis.
+
+A DeckAnalysis row never changes once written, so its JSON is serialized and compressed once
+(by the worker right after persisting it, or by the API on first read) and stored on disk at
+<ANALYSIS_BODY_DIR>/<id[:2]>/<id>.json[.gz|.br]. Repeat reads are a file read, and clients that
+already have it get a 304 from the ETag alone (derived from the analysis id, one per encoding).
+Bodies are evicted oldest-first once the directory exceeds ANALYSIS_BODY_MAX_BYTES; a miss just
+re-serializes from the database.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import ANALYSIS_BODY_DIR, ANALYSIS_BODY_MAX_BYTES
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+IDENTITY = "identity"
+# Server preference when the client accepts several
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+_SUFFIXES = {IDENTITY: ".json", "gzip": ".json.gz", "br": ".json.br"}
+_ETAG_SUFFIXES = {IDENTITY: "", "gzip": "-gz", "br": "-br"}
+
+_approx_bytes: Optional[int] = None
+_evict_lock = threading.Lock()
+
+
+# ========= ETags and negotiation =========
+
+def etag_for(analysis_id: str, encoding: str = IDENTITY) -> str:
+    # Strong validators are per representation, so each encoding gets its own
+    return f'"a-{analysis_id}{_ETAG_SUFFIXES[encoding]}"'
+
+
+def _all_etags(analysis_id: str) -> Set[str]:
+    return {etag_for(analysis_id, encoding) for encoding in _SUFFIXES}
+
+
+def etag_matches(if_none_match: Optional[str], analysis_id: str) -> bool:
+    """If-None-Match check (weak comparison, any encoding of the same analysis)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return bool(tags & _all_etags(analysis_id))
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> str:
+    accepted: Dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return IDENTITY
+
+
+def response_headers(analysis_id: str, encoding: str, *, not_modified: bool = False) -> Dict[str, str]:
+    # no-cache: the deck's latest analysis can change (re-analysis), so always revalidate; it's a 304
+    headers = {
+        "ETag": etag_for(analysis_id, encoding),
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding != IDENTITY and not not_modified:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+# ========= Disk store =========
+
+def body_path(analysis_id: str, encoding: str = IDENTITY) -> Path:
+    return ANALYSIS_BODY_DIR / analysis_id[:2] / f"{analysis_id}{_SUFFIXES[encoding]}"
+
+
+def serialize(result: Any) -> bytes:
+    # Sorted keys: the worker's dict and the row read back from Postgres (jsonb reorders keys)
+    # must produce the same bytes
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def store_bodies(analysis_id: str, result: Any) -> Dict[str, bytes]:
+    """Serialize + compress every encoding and write them. Returns {encoding: body}."""
+    raw = serialize(result)
+    bodies = {IDENTITY: raw, "gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(raw, mode=brotli.MODE_TEXT, quality=11)
+    for encoding, body in bodies.items():
+        _write(body_path(analysis_id, encoding), body)
+    return bodies
+
+
+def load_body(analysis_id: str, encoding: str) -> Optional[bytes]:
+    try:
+        return body_path(analysis_id, encoding).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _write(path: Path, data: bytes) -> None:
+    global _approx_bytes
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    with _evict_lock:
+        if _approx_bytes is not None:
+            _approx_bytes += len(data)
+    _maybe_evict()
+
+
+def _maybe_evict() -> None:
+    global _approx_bytes
+    with _evict_lock:
+        if _approx_bytes is not None and _approx_bytes <= ANALYSIS_BODY_MAX_BYTES:
+            return
+        suffixes = tuple(_SUFFIXES.values())
+        files = [(p, p.stat()) for p in ANALYSIS_BODY_DIR.rglob("*") if p.name.endswith(suffixes)]
+        total = sum(st.st_size for _, st in files)
+        if total > ANALYSIS_BODY_MAX_BYTES:
+            # Evict least recently written/served down to 90% of the budget
+            files.sort(key=lambda f: max(f[1].st_atime, f[1].st_mtime))
+            target = int(ANALYSIS_BODY_MAX_BYTES * 0.9)
+            for p, st in files:
+                if total <= target:
+                    break
+                p.unlink(missing_ok=True)
+                total -= st.st_size
+        _approx_bytes = total
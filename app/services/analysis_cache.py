@@ -0,0 +1,187 @@
+# app/services/analysis_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from app.core.config import (
+    ANALYSIS_CACHE_DIR,
+    ANALYSIS_CACHE_ENABLED,
+    ANALYSIS_CACHE_MAX_AGE_S,
+    ANALYSIS_CACHE_MAX_ENTRIES,
+)
+from app.core.metrics import ANALYSIS_CACHE_EVENTS
+from app.services.deck_processor import PROMPT, SCHEMA_VERSION
+
+
+# ========= Keys =========
+
+def sha256_file(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=8)
+def cache_namespace(prompt: str = PROMPT, schema_version: str = SCHEMA_VERSION) -> str:
+    """
+    Fingerprint of the prompt + schema version. A prompt edit or schema bump yields a new
+    namespace, so entries produced under the old one are never served (and get purged).
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    raw = f"{prompt_hash}\0{schema_version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _model_slug(model_name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-._" else "_" for c in model_name) or "default"
+
+
+# ========= Disk-backed cache =========
+
+class AnalysisCache:
+    """
+    Content-addressed cache of analysis results, shared by all worker processes on the host.
+
+    Layout: <root>/<namespace>/<model>/<sha[:2]>/<sha>.json
+    Entries older than max_age_s are treated as misses and removed; once the cache holds more
+    than max_entries, the least recently used entries (by mtime, refreshed on hit) are evicted
+    down to 90% of it.
+    """
+
+    def __init__(
+        self,
+        root: Path = ANALYSIS_CACHE_DIR,
+        *,
+        max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+        max_age_s: int = ANALYSIS_CACHE_MAX_AGE_S,
+        enabled: bool = ANALYSIS_CACHE_ENABLED,
+    ):
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._purged = False
+        self._evict_lock = threading.Lock()
+        self._approx_entries: Optional[int] = None  # None until the first scan; other processes add too
+
+    # --- public API ---
+
+    def get(self, pdf_sha256: str, model_name: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        path = self._entry_path(pdf_sha256, model_name)
+        result = "miss"
+        try:
+            st = path.stat()
+            if time.time() - st.st_mtime > self.max_age_s:
+                result = "expired"
+                path.unlink(missing_ok=True)
+                raise FileNotFoundError(path)
+            data = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # LRU touch
+        except (FileNotFoundError, ValueError, OSError):
+            with self._lock:
+                self.misses += 1
+            ANALYSIS_CACHE_EVENTS.labels(result).inc()
+            return None
+
+        with self._lock:
+            self.hits += 1
+        ANALYSIS_CACHE_EVENTS.labels("hit").inc()
+        return data
+
+    def put(self, pdf_sha256: str, model_name: str, data: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._purge_stale_namespaces()
+
+        path = self._entry_path(pdf_sha256, model_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")  # jobs are threads: one file each
+        tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        is_new = not path.exists()
+        os.replace(tmp, path)
+
+        with self._evict_lock:
+            if self._approx_entries is not None and is_new:
+                self._approx_entries += 1
+        self._maybe_evict(self.root / cache_namespace())
+
+    def invalidate_all(self) -> None:
+        """Drop every entry (all namespaces)."""
+        shutil.rmtree(self.root, ignore_errors=True)
+        with self._lock:
+            self._purged = False
+        with self._evict_lock:
+            self._approx_entries = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+    # --- internals ---
+
+    def _entry_path(self, pdf_sha256: str, model_name: str) -> Path:
+        return (
+            self.root / cache_namespace() / _model_slug(model_name)
+            / pdf_sha256[:2] / f"{pdf_sha256}.json"
+        )
+
+    def _purge_stale_namespaces(self) -> None:
+        # Once per process: remove results built with an old prompt/schema version.
+        with self._lock:
+            if self._purged:
+                return
+            self._purged = True
+        if not self.root.exists():
+            return
+        current = cache_namespace()
+        for child in self.root.iterdir():
+            if child.is_dir() and child.name != current:
+                shutil.rmtree(child, ignore_errors=True)
+
+    def _maybe_evict(self, ns_dir: Path) -> None:
+        # The directory is only walked on the first put and once the running count says the
+        # cache is over budget; the scan then resets the count (other workers' writes included)
+        with self._evict_lock:
+            if self._approx_entries is not None and self._approx_entries <= self.max_entries:
+                return
+            entries = []
+            for p in ns_dir.rglob("*.json"):
+                try:
+                    entries.append((p, p.stat().st_mtime))
+                except FileNotFoundError:
+                    continue  # evicted/replaced by another worker meanwhile
+            overflow = len(entries) - self.max_entries
+            if overflow > 0:
+                overflow = len(entries) - int(self.max_entries * 0.9)  # headroom: no scan on the next put
+                entries.sort(key=lambda e: e[1])
+                for p, _ in entries[:overflow]:
+                    p.unlink(missing_ok=True)
+                with self._lock:
+                    self.evictions += overflow
+                ANALYSIS_CACHE_EVENTS.labels("evicted").inc(overflow)
+            self._approx_entries = len(entries) - max(overflow, 0)
+
+
+analysis_cache = AnalysisCache()
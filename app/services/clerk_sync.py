@@ -0,0 +1,280 @@
+# app/services/clerk_sync.py
+"""
+Clerk user events -> the User table, off the webhook's request path.
+
+The webhook endpoint verifies the signature, drops redeliveries by svix-id (DeliveryLog: a
+bounded in-process TTL map in front of a shared Redis SET NX, so every API process agrees) and
+hands the event to UserEventWriter. The writer wakes on the first event, waits
+USER_SYNC_FLUSH_MS for more, coalesces them per user (the newest event wins; events older than
+what was already applied are dropped) and applies the batch as one Prisma transaction of
+upserts/deletes, falling back to one write per user if the transaction fails.
+
+Each submitted event gets a future the writer resolves once its batch has committed (True) or
+its write failed (False); the endpoint only acknowledges after True. Anything else forgets the
+svix-id and answers 5xx, so svix redelivers: an event is never acknowledged before it's durable.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import (
+    CLERK_WEBHOOK_DEDUPE_LOCAL_MAX,
+    CLERK_WEBHOOK_DEDUPE_TTL_S,
+    USER_SYNC_BATCH_MAX,
+    USER_SYNC_FLUSH_MS,
+    USER_SYNC_QUEUE_MAX,
+)
+from app.core.metrics import USER_SYNC_BATCH_SIZE, USER_SYNC_EVENTS
+from app.core.redis import get_async_redis
+from app.db.session import db
+from app.services.read_cache import invalidate_users
+
+USER_EVENTS = ("user.created", "user.updated", "user.deleted")
+DELIVERY_KEY = "clerk-webhook:seen:"
+
+
+@dataclass
+class UserEvent:
+    clerk_id: str
+    email: Optional[str]      # None for deletes
+    deleted: bool
+    ts: int                   # Clerk's event timestamp (ms); 0 if the payload has none
+
+
+def _primary_email(data: Dict[str, Any]) -> Optional[str]:
+    addresses = data.get("email_addresses") or []
+    primary = data.get("primary_email_address_id")
+    for address in addresses:
+        if address.get("id") == primary and address.get("email_address"):
+            return address["email_address"]
+    return next((a["email_address"] for a in addresses if a.get("email_address")), None)
+
+
+def parse_user_event(payload: Dict[str, Any]) -> Optional[UserEvent]:
+    """The user event in a verified payload, or None for other event types / unusable data."""
+    event_type = payload.get("type")
+    data = payload.get("data") or {}
+    clerk_id = data.get("id")
+    if event_type not in USER_EVENTS or not clerk_id:
+        return None
+    ts = int(payload.get("timestamp") or data.get("updated_at") or 0)
+    if event_type == "user.deleted":
+        return UserEvent(clerk_id, None, True, ts)
+    email = _primary_email(data)
+    if not email:
+        return None  # e.g. phone-only sign-ups: User.email is required
+    return UserEvent(clerk_id, email, False, ts)
+
+
+# ========= Delivery dedupe =========
+
+class DeliveryLog:
+    """svix-ids seen within the TTL. Redis is the shared record; the local map saves the round trip."""
+
+    def __init__(self, ttl_s: int = CLERK_WEBHOOK_DEDUPE_TTL_S, local_max: int = CLERK_WEBHOOK_DEDUPE_LOCAL_MAX):
+        self.ttl_s = ttl_s
+        self.local_max = local_max
+        self._local: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._warned_at = float("-inf")
+
+    def _remember(self, svix_id: str) -> None:
+        with self._lock:
+            self._local[svix_id] = time.monotonic() + self.ttl_s
+            self._local.move_to_end(svix_id)
+            while len(self._local) > self.local_max:
+                self._local.popitem(last=False)
+
+    def _seen_locally(self, svix_id: str) -> bool:
+        with self._lock:
+            expires = self._local.get(svix_id)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._local[svix_id]
+                return False
+            return True
+
+    async def first_delivery(self, svix_id: str) -> bool:
+        """True the first time an id is seen (and records it); False for a redelivery."""
+        if self._seen_locally(svix_id):
+            return False
+        self._remember(svix_id)  # before the await: concurrent redeliveries to this process see it
+        try:
+            if not await get_async_redis().set(DELIVERY_KEY + svix_id, 1, nx=True, ex=self.ttl_s):
+                return False
+        except Exception as exc:
+            if time.monotonic() - self._warned_at > 60:  # once a minute, not once per delivery of a burst
+                self._warned_at = time.monotonic()
+                print(f"[clerk_sync] redis dedupe unavailable, local only: {exc}")
+        return True
+
+    async def forget(self, svix_id: str) -> None:
+        """Undo first_delivery when the event could not be accepted, so the retry gets through."""
+        with self._lock:
+            self._local.pop(svix_id, None)
+        try:
+            await get_async_redis().delete(DELIVERY_KEY + svix_id)
+        except Exception as exc:
+            print(f"[clerk_sync] redis dedupe forget failed for {svix_id}: {exc}")
+
+
+# ========= Batched writer =========
+
+class UserEventWriter:
+    """
+    Single background task per process applying queued user events in coalesced batches.
+    submit() returns a future per event: True once committed (or superseded by a newer event for
+    the same user that was), False if its write failed or the writer shut down first.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        batch_max: int = USER_SYNC_BATCH_MAX,
+        flush_ms: float = USER_SYNC_FLUSH_MS,
+        queue_max: int = USER_SYNC_QUEUE_MAX,
+    ):
+        self.client = client
+        self.batch_max = batch_max
+        self.flush_s = flush_ms / 1000
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_max)
+        self._task: Optional[asyncio.Task] = None
+        # Newest event timestamp applied per user, so a late retry of an older event can't win
+        self._applied: "OrderedDict[str, int]" = OrderedDict()
+
+    def submit(self, event: UserEvent) -> Optional["asyncio.Future[bool]"]:
+        """Queue an event; None when the queue is full (caller should ask Clerk to retry)."""
+        done: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((event, done))
+        except asyncio.QueueFull:
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._pump(), name="user-event-writer")
+        return done
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def close(self, timeout_s: float = 10.0) -> None:
+        """Flush what's queued (bounded wait), then stop; events still queued are failed."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout_s)
+        except asyncio.TimeoutError:
+            print(f"[clerk_sync] shutdown with {self._queue.qsize()} user events unapplied")
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        while not self._queue.empty():
+            _, done = self._queue.get_nowait()
+            _resolve(done, False)  # their requests answer 5xx; svix redelivers to a live process
+            self._queue.task_done()
+
+    async def _pump(self) -> None:
+        while True:
+            batch: List[Tuple[UserEvent, "asyncio.Future[bool]"]] = [await self._queue.get()]
+            results: Dict[str, bool] = {}
+            try:
+                if self._queue.qsize() < self.batch_max - 1:
+                    await asyncio.sleep(self.flush_s)  # let a burst accumulate
+                while len(batch) < self.batch_max and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                results = await self._apply([event for event, _ in batch])
+            except Exception as exc:
+                print(f"[clerk_sync] batch of {len(batch)} user events failed: {exc}")
+            finally:
+                # Cancelled mid-batch (shutdown): nothing was confirmed, fail the lot
+                for event, done in batch:
+                    _resolve(done, results.get(event.clerk_id, False))
+                    self._queue.task_done()
+
+    def _coalesce(self, batch: List[UserEvent]) -> List[UserEvent]:
+        merged: Dict[str, UserEvent] = {}
+        stale = 0
+        for event in batch:
+            if event.ts and event.ts < self._applied.get(event.clerk_id, 0):
+                stale += 1
+                continue
+            current = merged.get(event.clerk_id)
+            if current is None or event.ts >= current.ts:  # ties: later arrival wins
+                merged[event.clerk_id] = event
+        USER_SYNC_EVENTS.labels("stale").inc(stale)
+        USER_SYNC_EVENTS.labels("coalesced").inc(len(batch) - stale - len(merged))
+        return list(merged.values())
+
+    def _mark_applied(self, event: UserEvent) -> None:
+        self._applied[event.clerk_id] = max(event.ts, self._applied.get(event.clerk_id, 0))
+        self._applied.move_to_end(event.clerk_id)
+        while len(self._applied) > CLERK_WEBHOOK_DEDUPE_LOCAL_MAX:
+            self._applied.popitem(last=False)
+
+    @staticmethod
+    def _upsert_args(event: UserEvent) -> Dict[str, Any]:
+        return {
+            "where": {"clerkId": event.clerk_id},
+            "data": {
+                "create": {"clerkId": event.clerk_id, "email": event.email},
+                "update": {"email": event.email},
+            },
+        }
+
+    async def _apply(self, batch: List[UserEvent]) -> Dict[str, bool]:
+        """Writes a batch; returns {clerk_id: committed} for every user in it (stale events count as done)."""
+        USER_SYNC_BATCH_SIZE.observe(len(batch))
+        events = self._coalesce(batch)
+        deletes = [e for e in events if e.deleted]
+        upserts = [e for e in events if not e.deleted]
+        try:
+            # One transaction; deletes first so a freed email can be taken by a new account
+            async with self.client.batch_() as batcher:
+                if deletes:
+                    batcher.user.delete_many(where={"clerkId": {"in": [e.clerk_id for e in deletes]}})
+                for event in upserts:
+                    batcher.user.upsert(**self._upsert_args(event))
+            applied = deletes + upserts
+        except Exception as exc:
+            # One bad row (e.g. an email another account still holds) must not sink the rest
+            print(f"[clerk_sync] batched write of {len(events)} users failed, retrying one by one: {exc}")
+            applied = [e for e in deletes + upserts if await self._apply_one(e)]
+        for event in applied:
+            self._mark_applied(event)
+        await invalidate_users(e.clerk_id for e in applied)
+        USER_SYNC_EVENTS.labels("deleted").inc(sum(1 for e in applied if e.deleted))
+        USER_SYNC_EVENTS.labels("upserted").inc(sum(1 for e in applied if not e.deleted))
+        USER_SYNC_EVENTS.labels("failed").inc(len(events) - len(applied))
+        results = {event.clerk_id: True for event in batch}  # users whose events were all stale
+        results.update((event.clerk_id, False) for event in events)
+        results.update((event.clerk_id, True) for event in applied)
+        return results
+
+    async def _apply_one(self, event: UserEvent) -> bool:
+        try:
+            if event.deleted:
+                await self.client.user.delete_many(where={"clerkId": event.clerk_id})
+            else:
+                await self.client.user.upsert(**self._upsert_args(event))
+            return True
+        except Exception as exc:
+            print(f"[clerk_sync] user {event.clerk_id} {'delete' if event.deleted else 'upsert'} failed: {exc}")
+            return False
+
+
+def _resolve(done: "asyncio.Future[bool]", ok: bool) -> None:
+    if not done.done():  # the request may have given up waiting
+        done.set_result(ok)
+
+
+delivery_log = DeliveryLog()
+user_event_writer = UserEventWriter(db)
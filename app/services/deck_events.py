@@ -0,0 +1,135 @@
+# app/services/deck_events.py
+"""
+Deck progress events over Redis pub/sub.
+
+The worker publishes one message per stage on a single channel; each API process holds ONE
+subscription to it (DeckEventHub) and fans messages out to per-deck in-memory queues, so the
+number of streaming clients never changes the number of Redis connections.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from app.core.redis import get_async_redis, get_redis
+
+CHANNEL = "deck-events"
+
+STAGES = ("queued", "preprocessing", "model_call", "persisting", "ready", "failed")
+TERMINAL_STAGES = {"ready", "failed"}
+
+SUBSCRIBER_QUEUE_SIZE = 32
+SUBSCRIBE_WAIT_S = 5.0  # how long subscribe() waits for the shared subscription to be live
+
+
+def _message(deck_id: str, stage: str, extra: Dict[str, Any]) -> str:
+    return json.dumps({"deckId": deck_id, "stage": stage, "ts": time.time(), **extra})
+
+
+def publish_deck_event(deck_id: str, stage: str, **extra: Any) -> None:
+    """Sync, best-effort: progress reporting must never fail a job."""
+    try:
+        get_redis().publish(CHANNEL, _message(deck_id, stage, extra))
+    except Exception as exc:
+        print(f"[deck_events] publish failed ({stage} {deck_id}): {exc}")
+
+
+async def apublish_deck_event(deck_id: str, stage: str, **extra: Any) -> None:
+    """Async, best-effort variant for code already running on an event loop."""
+    try:
+        await get_async_redis().publish(CHANNEL, _message(deck_id, stage, extra))
+    except Exception as exc:
+        print(f"[deck_events] publish failed ({stage} {deck_id}): {exc}")
+
+
+class DeckEventHub:
+    """Single shared subscription, multiplexed to any number of local subscribers."""
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()  # set while the Redis SUBSCRIBE is in effect
+
+    @asynccontextmanager
+    async def subscribe(self, deck_id: str) -> AsyncIterator[asyncio.Queue]:
+        """
+        Yields once the shared subscription is live, so a transition published right after
+        (e.g. between the caller's status read and its first get()) is delivered. If Redis is
+        unreachable it yields after SUBSCRIBE_WAIT_S anyway; events then start on reconnect.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(deck_id, set()).add(queue)
+        self._ensure_running()
+        try:
+            if not self._subscribed.is_set():
+                try:
+                    await asyncio.wait_for(self._subscribed.wait(), SUBSCRIBE_WAIT_S)
+                except asyncio.TimeoutError:
+                    print(f"[deck_events] subscription not ready after {SUBSCRIBE_WAIT_S}s ({deck_id})")
+            yield queue
+        finally:
+            subs = self._subscribers.get(deck_id)
+            if subs is not None:
+                subs.discard(queue)
+                if not subs:
+                    del self._subscribers[deck_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self._subscribers.values())
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._pump(), name="deck-event-hub")
+
+    def _dispatch(self, raw: Any) -> None:
+        try:
+            event = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        for queue in tuple(self._subscribers.get(event.get("deckId"), ())):
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than block everyone else
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _pump(self) -> None:
+        backoff = 0.5
+        while True:
+            pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed.set()
+                backoff = 0.5
+                while True:
+                    msg = await pubsub.get_message(timeout=30.0)
+                    if msg is not None and msg.get("type") == "message":
+                        self._dispatch(msg.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[deck_events] subscription lost: {exc}; retrying in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+            finally:
+                self._subscribed.clear()  # messages published until the next SUBSCRIBE are lost
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._subscribed.clear()
+
+
+deck_event_hub = DeckEventHub()
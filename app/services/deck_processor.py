@@ -1,17 +1,36 @@
 # app/services/deck_processor.py
 from __future__ import annotations
 
+import asyncio
 import json
 import pathlib
+import time
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import fitz  # PyMuPDF
 from pydantic import BaseModel, Field
 from google import genai
 from google.genai import types
 
-from app.core.config import GOOGLE_API_KEY, GEMINI_MODEL
+from app.core.config import GEMINI_MODEL
+from app.core.config import (
+    CHUNK_BATCH_PAGES,
+    CHUNK_MAX_PARALLEL,
+    CHUNK_THRESHOLD_BYTES,
+    CHUNK_THRESHOLD_PAGES,
+    HEDGE_ENABLED,
+    HEDGE_MODEL,
+)
+from app.core.metrics import observe_stage
+from app.services.genai_client import get_async_client, reset_clients, should_reset, track_call
+from app.services.model_calls import InvalidResponse, hedged_call
+from app.services.pdf_preprocess import PreprocessResult, compress_pdf
+from app.services.rate_limit import TOKENS_PER_PDF_PAGE, estimate_request_tokens, gemini_limiter
+from app.services.storage import PdfBuffer
+
+# Bump whenever AnalysisSchema changes shape; also part of the analysis cache key.
+SCHEMA_VERSION = "1.0.0"
 
 
 # ========= Structured Output Schema (Pydantic; no open-ended dicts) =========
@@ -31,7 +50,7 @@ class Meta(BaseModel):
     model_used: str = ""
     pages_count: int = 0
     processed_at: str = ""      # ISO-8601
-    schema_version: str = "1.0.0"
+    schema_version: str = SCHEMA_VERSION
 
 class AnalysisSchema(BaseModel):
     one_liner: str = ""
@@ -83,6 +102,174 @@ RULES:
 
 # ========= Processor (single-shot document understanding with structured output) =========
 
+INLINE_LIMIT_BYTES = 20 * 1024 * 1024  # Gemini inline request limit
+
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": AnalysisSchema,  # Pydantic → structured output schema
+    "temperature": 0.2,
+}
+
+
+def resolve_model_name(model_name: Optional[str] = None) -> str:
+    return model_name or GEMINI_MODEL or "gemini-2.5-pro"
+
+
+def _parse_response(resp) -> Dict[str, Any]:
+    # Prefer parsed if available; otherwise parse resp.text
+    if getattr(resp, "parsed", None):
+        # resp.parsed is a Pydantic model (AnalysisSchema)
+        return resp.parsed.model_dump()
+    text = (resp.text or "").strip()
+    cleaned = text.strip("`").lstrip()
+    if cleaned.lower().startswith("json"):
+        cleaned = cleaned[4:].lstrip()
+    return json.loads(cleaned) if cleaned else {}
+
+
+async def _agenerate(
+    client: genai.Client,
+    model_to_use: str,
+    pdf_bytes: bytes,
+    prompt: str = PROMPT,
+    *,
+    timings: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """One raw generate_content call on the async client; see _call_model for retries/validation."""
+    contents = [
+        types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf"),
+        prompt,
+    ]
+    try:
+        with track_call() as timing:
+            resp = await client.aio.models.generate_content(
+                model=model_to_use,
+                contents=contents,
+                config=GENERATION_CONFIG,
+            )
+    except Exception as exc:
+        if should_reset(exc):
+            reset_clients(f"{exc.__class__.__name__}: {exc}"[:200])
+        raise
+    finally:
+        if timings is not None:
+            timings.append(timing.as_dict())
+    try:
+        return _parse_response(resp)
+    except ValueError as exc:  # truncated / non-JSON output
+        raise InvalidResponse(f"unparseable response: {exc}") from exc
+
+
+def validate_analysis(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema check for a model response; empty analyses count as invalid so they get re-requested."""
+    if not isinstance(raw, dict):
+        raise InvalidResponse(f"expected a JSON object, got {type(raw).__name__}")
+    data = AnalysisSchema.model_validate(raw).model_dump()
+    if not data["one_liner"].strip() and not (data["themes"] or data["strengths"] or data["risks"]):
+        raise InvalidResponse("analysis has no content")
+    return data
+
+
+async def _call_model(
+    model_to_use: str,
+    pdf_bytes: PdfBuffer,
+    prompt: str = PROMPT,
+    *,
+    pages: int = 0,
+    label: str = "",
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Validated model call: per-attempt timeout, jittered retries, and (HEDGE_ENABLED) a hedged
+    second request on HEDGE_MODEL after the primary's p95 latency. Every attempt waits on the
+    shared RPM/TPM limiter first. Uses the process-wide client, fetched per attempt so a client
+    reset after an auth/transport error takes effect on the retry. Returns (data, call info).
+    """
+    tokens = estimate_request_tokens(pages)
+    timings: List[Dict[str, Any]] = []
+    if not isinstance(pdf_bytes, bytes):
+        # The SDK's Blob only takes bytes: the one copy of a mapped deck, made for the request body
+        pdf_bytes = bytes(pdf_bytes)
+    data, info = await hedged_call(
+        lambda model: _agenerate(get_async_client(), model, pdf_bytes, prompt, timings=timings),
+        validate_analysis,
+        model_to_use,
+        hedge=HEDGE_ENABLED,
+        hedge_model=HEDGE_MODEL,
+        admit=lambda: gemini_limiter.acquire(tokens),
+        label=label,
+    )
+    info["http"] = timings
+    return data, info
+
+
+def _call_summary(infos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "attempts": sum(i["attempts"] for i in infos),
+        "hedged": sum(1 for i in infos if i["hedged"]),
+        "hedge_wins": sum(1 for i in infos if i["winner"] == "hedge"),
+        "models": sorted({i["model"] for i in infos}),
+        # Summed over every HTTP request, including failed attempts and hedges
+        **{
+            key: round(sum(t[key] for i in infos for t in i["http"]), 1)
+            for key in ("connect_ms", "upload_ms", "generate_ms")
+        },
+        "new_connections": sum(1 for i in infos for t in i["http"] if not t["reused_connection"]),
+    }
+
+
+def _models_used(infos: List[Dict[str, Any]], model_to_use: str) -> str:
+    # The models whose answers were kept: a won hedge on HEDGE_MODEL replaces the primary's
+    models = sorted({i["model"] for i in infos})
+    return "+".join(models) or model_to_use
+
+
+def _patch_meta(data: Dict[str, Any], model_to_use: str, pages_count: int) -> Dict[str, Any]:
+    # Patch meta with deterministic values
+    data.setdefault("meta", {})
+    data["meta"]["model_used"] = model_to_use
+    data["meta"]["pages_count"] = pages_count
+    data["meta"]["processed_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    data["meta"]["schema_version"] = SCHEMA_VERSION
+    return data
+
+
+def _load_pdf(
+    pdf_path: str,
+    *,
+    enforce_inline_limit: bool = True,
+    data: Optional[PdfBuffer] = None,
+) -> PreprocessResult:
+    """
+    Read the deck (unless `data`, the job's shared buffer, already holds it) and run the
+    pre-compression stage; the model only ever sees the result.
+    """
+    started = time.perf_counter()
+    pdf_bytes = data if data is not None else pathlib.Path(pdf_path).read_bytes()
+    read_ms = (time.perf_counter() - started) * 1000
+    try:
+        pre = compress_pdf(pdf_bytes)
+    except Exception:
+        # Unparseable for PyMuPDF: send as-is and let the model try (page count unknown)
+        pre = PreprocessResult(pdf_bytes, 0, len(pdf_bytes), len(pdf_bytes), 0.0, False)
+    pre.read_ms = read_ms
+    observe_stage("file_read", read_ms / 1000)
+    observe_stage("fitz_open", pre.open_ms / 1000)
+    observe_stage("preprocess", pre.elapsed_ms / 1000)
+    print(f"[deck_processor] preprocess {pdf_path}: {pre.metrics()}")
+
+    # Inline PDF bytes (limit ~20MB for inline)
+    if enforce_inline_limit and pre.bytes_out > INLINE_LIMIT_BYTES:
+        raise ValueError("PDF exceeds ~20MB inline limit. Use Files API or page-wise fallback.")
+    return pre
+
+
+def _record_timings(data: Dict[str, Any], pre: PreprocessResult, model_started: float) -> Dict[str, Any]:
+    data["meta"]["preprocess"] = pre.metrics()
+    data["meta"]["model_ms"] = round((time.perf_counter() - model_started) * 1000, 1)
+    observe_stage("model_call", data["meta"]["model_ms"] / 1000)
+    return data
+
+
 def analyze_pdf_doc_understanding(
     pdf_path: str,
     model_name: Optional[str] = None,
@@ -92,58 +279,361 @@ def analyze_pdf_doc_understanding(
     using structured output to force strict JSON matching AnalysisSchema.
     Returns a Python dict safe to store in DeckAnalysis.resultJson.
     """
-    model_to_use = model_name or GEMINI_MODEL or "gemini-2.5-pro"
+    return asyncio.run(analyze_pdf_doc_understanding_async(pdf_path, model_name))
 
-    # Inline PDF bytes (limit ~20MB for inline)
-    path = pathlib.Path(pdf_path)
-    pdf_bytes = path.read_bytes()
-    if len(pdf_bytes) > 20 * 1024 * 1024:
+
+async def analyze_pdf_doc_understanding_async(
+    pdf_path: str,
+    model_name: Optional[str] = None,
+    *,
+    data: Optional[PdfBuffer] = None,
+    pre: Optional[PreprocessResult] = None,
+) -> Dict[str, Any]:
+    """
+    Same as analyze_pdf_doc_understanding, on the async genai client (non-blocking for the worker loop).
+    `pre` is the deck already run through _load_pdf (analyze_deck_async), so it isn't compressed twice.
+    """
+    model_to_use = resolve_model_name(model_name)
+    if pre is None:
+        pre = await asyncio.to_thread(_load_pdf, pdf_path, data=data)
+    elif pre.bytes_out > INLINE_LIMIT_BYTES:
         raise ValueError("PDF exceeds ~20MB inline limit. Use Files API or page-wise fallback.")
 
-    # Page count for meta
-    try:
-        with fitz.open(pdf_path) as doc:
-            pages_count = doc.page_count
-    except Exception:
-        pages_count = 0
+    model_started = time.perf_counter()
+    data, info = await _call_model(model_to_use, pre.pdf_bytes, pages=pre.pages_count)
+    data = _record_timings(_patch_meta(data, info["model"], pre.pages_count), pre, model_started)
+    data["meta"]["calls"] = _call_summary([info])
+    return data
 
-    client = genai.Client(api_key=GOOGLE_API_KEY)
 
-    contents = [
-        types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf"),
-        PROMPT,
+# ========= Chunked (map-reduce) mode for large decks =========
+
+BATCH_PROMPT_SUFFIX = """
+
+EXCERPT CONTEXT:
+- This PDF is an excerpt: slides {start}-{end} of a {total}-slide deck.
+- Analyze only what is in this excerpt; other slides are analyzed separately.
+- Page numbers in "evidence" must be 1-based RELATIVE TO THIS EXCERPT (first page of the excerpt = 1).
+""".rstrip()
+
+# Caps applied after merging, mirroring the ranges requested in PROMPT
+MERGE_LIMITS = {"themes": 6, "strengths": 7, "risks": 7, "questions": 10}
+
+
+def _page_batches(pages_count: int, batch_pages: int) -> List[Tuple[int, int]]:
+    """0-based inclusive (start, end) page ranges."""
+    return [
+        (start, min(start + batch_pages, pages_count) - 1)
+        for start in range(0, pages_count, batch_pages)
     ]
 
-    config = {
-        "response_mime_type": "application/json",
-        "response_schema": AnalysisSchema,  # Pydantic → structured output schema
-        "temperature": 0.2,
+
+def _extract_pages(doc: "fitz.Document", start: int, end: int) -> bytes:
+    with fitz.open() as part:
+        part.insert_pdf(doc, from_page=start, to_page=end)
+        return part.tobytes(garbage=3, deflate=True)
+
+
+def _norm(s: str) -> str:
+    return " ".join("".join(c for c in s.casefold() if c.isalnum() or c.isspace()).split())
+
+
+def _interleave_unique(lists: List[List[str]], limit: int) -> List[str]:
+    # Round-robin across batches so later slides get a voice, deduplicating case/punctuation variants.
+    out: List[str] = []
+    seen = set()
+    for i in range(max((len(l) for l in lists), default=0)):
+        for items in lists:
+            if i >= len(items):
+                continue
+            item = (items[i] or "").strip()
+            key = _norm(item)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            out.append(item)
+            if len(out) >= limit:
+                return out
+    return out
+
+
+def merge_analyses(parts: List[Tuple[int, Dict[str, Any]]], pages_count: int) -> Dict[str, Any]:
+    """
+    Reduce step: merge per-batch results into one AnalysisSchema-shaped dict.
+    `parts` is [(page_offset, partial)], where page_offset is the 0-based index of the batch's
+    first page; evidence pages are shifted by it so they refer to the full deck (1-based).
+    """
+    parts = sorted(parts, key=lambda p: p[0])
+    partials = [AnalysisSchema.model_validate(p).model_dump() for _, p in parts]
+
+    one_liner = next((p["one_liner"].strip() for p in partials if p.get("one_liner", "").strip()), "")
+
+    questions = {
+        shark: _interleave_unique(
+            [p["questions_by_shark"].get(shark, []) for p in partials], MERGE_LIMITS["questions"]
+        )
+        for shark in QuestionsByShark.model_fields
     }
 
-    resp = client.models.generate_content(
-        model=model_to_use,
-        contents=contents,
-        config=config,
-    )
+    evidence: Dict[str, Dict[str, Any]] = {}
+    for (offset, _), partial in zip(parts, partials):
+        for item in partial["evidence"]:
+            topic = (item.get("topic") or "").strip()
+            key = _norm(topic)
+            if not key:
+                continue
+            pages = {
+                p + offset for p in item.get("pages", [])
+                if isinstance(p, int) and 1 <= p + offset <= pages_count
+            }
+            entry = evidence.setdefault(key, {"topic": topic, "pages": set()})
+            entry["pages"] |= pages
 
-    # Prefer parsed if available; otherwise parse resp.text
-    if getattr(resp, "parsed", None):
-        # resp.parsed is a Pydantic model (AnalysisSchema)
-        data = resp.parsed.model_dump()
-    else:
-        text = (resp.text or "").strip()
-        cleaned = text.strip("`").lstrip()
-        if cleaned.lower().startswith("json"):
-            cleaned = cleaned[4:].lstrip()
-        data = json.loads(cleaned) if cleaned else {}
+    return {
+        "one_liner": one_liner,
+        "themes": _interleave_unique([p["themes"] for p in partials], MERGE_LIMITS["themes"]),
+        "strengths": _interleave_unique([p["strengths"] for p in partials], MERGE_LIMITS["strengths"]),
+        "risks": _interleave_unique([p["risks"] for p in partials], MERGE_LIMITS["risks"]),
+        "questions_by_shark": questions,
+        "evidence": [{"topic": e["topic"], "pages": sorted(e["pages"])} for e in evidence.values()],
+        "meta": {},
+    }
 
-    # Patch meta with deterministic values
-    data.setdefault("meta", {})
-    data["meta"]["model_used"] = model_to_use
-    data["meta"]["pages_count"] = pages_count
-    data["meta"]["processed_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
-    data["meta"]["schema_version"] = "1.0.0"
 
+def _split_deck(
+    pdf_path: str,
+    batch_pages: int,
+    data: Optional[PdfBuffer] = None,
+    pre: Optional[PreprocessResult] = None,
+) -> Tuple[PreprocessResult, List[Tuple[int, int, bytes]]]:
+    # Compress once for the whole deck, then cut the compressed document into batches
+    if pre is None:
+        pre = _load_pdf(pdf_path, enforce_inline_limit=False, data=data)
+    with fitz.open(stream=pre.pdf_bytes, filetype="pdf") as doc:
+        batches = [(start, end, _extract_pages(doc, start, end))
+                   for start, end in _page_batches(doc.page_count, batch_pages)]
+
+    for start, end, pdf_bytes in batches:
+        if len(pdf_bytes) > INLINE_LIMIT_BYTES:
+            raise ValueError(f"Slides {start + 1}-{end + 1} exceed ~20MB inline limit; lower CHUNK_BATCH_PAGES.")
+    return pre, batches
+
+
+async def analyze_pdf_chunked(
+    pdf_path: str,
+    model_name: Optional[str] = None,
+    *,
+    batch_pages: int = CHUNK_BATCH_PAGES,
+    max_parallel: int = CHUNK_MAX_PARALLEL,
+    data: Optional[PdfBuffer] = None,
+    pre: Optional[PreprocessResult] = None,
+) -> Dict[str, Any]:
+    """
+    Map-reduce document understanding: split the deck into page batches with PyMuPDF,
+    analyze the batches concurrently (at most max_parallel in flight), then merge.
+    """
+    model_to_use = resolve_model_name(model_name)
+    pre, batches = await asyncio.to_thread(_split_deck, pdf_path, batch_pages, data, pre)
+    pages_count = pre.pages_count
+
+    sem = asyncio.Semaphore(max(1, max_parallel))
+
+    infos: List[Dict[str, Any]] = []
+
+    async def _run_batch(start: int, end: int, pdf_bytes: bytes) -> Tuple[int, Dict[str, Any]]:
+        prompt = PROMPT + BATCH_PROMPT_SUFFIX.format(start=start + 1, end=end + 1, total=pages_count)
+        async with sem:
+            data, info = await _call_model(
+                model_to_use, pdf_bytes, prompt,
+                pages=end - start + 1, label=f"slides {start + 1}-{end + 1} ",
+            )
+        infos.append(info)
+        return start, data
+
+    model_started = time.perf_counter()
+    parts = await asyncio.gather(*(_run_batch(*b) for b in batches))
+
+    data = merge_analyses(list(parts), pages_count)
+    data = _record_timings(_patch_meta(data, _models_used(infos, model_to_use), pages_count), pre, model_started)
+    data["meta"]["batches"] = len(batches)
+    data["meta"]["calls"] = _call_summary(infos)
+    return data
+
+
+# ========= Incremental mode for revised decks =========
+
+INCREMENTAL_PROMPT_SUFFIX = """
+
+EXCERPT CONTEXT:
+- This PDF is an excerpt: slides {pages} of a {total}-slide deck, the slides that changed since
+  the previous version. The text of the other slides follows, for context.
+- "one_liner", "themes", "strengths", "risks" and "questions_by_shark" describe the WHOLE deck as it
+  is now (this excerpt plus the text below); nothing from an earlier version carries over.
+- "evidence" covers only this excerpt. Page numbers in "evidence" must be 1-based RELATIVE TO THIS
+  EXCERPT (first page of the excerpt = 1).
+
+OTHER SLIDES (text only):
+{context}
+""".rstrip()
+
+# Text of the slides outside an excerpt: cheaper than the page images (~chars/4 tokens vs.
+# TOKENS_PER_PDF_PAGE), clipped so it stays that way
+CONTEXT_SLIDE_MAX_CHARS = 600
+CONTEXT_MAX_CHARS = 24_000
+
+
+def remap_evidence(analysis: Dict[str, Any], page_map: Dict[int, int]) -> Dict[str, Any]:
+    """
+    Re-points an analysis at another page numbering. `page_map` is {new 0-based: old 0-based};
+    evidence on old pages without a new counterpart is dropped, and so is evidence left with no
+    page at all.
+    """
+    old_to_new = {old + 1: new + 1 for new, old in page_map.items()}
+    data = AnalysisSchema.model_validate(analysis).model_dump()
+    evidence = []
+    for item in data["evidence"]:
+        pages = sorted({old_to_new[p] for p in item["pages"] if p in old_to_new})
+        if pages:
+            evidence.append({"topic": item["topic"], "pages": pages})
+    data["evidence"] = evidence
+    return data
+
+
+def slide_context(texts: List[str], exclude: List[int]) -> str:
+    """'Slide n: text' lines for every slide not in `exclude` (0-based), clipped."""
+    skip = set(exclude)
+    lines = []
+    for i, text in enumerate(texts):
+        if i not in skip:
+            lines.append(f"Slide {i + 1}: {' '.join(text.split())[:CONTEXT_SLIDE_MAX_CHARS] or '(no text)'}")
+    return "\n".join(lines)[:CONTEXT_MAX_CHARS]
+
+
+def _split_changed(
+    pdf_path: str,
+    page_map: Dict[int, int],
+    batch_pages: int,
+    data: Optional[PdfBuffer] = None,
+) -> Tuple[PreprocessResult, List[int], List[Tuple[List[int], bytes]], List[str]]:
+    # One excerpt per batch_pages changed slides, wherever they are in the deck: scattered
+    # edits still cost one request, not one per run of pages. With no changed slide (slides
+    # only removed or reordered) slide 1 is sent, so the summary is still regenerated.
+    pre = _load_pdf(pdf_path, enforce_inline_limit=False, data=data)
+    excerpts = []
+    with fitz.open(stream=pre.pdf_bytes, filetype="pdf") as doc:
+        texts = [page.get_text("text") for page in doc]
+        changed = [i for i in range(doc.page_count) if i not in page_map] or [0]
+        for i in range(0, len(changed), batch_pages):
+            pages = changed[i:i + batch_pages]
+            with fitz.open() as part:
+                for page in pages:
+                    part.insert_pdf(doc, from_page=page, to_page=page)
+                excerpts.append((pages, part.tobytes(garbage=3, deflate=True)))
+
+    for pages, pdf_bytes in excerpts:
+        if len(pdf_bytes) > INLINE_LIMIT_BYTES:
+            raise ValueError(f"Changed slides {pages[0] + 1}-{pages[-1] + 1} exceed ~20MB inline limit; "
+                             "lower CHUNK_BATCH_PAGES.")
+    return pre, changed, excerpts, texts
+
+
+async def analyze_pdf_incremental(
+    pdf_path: str,
+    base: Dict[str, Any],
+    page_map: Dict[int, int],
+    model_name: Optional[str] = None,
+    *,
+    base_ref: Optional[Dict[str, Any]] = None,
+    batch_pages: int = CHUNK_BATCH_PAGES,
+    max_parallel: int = CHUNK_MAX_PARALLEL,
+    data: Optional[PdfBuffer] = None,
+) -> Dict[str, Any]:
+    """
+    Re-analysis of a revised deck. `page_map` ({new: old}, 0-based; see
+    page_fingerprints.match_pages) lists the unchanged pages; only the others go to the model,
+    as excerpts, each with the text of the remaining slides as context.
+
+    Only `base`'s evidence is reused (moved to the new page numbers; evidence on removed or
+    changed slides is dropped). The summary fields (one-liner, themes, strengths, risks,
+    questions) come from the excerpt calls alone, so claims from slides that changed or were
+    removed don't survive. This is not equivalent to a full analysis: unchanged slides reach
+    the model as text only, so what they say only visually (charts, screenshots) weighs less.
+    INCREMENTAL_MAX_CHAIN bounds how many revisions in a row are analyzed this way.
+    meta.incremental records which pages were reused.
+    """
+    model_to_use = resolve_model_name(model_name)
+    pre, changed, excerpts, texts = await asyncio.to_thread(_split_changed, pdf_path, page_map, batch_pages, data)
+    pages_count = pre.pages_count
+
+    sem = asyncio.Semaphore(max(1, max_parallel))
+    infos: List[Dict[str, Any]] = []
+    context_tokens: List[int] = []
+
+    async def _run_excerpt(pages: List[int], pdf_bytes: bytes) -> Tuple[int, Dict[str, Any]]:
+        listed = ", ".join(str(p + 1) for p in pages)
+        context = slide_context(texts, pages)
+        context_tokens.append(len(context) // 4)
+        prompt = PROMPT + INCREMENTAL_PROMPT_SUFFIX.format(pages=listed, total=pages_count, context=context)
+        async with sem:
+            data, info = await _call_model(model_to_use, pdf_bytes, prompt,
+                                           pages=len(pages) + context_tokens[-1] // TOKENS_PER_PDF_PAGE,
+                                           label=f"changed slides {listed} ")
+        infos.append(info)
+        # Excerpt page k is deck page pages[k]; merge_analyses then needs no offset
+        return 0, remap_evidence(data, {page: k for k, page in enumerate(pages)})
+
+    model_started = time.perf_counter()
+    parts = list(await asyncio.gather(*(_run_excerpt(*e) for e in excerpts)))
+    # The previous version contributes evidence only; listed last (merge order is stable) so the
+    # fresh parts' one-liner and ordering win
+    parts.append((0, {"evidence": remap_evidence(base, page_map)["evidence"]}))
+
+    data = merge_analyses(parts, pages_count)
+    data = _record_timings(_patch_meta(data, _models_used(infos, model_to_use), pages_count), pre, model_started)
+    data["meta"]["batches"] = len(excerpts)
+    data["meta"]["calls"] = _call_summary(infos)
+    chain = int(((base.get("meta") or {}).get("incremental") or {}).get("chain", 0))
+    data["meta"]["incremental"] = {
+        **(base_ref or {}),
+        "chain": chain + 1,
+        "reused": "evidence",  # summary fields are regenerated, never carried over
+        "reused_pages": sorted(new + 1 for new in page_map),
+        "analyzed_pages": [p + 1 for p in changed],
+        "page_map": {str(new + 1): old + 1 for new, old in sorted(page_map.items())},
+        # vs. one request for the whole deck
+        "est_tokens_saved": estimate_request_tokens(pages_count)
+        - sum(estimate_request_tokens(len(pages)) for pages, _ in excerpts) - sum(context_tokens),
+    }
     return data
-# todo: add a retry function n handle errors gracefully
-# verify if the json is valid else retry
\ No newline at end of file
+
+
+def should_chunk(pre: PreprocessResult) -> bool:
+    """
+    Decided on what the model would actually receive: a deck that compresses below the
+    thresholds stays single-shot. pages_count is 0 when PyMuPDF couldn't parse the deck.
+    """
+    if pre.bytes_out > min(CHUNK_THRESHOLD_BYTES, INLINE_LIMIT_BYTES):
+        return True
+    return pre.pages_count > CHUNK_THRESHOLD_PAGES
+
+
+async def analyze_deck_async(
+    pdf_path: str,
+    model_name: Optional[str] = None,
+    *,
+    data: Optional[PdfBuffer] = None,
+) -> Dict[str, Any]:
+    """
+    Entry point for the worker: single-shot for small decks, map-reduce for large ones.
+    `data` is the job's shared buffer of the deck (storage.open_deck); without it the file at
+    pdf_path is read.
+    """
+    pre = await asyncio.to_thread(_load_pdf, pdf_path, enforce_inline_limit=False, data=data)
+    if should_chunk(pre):
+        return await analyze_pdf_chunked(pdf_path, model_name, data=data, pre=pre)
+    return await analyze_pdf_doc_understanding_async(pdf_path, model_name, data=data, pre=pre)
+
+
+def analyze_deck(pdf_path: str, model_name: Optional[str] = None) -> Dict[str, Any]:
+    """Blocking wrapper around analyze_deck_async for scripts (not for use inside a running loop)."""
+    return asyncio.run(analyze_deck_async(pdf_path, model_name))
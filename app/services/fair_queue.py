@@ -0,0 +1,186 @@
+# app/services/fair_queue.py
+"""
+Per-owner fairness for deck jobs, on the shared Redis.
+
+Two lanes: uploads go to the interactive queue unless the owner already has
+OWNER_INTERACTIVE_MAX jobs pending, in which case they (like re-analysis/bulk work) go to the
+bulk queue. Workers drain the interactive queue first (queue_order_strategy=priority).
+
+On top of that, at most OWNER_MAX_RUNNING jobs per owner run at once across all workers: a
+job over the cap is deferred (Celery retry to the bulk queue with a countdown), so one account
+bulk-uploading 50 decks can't hold every worker slot. On the Redis broker a countdown message
+doesn't wait in the queue: a worker fetches it right away and holds it unacked until its ETA,
+then runs it (and it may be deferred again). Deferred jobs are therefore not in queue_depths();
+they still count in the owner's pending set. To bound that churn the countdown doubles per
+deferral (OWNER_DEFER_S .. OWNER_DEFER_MAX_S, jittered) and after OWNER_MAX_DEFERRALS the job
+runs even if the owner is still at the cap.
+
+Both counts are per-job leases: a sorted set per owner of deck_id -> deadline, pruned of expired
+members by every script that reads it. A running job renews its lease (heartbeat) every
+OWNER_RUNNING_LEASE_S / 3, so a worker killed mid-job frees the owner's slot within
+OWNER_RUNNING_LEASE_S; a job that is enqueued and never starts stops counting after
+OWNER_PENDING_LEASE_S. Nothing extends another job's lease.
+"""
+from __future__ import annotations
+
+import random
+import time
+from typing import Dict, Optional
+
+from app.core.config import (
+    DECK_QUEUE_BULK,
+    DECK_QUEUE_INTERACTIVE,
+    OWNER_DEFER_MAX_S,
+    OWNER_DEFER_S,
+    OWNER_INTERACTIVE_MAX,
+    OWNER_MAX_RUNNING,
+    OWNER_PENDING_LEASE_S,
+    OWNER_RUNNING_LEASE_S,
+)
+from app.core.redis import get_redis
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+LANE_QUEUES = {LANE_INTERACTIVE: DECK_QUEUE_INTERACTIVE, LANE_BULK: DECK_QUEUE_BULK}
+
+PENDING_KEY = "deck-owner:pending:"   # ZSET deck_id -> lease deadline: enqueued and not finished
+RUNNING_KEY = "deck-owner:running:"   # ZSET deck_id -> lease deadline: running now
+HEARTBEAT_S = max(1.0, OWNER_RUNNING_LEASE_S / 3)
+
+# kombu.transport.redis list naming (Channel.sep / PRIORITY_STEPS)
+_KOMBU_SEP = "\x06\x16"
+PRIORITY_STEPS = (0, 3, 6, 9)
+
+# Leases: ARGV[1] = now. Each script drops expired members first; the key itself expires with
+# its longest lease, so an owner who stops uploading leaves nothing behind.
+
+# Add/extend one job's lease (ARGV: now, deck_id, deadline, key ttl); returns live members
+_REGISTER = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[2])
+if redis.call('TTL', KEYS[1]) < tonumber(ARGV[4]) then redis.call('EXPIRE', KEYS[1], ARGV[4]) end
+return redis.call('ZCARD', KEYS[1])
+"""
+# Take a running slot while under the cap (ARGV: now, deck_id, deadline, key ttl, cap); a job
+# that already holds one (redelivery) keeps it. Its pending lease is moved onto the same short,
+# heartbeat-renewed deadline (re-added if it had lapsed). Returns the running count or -1
+_ACQUIRE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if not redis.call('ZSCORE', KEYS[1], ARGV[2]) and redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[5]) then
+  return -1
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[2])
+if redis.call('TTL', KEYS[2]) < tonumber(ARGV[4]) then redis.call('EXPIRE', KEYS[2], ARGV[4]) end
+return redis.call('ZCARD', KEYS[1])
+"""
+# Heartbeat (ARGV: now, deck_id, deadline, key ttl): extend leases the job still holds
+_RENEW = """
+for _, key in ipairs(KEYS) do
+  if redis.call('ZADD', key, 'XX', 'CH', ARGV[3], ARGV[2]) == 1 then
+    if redis.call('TTL', key) < tonumber(ARGV[4]) then redis.call('EXPIRE', key, ARGV[4]) end
+  end
+end
+return 1
+"""
+# Drop one job's lease (ARGV: now, deck_id); returns live members left
+_RELEASE = """
+redis.call('ZREM', KEYS[1], ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local n = redis.call('ZCARD', KEYS[1])
+if n == 0 then redis.call('DEL', KEYS[1]) end
+return n
+"""
+
+
+def owner_load_bucket(pending: int) -> str:
+    """Bounded label for metrics: how busy the owner was when the job was enqueued."""
+    if pending <= 1:
+        return "1"
+    if pending <= OWNER_INTERACTIVE_MAX:
+        return f"2-{OWNER_INTERACTIVE_MAX}"
+    return f">{OWNER_INTERACTIVE_MAX}"
+
+
+def register_pending(owner: Optional[str], deck_id: str) -> int:
+    """
+    Lease a newly enqueued job for its owner; returns the owner's pending jobs (incl. this one).
+    Also called when a job is deferred, so its lease covers the extra wait.
+    """
+    if not owner:
+        return 1
+    now = time.time()
+    try:
+        return int(get_redis().eval(_REGISTER, 1, PENDING_KEY + owner,
+                                    now, deck_id, now + OWNER_PENDING_LEASE_S, OWNER_PENDING_LEASE_S))
+    except Exception as exc:
+        print(f"[fair_queue] pending count failed for {owner}: {exc}")
+        return 1
+
+
+def finish_pending(owner: Optional[str], deck_id: str) -> None:
+    if owner:
+        _release(PENDING_KEY + owner, deck_id)
+
+
+def choose_lane(pending: int, requested: Optional[str] = None) -> str:
+    if requested == LANE_BULK or pending > OWNER_INTERACTIVE_MAX:
+        return LANE_BULK
+    return LANE_INTERACTIVE
+
+
+def try_start(owner: Optional[str], deck_id: str) -> bool:
+    """
+    Take one of the owner's running slots (a lease: call renew() every HEARTBEAT_S until
+    finish_running). Fails open if Redis is unavailable.
+    """
+    if not owner or OWNER_MAX_RUNNING <= 0:
+        return True
+    now = time.time()
+    try:
+        return int(get_redis().eval(_ACQUIRE, 2, RUNNING_KEY + owner, PENDING_KEY + owner, now, deck_id,
+                                    now + OWNER_RUNNING_LEASE_S, OWNER_RUNNING_LEASE_S, OWNER_MAX_RUNNING)) >= 0
+    except Exception as exc:
+        print(f"[fair_queue] running slot check failed for {owner}: {exc}")
+        return True
+
+
+def renew(owner: Optional[str], deck_id: str) -> None:
+    """Heartbeat of a running job: extends its running and pending leases (never re-adds a released one)."""
+    if not owner:
+        return
+    now = time.time()
+    keys = [PENDING_KEY + owner] + ([RUNNING_KEY + owner] if OWNER_MAX_RUNNING > 0 else [])
+    try:
+        get_redis().eval(_RENEW, len(keys), *keys, now, deck_id, now + OWNER_RUNNING_LEASE_S, OWNER_RUNNING_LEASE_S)
+    except Exception as exc:
+        print(f"[fair_queue] lease renewal failed for {owner}/{deck_id}: {exc}")
+
+
+def finish_running(owner: Optional[str], deck_id: str) -> None:
+    if owner and OWNER_MAX_RUNNING > 0:
+        _release(RUNNING_KEY + owner, deck_id)
+
+
+def queue_depths() -> Dict[str, int]:
+    """Messages waiting per lane; kombu's Redis transport keeps one list per priority step."""
+    pipe = get_redis().pipeline()
+    for queue in LANE_QUEUES.values():
+        for step in PRIORITY_STEPS:
+            pipe.llen(f"{queue}{_KOMBU_SEP}{step}" if step else queue)
+    sizes = pipe.execute()
+    per_lane = len(PRIORITY_STEPS)
+    return {lane: sum(sizes[i * per_lane:(i + 1) * per_lane]) for i, lane in enumerate(LANE_QUEUES)}
+
+
+def defer_countdown(deferrals: int = 0) -> float:
+    """Seconds until a job deferred `deferrals` times before is tried again."""
+    return min(OWNER_DEFER_S * 2 ** min(deferrals, 16), OWNER_DEFER_MAX_S) * random.uniform(0.5, 1.5)
+
+
+def _release(key: str, deck_id: str) -> None:
+    try:
+        get_redis().eval(_RELEASE, 1, key, time.time(), deck_id)
+    except Exception as exc:
+        print(f"[fair_queue] release failed for {key}/{deck_id}: {exc}")
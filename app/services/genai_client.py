@@ -0,0 +1,203 @@
+# app/services/genai_client.py
+"""
+Process-wide google-genai clients over pooled, keep-alive httpx connections.
+
+genai.Client() builds its own HTTP client (and a fresh TLS connection) each time; these
+helpers hand out one sync client per process and one async client per (process, event loop),
+created lazily and dropped after a fork or an auth/transport error so the next call rebuilds.
+
+Per-call timings come from httpcore trace events: `with track_call() as t:` around a request
+fills t.connect_ms (0 when a pooled connection was reused), t.upload_ms and t.generate_ms.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types
+
+from app.core.config import (
+    GEMINI_BASE_URL,
+    GEMINI_CONNECT_TIMEOUT_S,
+    GEMINI_KEEPALIVE_S,
+    GEMINI_MAX_CONNECTIONS,
+)
+
+RESET_STATUS = {401, 403}
+RESET_GRACE_S = 300.0
+
+_lock = threading.Lock()
+_sync: Optional[Tuple[int, genai.Client, httpx.Client]] = None
+_async: Dict[Tuple[int, int], Tuple[asyncio.AbstractEventLoop, genai.Client, httpx.AsyncClient]] = {}
+
+
+# ========= Per-call timings =========
+
+@dataclass
+class CallTimings:
+    started: float = field(default_factory=time.perf_counter)
+    marks: Dict[str, float] = field(default_factory=dict)
+    reused_connection: bool = True
+
+    def mark(self, event: str) -> None:
+        # First occurrence wins, except connect.complete: TCP, then TLS (when there is one)
+        if event == "connect.complete" or event not in self.marks:
+            self.marks[event] = time.perf_counter()
+
+    def _span(self, start: str, end: str) -> float:
+        if start in self.marks and end in self.marks:
+            return round((self.marks[end] - self.marks[start]) * 1000, 1)
+        return 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "connect_ms": self._span("connect.started", "connect.complete"),
+            "upload_ms": self._span("send.started", "send.complete"),
+            "generate_ms": self._span("send.complete", "receive.complete"),
+            "total_ms": round((self.marks.get("done", time.perf_counter()) - self.started) * 1000, 1),
+            "reused_connection": self.reused_connection,
+        }
+
+
+_current: contextvars.ContextVar[Optional[CallTimings]] = contextvars.ContextVar("genai_call_timings", default=None)
+
+# httpcore trace event -> our mark (HTTP/1.1 and HTTP/2 names)
+_TRACE_MARKS = {
+    "connection.connect_tcp.started": "connect.started",
+    "connection.connect_tcp.complete": "connect.complete",
+    "connection.start_tls.complete": "connect.complete",
+    "http11.send_request_headers.started": "send.started",
+    "http2.send_request_headers.started": "send.started",
+    "http11.send_request_body.complete": "send.complete",
+    "http2.send_request_body.complete": "send.complete",
+    "http11.receive_response_body.complete": "receive.complete",
+    "http2.receive_response_body.complete": "receive.complete",
+}
+
+
+def _on_trace(name: str) -> None:
+    timings = _current.get()
+    if timings is None:
+        return
+    mark = _TRACE_MARKS.get(name)
+    if mark == "connect.started":
+        timings.reused_connection = False
+    if mark:
+        timings.mark(mark)
+
+
+def _sync_trace(name: str, info: Dict[str, Any]) -> None:
+    _on_trace(name)
+
+
+async def _async_trace(name: str, info: Dict[str, Any]) -> None:
+    _on_trace(name)
+
+
+def _sync_hook(request: httpx.Request) -> None:
+    request.extensions["trace"] = _sync_trace
+
+
+async def _async_hook(request: httpx.Request) -> None:
+    request.extensions["trace"] = _async_trace
+
+
+@contextmanager
+def track_call() -> Iterator[CallTimings]:
+    timings = CallTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        timings.mark("done")
+        _current.reset(token)
+
+
+# ========= Clients =========
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=GEMINI_MAX_CONNECTIONS,
+        max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+        keepalive_expiry=GEMINI_KEEPALIVE_S,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    # Read timeout stays open: generation time is bounded per attempt by the call layer
+    return httpx.Timeout(None, connect=GEMINI_CONNECT_TIMEOUT_S)
+
+
+def _build(**http_clients: Any) -> genai.Client:
+    options: Dict[str, Any] = dict(http_clients)
+    if GEMINI_BASE_URL:
+        options["base_url"] = GEMINI_BASE_URL
+    # Read the key at build time so a rotated key is picked up after reset_clients()
+    return genai.Client(api_key=os.getenv("GOOGLE_API_KEY"), http_options=types.HttpOptions(**options))
+
+
+def get_client() -> genai.Client:
+    """Sync client for this process."""
+    global _sync
+    pid = os.getpid()
+    with _lock:
+        if _sync is None or _sync[0] != pid:
+            http = httpx.Client(limits=_limits(), timeout=_timeout(), event_hooks={"request": [_sync_hook]})
+            _sync = (pid, _build(httpx_client=http), http)
+        return _sync[1]
+
+
+def get_async_client() -> genai.Client:
+    """Client whose .aio side is bound to the running loop (httpx async pools are per loop)."""
+    loop = asyncio.get_running_loop()
+    key = (os.getpid(), id(loop))
+    with _lock:
+        for k, (other, _, _) in list(_async.items()):
+            if k[0] != key[0] or other.is_closed():
+                del _async[k]
+        entry = _async.get(key)
+        if entry is None or entry[0] is not loop:
+            http = httpx.AsyncClient(limits=_limits(), timeout=_timeout(), event_hooks={"request": [_async_hook]})
+            entry = (loop, _build(httpx_async_client=http), http)
+            _async[key] = entry
+        return entry[1]
+
+
+def reset_clients(reason: str = "") -> None:
+    """Drop this process's clients; the next get_*client() builds fresh ones."""
+    global _sync
+    pid = os.getpid()
+    with _lock:
+        stale_sync = _sync[2] if _sync is not None and _sync[0] == pid else None
+        if stale_sync is not None:
+            _sync = None
+        stale_async = [_async.pop(k) for k in [k for k in _async if k[0] == pid]]
+
+    # Other jobs may still have requests in flight on the old pools: close them after a grace period
+    if stale_sync is not None:
+        # Daemon: a pending close must not keep the process alive for RESET_GRACE_S at shutdown
+        timer = threading.Timer(RESET_GRACE_S, stale_sync.close)
+        timer.daemon = True
+        timer.start()
+    for loop, _, http in stale_async:
+        if loop.is_running():
+            loop.call_soon_threadsafe(
+                loop.call_later, RESET_GRACE_S, lambda h=http: asyncio.ensure_future(h.aclose())
+            )
+    print(f"[genai_client] clients reset (pid={pid}){': ' + reason if reason else ''}")
+
+
+def should_reset(exc: BaseException) -> bool:
+    """Auth failures (rotated/revoked key) and broken transports warrant a fresh client."""
+    if isinstance(exc, (httpx.TransportError, ConnectionError)):
+        return True
+    return isinstance(exc, genai_errors.APIError) and getattr(exc, "code", None) in RESET_STATUS
@@ -19,6 +19,6 @@ def mint_token(*, identity: str, name: str, room_name: str, role: str, metadata:
             "canPublish": True,
             "canSubscribe": True,
         },
-        "metadata": json.dumps(metadata or {}),
+        "metadata": json.dumps(metadata or {}, separators=(",", ":")),
     }
     return jwt.encode(claims, LIVEKIT_API_SECRET, algorithm="HS256")
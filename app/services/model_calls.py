@@ -0,0 +1,200 @@
+# app/services/model_calls.py
+"""
+Resilient Gemini calls: a per-attempt timeout, retries with exponential backoff + full jitter
+for transient failures (timeouts, 429/5xx, transport errors, responses that fail validation),
+and optional hedging: if the primary has not answered after its observed p95 latency, a second
+request (optionally on a faster model) is started and the first VALID result wins.
+
+Callers pass `call(model) -> awaitable raw dict`, `validate(dict) -> dict` and optionally
+`admit()` (e.g. the rate limiter, awaited before each attempt and outside its timeout);
+nothing here knows about decks or prompts.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from google.genai import errors as genai_errors
+
+from app.core.config import (
+    GEMINI_ATTEMPT_TIMEOUT_S,
+    GEMINI_BACKOFF_BASE_S,
+    GEMINI_BACKOFF_MAX_S,
+    GEMINI_MAX_ATTEMPTS,
+    HEDGE_DELAY_DEFAULT_S,
+    HEDGE_DELAY_MIN_S,
+)
+
+Call = Callable[[str], Awaitable[Dict[str, Any]]]
+Validate = Callable[[Dict[str, Any]], Dict[str, Any]]
+Admit = Callable[[], Awaitable[Any]]
+
+# 401 included: the client is rebuilt (re-reading GOOGLE_API_KEY) before the retry
+RETRYABLE_STATUS = {401, 408, 429, 500, 502, 503, 504}
+
+
+class InvalidResponse(Exception):
+    """The model answered, but not with something matching the schema."""
+
+
+class ModelCallFailed(Exception):
+    def __init__(self, model: str, attempts: List[Dict[str, Any]]):
+        self.model = model
+        self.attempts = attempts
+        last = attempts[-1]["error"] if attempts else "no attempts"
+        super().__init__(f"{model} failed after {len(attempts)} attempt(s): {last}")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = GEMINI_MAX_ATTEMPTS
+    attempt_timeout_s: float = GEMINI_ATTEMPT_TIMEOUT_S
+    backoff_base_s: float = GEMINI_BACKOFF_BASE_S
+    backoff_max_s: float = GEMINI_BACKOFF_MAX_S
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: uniform(0, min(cap, base * 2^(attempt-1)))
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** (attempt - 1)))
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, InvalidResponse, httpx.TransportError, ConnectionError)):
+        return True
+    if isinstance(exc, genai_errors.APIError):
+        return getattr(exc, "code", None) in RETRYABLE_STATUS
+    return False
+
+
+# ========= Latency tracking (for the hedge delay) =========
+
+@dataclass
+class LatencyTracker:
+    """Rolling window of successful call latencies per model, in this process."""
+
+    window: int = 200
+    min_samples: int = 20
+    _samples: Dict[str, Deque[float]] = field(default_factory=dict)
+
+    def observe(self, model: str, seconds: float) -> None:
+        self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, model: str, q: float) -> Optional[float]:
+        samples = self._samples.get(model)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self, model: str, q: float = 0.95) -> float:
+        p = self.quantile(model, q)
+        return max(HEDGE_DELAY_MIN_S, p if p is not None else HEDGE_DELAY_DEFAULT_S)
+
+
+latency_tracker = LatencyTracker()
+
+
+# ========= Retry + hedge =========
+
+async def call_with_retries(
+    call: Call,
+    validate: Validate,
+    model: str,
+    policy: RetryPolicy = RetryPolicy(),
+    *,
+    admit: Optional[Admit] = None,
+    tracker: LatencyTracker = latency_tracker,
+    label: str = "",
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Returns (validated data, info). Raises ModelCallFailed once attempts are exhausted."""
+    attempts: List[Dict[str, Any]] = []
+    for attempt in range(1, max(1, policy.max_attempts) + 1):
+        if admit is not None:
+            await admit()
+        started = time.perf_counter()
+        try:
+            raw = await asyncio.wait_for(call(model), timeout=policy.attempt_timeout_s)
+            try:
+                data = validate(raw)
+            except Exception as exc:
+                raise InvalidResponse(str(exc)[:300]) from exc
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            elapsed = time.perf_counter() - started
+            attempts.append({"model": model, "error": f"{exc.__class__.__name__}: {exc}"[:300],
+                             "ms": round(elapsed * 1000, 1)})
+            if not is_retryable(exc) or attempt >= policy.max_attempts:
+                raise ModelCallFailed(model, attempts) from exc
+            delay = policy.backoff(attempt)
+            print(f"[model_calls] {label}{model} attempt {attempt} failed ({attempts[-1]['error']}); "
+                  f"retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        elapsed = time.perf_counter() - started
+        tracker.observe(model, elapsed)
+        return data, {"model": model, "attempts": attempt, "failures": attempts,
+                      "ms": round(elapsed * 1000, 1)}
+    raise ModelCallFailed(model, attempts)  # unreachable; keeps type checkers happy
+
+
+async def hedged_call(
+    call: Call,
+    validate: Validate,
+    model: str,
+    *,
+    hedge_model: Optional[str] = None,
+    hedge: bool = False,
+    policy: RetryPolicy = RetryPolicy(),
+    admit: Optional[Admit] = None,
+    tracker: LatencyTracker = latency_tracker,
+    label: str = "",
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Primary call with retries; when hedging, a second call (on hedge_model, default: the same
+    model) starts after the primary's p95 latency. Returns the first valid result and cancels
+    the other request. info["hedged"]/info["winner"] record what happened.
+    """
+    def _attempts(on_model: str) -> "asyncio.Future":
+        return asyncio.ensure_future(
+            call_with_retries(call, validate, on_model, policy, admit=admit, tracker=tracker, label=label)
+        )
+
+    primary = _attempts(model)
+    tasks = {primary: "primary"}
+    try:
+        if not hedge:
+            data, info = await primary
+            return data, {**info, "hedged": False, "winner": "primary"}
+
+        delay = tracker.hedge_delay(model)
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            data, info = primary.result()
+            return data, {**info, "hedged": False, "winner": "primary"}
+
+        backup_model = hedge_model or model
+        print(f"[model_calls] {label}{model} slower than {delay:.1f}s; hedging on {backup_model}")
+        tasks[_attempts(backup_model)] = "hedge"
+        pending = set(tasks)
+        errors: List[BaseException] = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    data, info = task.result()
+                    return data, {**info, "hedged": True, "winner": tasks[task],
+                                  "hedge_delay_s": round(delay, 2)}
+                errors.append(task.exception())
+        raise errors[0]
+    finally:
+        # Loser (or everything, if we were cancelled) is cancelled, so its request is dropped
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,125 @@
+# app/services/page_fingerprints.py
+"""
+Per-page fingerprints for incremental re-analysis of revised decks.
+
+Each page gets
+  t  hash of its normalized text (any wording/number change => different page)
+  i  64-bit difference hash of a tiny grayscale render (charts/images/layout, tolerant of
+     re-export and compression noise)
+Two pages match when the text hashes are equal and the render hashes are within
+PAGE_IMAGE_MAX_DISTANCE bits. Stored on Deck.pageFingerprints as fingerprint_record(...).
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import fitz  # PyMuPDF
+
+from app.core.config import INCREMENTAL_MIN_MATCH, PAGE_IMAGE_MAX_DISTANCE
+from app.services.storage import PdfBuffer
+
+T = TypeVar("T")
+
+# Bump when the hashing changes; records with another version are never compared
+FINGERPRINT_VERSION = 1
+
+_HASH_W, _HASH_H = 9, 8      # dHash grid: 8 comparisons per row x 8 rows
+_RENDER_WIDTH_PX = 72
+
+
+def _text_hash(page: "fitz.Page") -> str:
+    text = " ".join(page.get_text("text").split()).casefold()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _render_hash(page: "fitz.Page") -> str:
+    scale = _RENDER_WIDTH_PX / max(page.rect.width, 1.0)
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+    w, h, stride, samples = pix.width, pix.height, pix.stride, pix.samples
+
+    # Box-average the render down to a 9x8 grid, then one bit per "left brighter than right"
+    grid = []
+    for gy in range(_HASH_H):
+        y0, y1 = gy * h // _HASH_H, max((gy + 1) * h // _HASH_H, gy * h // _HASH_H + 1)
+        row = []
+        for gx in range(_HASH_W):
+            x0, x1 = gx * w // _HASH_W, max((gx + 1) * w // _HASH_W, gx * w // _HASH_W + 1)
+            total = sum(sum(samples[y * stride + x0:y * stride + x1]) for y in range(y0, y1))
+            row.append(total / ((y1 - y0) * (x1 - x0)))
+        grid.append(row)
+    bits = 0
+    for row in grid:
+        for left, right in zip(row, row[1:]):
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def fingerprint_pdf(pdf_path: str, data: Optional[PdfBuffer] = None) -> List[Dict[str, str]]:
+    """Fingerprints of every page, in order (a few ms per page). Reads `data` instead of the file when given."""
+    with (fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(pdf_path)) as doc:
+        return [{"t": _text_hash(page), "i": _render_hash(page)} for page in doc]
+
+
+def fingerprint_record(pages: List[Dict[str, str]], namespace: str) -> Dict[str, Any]:
+    """Deck.pageFingerprints value. `namespace` is the analysis cache namespace (prompt + schema)."""
+    return {"v": FINGERPRINT_VERSION, "ns": namespace, "pages": pages}
+
+
+def record_pages(record: Any, namespace: str) -> Optional[List[Dict[str, str]]]:
+    """Pages of a stored record, or None if it was made by another fingerprint version/prompt."""
+    if not isinstance(record, dict) or record.get("v") != FINGERPRINT_VERSION or record.get("ns") != namespace:
+        return None
+    pages = record.get("pages")
+    return pages if isinstance(pages, list) else None
+
+
+def _distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def match_pages(
+    new: List[Dict[str, str]],
+    old: List[Dict[str, str]],
+    max_distance: int = PAGE_IMAGE_MAX_DISTANCE,
+) -> Dict[int, int]:
+    """
+    {new page index: old page index} (0-based) for unchanged pages. Each old page is used once;
+    among equal candidates the closest render, then the closest position wins, so duplicated
+    slides (section dividers, "Thank you") pair up in order.
+    """
+    by_text: Dict[str, List[int]] = defaultdict(list)
+    for j, fp in enumerate(old):
+        by_text[fp["t"]].append(j)
+
+    used = set()
+    mapping: Dict[int, int] = {}
+    for i, fp in enumerate(new):
+        best: Optional[Tuple[Tuple[int, int], int]] = None
+        for j in by_text.get(fp["t"], ()):
+            if j in used:
+                continue
+            d = _distance(fp["i"], old[j]["i"])
+            if d <= max_distance and (best is None or (d, abs(j - i)) < best[0]):
+                best = ((d, abs(j - i)), j)
+        if best is not None:
+            used.add(best[1])
+            mapping[i] = best[1]
+    return mapping
+
+
+def pick_base(
+    new: List[Dict[str, str]],
+    candidates: Iterable[Tuple[T, List[Dict[str, str]]]],
+    min_match: float = INCREMENTAL_MIN_MATCH,
+) -> Optional[Tuple[T, Dict[int, int]]]:
+    """Best (candidate, page map) covering at least min_match of the new deck's pages."""
+    best: Optional[Tuple[T, Dict[int, int]]] = None
+    for candidate, old in candidates:
+        if not new or not old:
+            continue
+        mapping = match_pages(new, old)
+        if len(mapping) / len(new) >= min_match and (best is None or len(mapping) > len(best[1])):
+            best = (candidate, mapping)
+    return best
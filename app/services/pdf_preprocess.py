@@ -0,0 +1,99 @@
+# app/services/pdf_preprocess.py
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import fitz  # PyMuPDF
+
+from app.core.config import (
+    PDF_COMPRESS_DPI_TARGET,
+    PDF_COMPRESS_DPI_THRESHOLD,
+    PDF_COMPRESS_ENABLED,
+    PDF_COMPRESS_JPEG_QUALITY,
+    PDF_COMPRESS_MIN_BYTES,
+)
+from app.services.storage import PdfBuffer
+
+
+@dataclass
+class PreprocessResult:
+    pdf_bytes: PdfBuffer  # the input buffer itself when compression didn't apply
+    pages_count: int
+    bytes_in: int
+    bytes_out: int
+    elapsed_ms: float
+    applied: bool
+    open_ms: float = 0.0  # fitz.open alone (part of elapsed_ms)
+    read_ms: float = 0.0  # reading the file, when the caller did (not part of elapsed_ms)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "applied": self.applied,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else 1.0,
+            "ms": round(self.elapsed_ms, 1),
+            "open_ms": round(self.open_ms, 1),
+            "read_ms": round(self.read_ms, 1),
+        }
+
+
+def compress_pdf(
+    pdf_bytes: PdfBuffer,
+    *,
+    enabled: bool = PDF_COMPRESS_ENABLED,
+    min_bytes: int = PDF_COMPRESS_MIN_BYTES,
+    dpi_threshold: int = PDF_COMPRESS_DPI_THRESHOLD,
+    dpi_target: int = PDF_COMPRESS_DPI_TARGET,
+    jpeg_quality: int = PDF_COMPRESS_JPEG_QUALITY,
+) -> PreprocessResult:
+    """
+    Shrinks image-heavy decks (Keynote/Canva exports) before they are sent to the model:
+    images rendered above dpi_threshold are resampled to dpi_target and re-encoded, fonts are
+    subset, and unused/duplicate objects are dropped on rewrite. The original bytes are kept
+    when the deck is small, compression fails, or the rewrite isn't actually smaller.
+    """
+    started = time.perf_counter()
+    size_in = len(pdf_bytes)
+
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    open_ms = (time.perf_counter() - started) * 1000
+    with doc:
+        pages_count = doc.page_count
+        out = pdf_bytes
+        if enabled and size_in >= min_bytes:
+            try:
+                doc.rewrite_images(
+                    dpi_threshold=dpi_threshold,
+                    dpi_target=dpi_target,
+                    quality=jpeg_quality,
+                )
+                try:
+                    doc.subset_fonts()
+                except Exception:
+                    pass  # fonts without subsetting support are left as-is
+                out = doc.tobytes(
+                    garbage=4,
+                    deflate=True,
+                    deflate_images=True,
+                    deflate_fonts=True,
+                    clean=True,
+                    use_objstms=1,
+                )
+            except Exception as exc:
+                print(f"[pdf_preprocess] compression skipped: {exc}")
+                out = pdf_bytes
+
+    if len(out) >= size_in:
+        out = pdf_bytes
+    return PreprocessResult(
+        pdf_bytes=out,
+        pages_count=pages_count,
+        bytes_in=size_in,
+        bytes_out=len(out),
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        applied=out is not pdf_bytes,
+        open_ms=open_ms,
+    )
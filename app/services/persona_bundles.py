@@ -0,0 +1,114 @@
+# app/services/persona_bundles.py
+"""
+Precomputed persona instruction bundles (all five sharks) per DeckAnalysis.
+
+The worker builds the bundle once when it persists an analysis, stores it compactly on the
+row (DeckAnalysis.personaBundle) and in Redis. Session creation is then an in-process LRU hit
+or one Redis GET keyed by analysis id. Keys embed PERSONA_BUNDLE_VERSION, so editing
+BASE_STYLE or PERSONA_BULLETS invalidates every bundle without a flush.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.redis import get_async_redis
+from app.services.persona_prompts import PERSONA_BUNDLE_VERSION, build_persona_bundle
+
+BUNDLE_TTL_S = 7 * 24 * 3600
+LOCAL_MAX_ENTRIES = 512
+
+_local: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+_local_lock = threading.Lock()
+
+
+# ========= Compact encoding =========
+
+def encode_bundle(bundle: Dict[str, str]) -> bytes:
+    # The five strings share most of their text, so zlib shrinks them several-fold
+    return zlib.compress(json.dumps(bundle, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def decode_bundle(blob: bytes) -> Dict[str, str]:
+    return json.loads(zlib.decompress(blob))
+
+
+def bundle_column(bundle: Dict[str, str]) -> Dict[str, str]:
+    """Json value for DeckAnalysis.personaBundle."""
+    return {"v": PERSONA_BUNDLE_VERSION, "z": base64.b64encode(encode_bundle(bundle)).decode("ascii")}
+
+
+def bundle_from_column(value: Any) -> Optional[Dict[str, str]]:
+    if not isinstance(value, dict) or value.get("v") != PERSONA_BUNDLE_VERSION:
+        return None
+    try:
+        return decode_bundle(base64.b64decode(value["z"]))
+    except Exception:
+        return None
+
+
+# ========= Cache layers =========
+
+def bundle_key(analysis_id: str) -> str:
+    return f"persona-bundle:{PERSONA_BUNDLE_VERSION}:{analysis_id}"
+
+
+def _local_get(key: str) -> Optional[Dict[str, str]]:
+    with _local_lock:
+        bundle = _local.get(key)
+        if bundle is not None:
+            _local.move_to_end(key)
+        return bundle
+
+
+def _local_put(key: str, bundle: Dict[str, str]) -> None:
+    with _local_lock:
+        _local[key] = bundle
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+async def publish_bundle(analysis_id: str, bundle: Dict[str, str]) -> None:
+    """Called by the worker right after persisting an analysis (best effort)."""
+    key = bundle_key(analysis_id)
+    _local_put(key, bundle)
+    try:
+        await get_async_redis().set(key, encode_bundle(bundle), ex=BUNDLE_TTL_S)
+    except Exception as exc:
+        print(f"[persona_bundles] redis set failed for {analysis_id}: {exc}")
+
+
+async def get_bundle(
+    analysis_id: str,
+    load_analysis: Callable[[str], Awaitable[Any]],
+) -> Optional[Dict[str, str]]:
+    """
+    In-process LRU → Redis → the DeckAnalysis row (stored bundle, or rebuilt from resultJson
+    when the stored one predates the current version). load_analysis(id) returns the row.
+    """
+    key = bundle_key(analysis_id)
+    bundle = _local_get(key)
+    if bundle is not None:
+        return bundle
+
+    try:
+        blob = await get_async_redis().get(key)
+    except Exception as exc:
+        print(f"[persona_bundles] redis get failed for {analysis_id}: {exc}")
+        blob = None
+    if blob:
+        bundle = decode_bundle(blob)
+        _local_put(key, bundle)
+        return bundle
+
+    row = await load_analysis(analysis_id)
+    if row is None:
+        return None
+    bundle = bundle_from_column(getattr(row, "personaBundle", None)) or build_persona_bundle(row.resultJson)
+    await publish_bundle(analysis_id, bundle)
+    return bundle
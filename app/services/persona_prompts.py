@@ -1,4 +1,6 @@
 # app/services/persona_prompts.py
+import hashlib
+import json
 from typing import Optional, Dict, Any
 
 BASE_STYLE = """
@@ -48,3 +50,17 @@ def build_persona_instructions(*, persona: str, analysis: Optional[Dict[str, Any
         "Keep each turn under ~2 sentences unless technical depth is requested."
     )
     return "\n".join(parts)
+
+
+# Bump when build_persona_instructions changes shape; text edits to BASE_STYLE /
+# PERSONA_BULLETS are picked up automatically by the hash below.
+BUNDLE_FORMAT = 1
+
+PERSONA_BUNDLE_VERSION = hashlib.sha256(
+    json.dumps([BUNDLE_FORMAT, BASE_STYLE, PERSONA_BULLETS], sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
+
+def build_persona_bundle(analysis: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Instructions for every persona at once, for precomputation when an analysis is stored."""
+    return {persona: build_persona_instructions(persona=persona, analysis=analysis) for persona in PERSONA_BULLETS}
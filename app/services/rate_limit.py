@@ -0,0 +1,86 @@
+# app/services/rate_limit.py
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from app.core.config import GEMINI_RPM, GEMINI_TPM
+
+# Gemini bills each PDF page as ~258 input tokens; prompt + structured output on top.
+TOKENS_PER_PDF_PAGE = 258
+TOKENS_PER_REQUEST_OVERHEAD = 4000
+
+
+def estimate_request_tokens(pages: int) -> int:
+    return max(pages, 1) * TOKENS_PER_PDF_PAGE + TOKENS_PER_REQUEST_OVERHEAD
+
+
+class TokenBucket:
+    """
+    Async token bucket. Waiters are served FIFO (the lock is held while sleeping),
+    so a large request can't be starved by a stream of small ones.
+
+    The bucket is one per process, but asyncio.Lock belongs to the loop that first uses it: each
+    (pid, loop) gets its own FIFO lock (as genai_client keys its async clients), and the token
+    count itself sits behind a threading lock. So the sync wrappers' asyncio.run loops and the
+    worker's long-lived loop can share one limit.
+    """
+
+    def __init__(self, rate_per_s: float, capacity: float):
+        self.rate = rate_per_s
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._mutex = threading.Lock()
+        self._locks: Dict[Tuple[int, int], Tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = {}
+
+    def _loop_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        key = (os.getpid(), id(loop))
+        with self._mutex:
+            for k, (other, _) in list(self._locks.items()):
+                if k[0] != key[0] or other.is_closed():
+                    del self._locks[k]
+            entry = self._locks.get(key)
+            if entry is None or entry[0] is not loop:
+                entry = (loop, asyncio.Lock())
+                self._locks[key] = entry
+            return entry[1]
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until `amount` tokens are available and take them. Returns seconds waited."""
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        async with self._loop_lock():
+            while True:
+                with self._mutex:
+                    self._refill()
+                    if self.tokens >= amount:
+                        self.tokens -= amount
+                        return time.monotonic() - started
+                    wait = (amount - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+
+class GeminiRateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets shared by every job (and loop) in the process."""
+
+    def __init__(self, rpm: int = GEMINI_RPM, tpm: int = GEMINI_TPM):
+        self.requests = TokenBucket(rpm / 60.0, rpm)
+        self.tokens = TokenBucket(tpm / 60.0, tpm)
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        waited = await self.requests.acquire(1)
+        waited += await self.tokens.acquire(estimated_tokens)
+        return waited
+
+
+gemini_limiter = GeminiRateLimiter()
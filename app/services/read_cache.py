@@ -0,0 +1,260 @@
+# app/services/read_cache.py
+"""
+Read-through cache for the hot, rarely-changing lookups on every request: a deck's owner/status
+(ownership checks on every /api/decks/{id}/... and boardroom call) and the User row for /me.
+
+Lookups go in-process LRU (TTL) → Redis (shared by replicas, when READ_CACHE_REDIS) → Prisma,
+with concurrent misses for the same key coalesced into one query. Entries are invalidated
+explicitly: the worker after every Deck.status write, the Clerk webhook writer after applying
+user events. Invalidation deletes the Redis key and is broadcast on a pub/sub channel that each
+API process listens to (InvalidationListener) to drop its local copy. TTLs only bound staleness
+if a broadcast is missed; a deck that isn't finished yet is cached for DECK_CACHE_PENDING_TTL_S.
+Misses (unknown deck/user) are never cached.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.config import (
+    DECK_CACHE_PENDING_TTL_S,
+    DECK_CACHE_TTL_S,
+    READ_CACHE_MAX_ENTRIES,
+    READ_CACHE_REDIS,
+    USER_CACHE_TTL_S,
+)
+from app.core.metrics import READ_CACHE_LOOKUPS
+from app.core.redis import get_async_redis
+
+CHANNEL = "read-cache-invalidate"
+KEY_PREFIX = "read-cache:v1:"
+DECK_FINAL_STATUSES = ("ready", "failed")
+
+
+@dataclass(frozen=True)
+class DeckRef:
+    """The Deck columns request handlers need (field names as on the Prisma model)."""
+    id: str
+    ownerClerkId: str
+    status: str
+    error: Optional[str]
+    latestAnalysisId: Optional[str]
+    uploadPath: str
+
+
+def deck_ref(deck: Any) -> DeckRef:
+    status = getattr(deck.status, "value", deck.status)  # Prisma enum -> plain str
+    return DeckRef(deck.id, deck.ownerClerkId, str(status), deck.error, deck.latestAnalysisId, deck.uploadPath)
+
+
+def user_record(user: Any) -> Dict[str, Any]:
+    """JSON-ready User (what /api/users/me returns)."""
+    return {"id": user.id, "clerkId": user.clerkId, "email": user.email, "createdAt": user.createdAt.isoformat()}
+
+
+# ========= Cache =========
+
+class ReadThroughCache:
+    """One entity's cache: values are JSON-ready dicts; ttl_for(value) picks each entry's TTL."""
+
+    def __init__(self, entity: str, ttl_for: Callable[[Dict[str, Any]], float],
+                 max_entries: int = READ_CACHE_MAX_ENTRIES):
+        self.entity = entity
+        self.ttl_for = ttl_for
+        self.max_entries = max_entries
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._epoch = 0  # bumped by every eviction; a fill that raced one doesn't store its result
+
+    def redis_key(self, key: str) -> str:
+        return f"{KEY_PREFIX}{self.entity}:{key}"
+
+    def _local_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+
+    def _local_put(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl_for(value), value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def evict_local(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            self._epoch += 1
+            for key in keys:
+                self._local.pop(key, None)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._local.clear()
+
+    async def get(self, key: str, load: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        value = self._local_get(key)
+        if value is not None:
+            READ_CACHE_LOOKUPS.labels(self.entity, "local").inc()
+            return value
+
+        # Single flight: concurrent misses for one key share one Redis/DB round trip (a task, so a
+        # cancelled caller doesn't cancel it for the others)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, load))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            READ_CACHE_LOOKUPS.labels(self.entity, "coalesced").inc()
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, load: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        epoch = self._epoch
+        if READ_CACHE_REDIS:
+            try:
+                blob = await get_async_redis().get(self.redis_key(key))
+            except Exception as exc:
+                print(f"[read_cache] redis get failed for {self.entity} {key}: {exc}")
+                blob = None
+            if blob:
+                value = json.loads(blob)
+                if epoch == self._epoch:
+                    self._local_put(key, value)
+                READ_CACHE_LOOKUPS.labels(self.entity, "redis").inc()
+                return value
+
+        READ_CACHE_LOOKUPS.labels(self.entity, "miss").inc()
+        value = await load()
+        if value is None or epoch != self._epoch:
+            return value
+        self._local_put(key, value)
+        if READ_CACHE_REDIS:
+            try:
+                ttl_ms = max(1, int(self.ttl_for(value) * 1000))
+                await get_async_redis().set(self.redis_key(key), json.dumps(value, separators=(",", ":")), px=ttl_ms)
+            except Exception as exc:
+                print(f"[read_cache] redis set failed for {self.entity} {key}: {exc}")
+        return value
+
+    async def invalidate(self, keys: Iterable[str]) -> None:
+        """Drop keys everywhere: this process, Redis, and (via pub/sub) every other API process."""
+        keys = [k for k in keys if k]
+        if not keys:
+            return
+        self.evict_local(keys)
+        try:
+            redis = get_async_redis()
+            if READ_CACHE_REDIS:
+                await redis.delete(*(self.redis_key(k) for k in keys))
+            await redis.publish(CHANNEL, json.dumps({"entity": self.entity, "keys": keys}))
+        except Exception as exc:
+            print(f"[read_cache] invalidation of {self.entity} {keys[:3]} failed: {exc}")
+
+
+def _deck_ttl(value: Dict[str, Any]) -> float:
+    return DECK_CACHE_TTL_S if value.get("status") in DECK_FINAL_STATUSES else min(DECK_CACHE_PENDING_TTL_S, DECK_CACHE_TTL_S)
+
+
+deck_cache = ReadThroughCache("deck", _deck_ttl)
+user_cache = ReadThroughCache("user", lambda value: USER_CACHE_TTL_S)
+_CACHES = {cache.entity: cache for cache in (deck_cache, user_cache)}
+
+
+# ========= Lookups / invalidation =========
+
+async def get_deck_ref(client: Any, deck_id: str) -> Optional[DeckRef]:
+    async def load() -> Optional[Dict[str, Any]]:
+        deck = await client.deck.find_unique(where={"id": deck_id})
+        return asdict(deck_ref(deck)) if deck else None
+
+    value = await deck_cache.get(deck_id, load)
+    return DeckRef(**value) if value else None
+
+
+async def get_user_record(client: Any, clerk_id: str) -> Optional[Dict[str, Any]]:
+    async def load() -> Optional[Dict[str, Any]]:
+        user = await client.user.find_unique(where={"clerkId": clerk_id})
+        return user_record(user) if user else None
+
+    return await user_cache.get(clerk_id, load)
+
+
+async def invalidate_deck(deck_id: str) -> None:
+    """Call after writing Deck.status (best effort)."""
+    await deck_cache.invalidate([deck_id])
+
+
+async def invalidate_users(clerk_ids: Iterable[str]) -> None:
+    await user_cache.invalidate(clerk_ids)
+
+
+# ========= Cross-process invalidation =========
+
+class InvalidationListener:
+    """One subscription per API process; evicts local entries other processes invalidated."""
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._pump(), name="read-cache-invalidation")
+
+    def _dispatch(self, raw: Any) -> None:
+        try:
+            message = json.loads(raw)
+            _CACHES[message["entity"]].evict_local(message["keys"])
+        except (TypeError, ValueError, KeyError):
+            return
+
+    async def _pump(self) -> None:
+        backoff = 0.5
+        while True:
+            pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # Anything invalidated while we weren't subscribed is unknown: start cold
+                for cache in _CACHES.values():
+                    cache.clear_local()
+                backoff = 0.5
+                while True:
+                    msg = await pubsub.get_message(timeout=30.0)
+                    if msg is not None and msg.get("type") == "message":
+                        self._dispatch(msg.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[read_cache] invalidation subscription lost: {exc}; retrying in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+invalidation_listener = InvalidationListener()
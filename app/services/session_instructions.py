@@ -0,0 +1,36 @@
+# app/services/session_instructions.py
+"""
+Agent instructions handed over by reference.
+
+The session endpoint stores the full instruction text in Redis under a short random key and
+puts only that key in the agent token's metadata; the agent resolves it at join time.
+Keeps LiveKit tokens a few hundred bytes instead of several KB.
+"""
+from __future__ import annotations
+
+import secrets
+import zlib
+from typing import Optional
+
+from app.core.redis import get_async_redis
+
+KEY_PREFIX = "agent-instr:"
+DEFAULT_TTL_S = 60 * 60  # matches the LiveKit token lifetime in mint_token
+
+
+async def store_instructions(instructions: str, ttl_s: int = DEFAULT_TTL_S) -> Optional[str]:
+    """Returns the session key, or None if Redis is unavailable (caller should inline the text)."""
+    key = secrets.token_urlsafe(12)
+    try:
+        await get_async_redis().set(KEY_PREFIX + key, zlib.compress(instructions.encode("utf-8")), ex=ttl_s)
+    except Exception as exc:
+        print(f"[session_instructions] store failed: {exc}")
+        return None
+    return key
+
+
+async def resolve_instructions(key: str) -> Optional[str]:
+    blob = await get_async_redis().get(KEY_PREFIX + key)
+    if not blob:
+        return None
+    return zlib.decompress(blob).decode("utf-8")
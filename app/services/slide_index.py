@@ -0,0 +1,204 @@
+# app/services/slide_index.py
+"""
+Per-deck slide text index for the live boardroom agent.
+
+The worker extracts each page's text with PyMuPDF once and builds a small BM25 inverted index
+({term: [page, tf, page, tf, ...]} plus page lengths and the page texts for snippets). It is
+stored zlib-compressed at <SLIDE_INDEX_DIR>/<id[:2]>/<deck_id>.idx and in Redis, so the agent
+(possibly on another host) loads it with one GET at join time and answers "what does slide N /
+the deck say about X" in-process, instead of carrying the whole deck in its instructions.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import SLIDE_INDEX_DIR
+from app.core.redis import get_async_redis
+from app.services.storage import PdfBuffer
+
+# Bump when tokenization or the stored layout changes; other versions are ignored (rebuilt on re-analysis)
+INDEX_VERSION = 1
+INDEX_TTL_S = 7 * 24 * 3600
+PAGE_TEXT_MAX_CHARS = 4000   # per page, for snippets; long appendix pages are cut
+SNIPPET_CHARS = 320
+SLIDE_TEXT_CHARS = 1200      # one slide read back to the agent
+
+# BM25 parameters (the usual defaults; slides are short, so length normalization matters little)
+_K1 = 1.2
+_B = 0.75
+
+# Money/percent/multiples stay one token ("$2.5m", "40%", "3x"); words of 2+ letters otherwise
+_TOKEN = re.compile(r"\$?\d+(?:[.,]\d+)*(?:%|[kmbx]\b)?|[a-z][a-z0-9]+")
+_STOPWORDS = frozenset(
+    "an and are as at be but by do does for from has have how in into is it its of on or our that "
+    "the their them they this to was we what when where which who why will with you your about "
+    "deck slide slides say says said".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.casefold()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss") and token[0].isalpha():
+            token = token[:-1]  # crude plural folding: customers ~ customer
+        tokens.append(token)
+    return tokens
+
+
+def _clean(text: str) -> str:
+    # Keep line breaks (bullets) for snippets, collapse everything else
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)[:PAGE_TEXT_MAX_CHARS]
+
+
+# ========= Index =========
+
+class SlideIndex:
+    """BM25 over the pages of one deck. Page numbers are 1-based, as the founder says them."""
+
+    def __init__(self, pages: List[str], postings: Dict[str, List[int]], lengths: List[int]):
+        self.pages = pages
+        self.postings = postings
+        self.lengths = lengths
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def from_pages(cls, texts: List[str]) -> "SlideIndex":
+        pages = [_clean(t) for t in texts]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        lengths = []
+        for number, text in enumerate(pages, start=1):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term] += (number, tf)
+        return cls(pages, dict(postings), lengths)
+
+    # ----- serialization -----
+
+    def to_bytes(self) -> bytes:
+        payload = {"v": INDEX_VERSION, "pages": self.pages, "len": self.lengths, "post": self.postings}
+        return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> Optional["SlideIndex"]:
+        try:
+            payload = json.loads(zlib.decompress(blob))
+        except Exception:
+            return None
+        if not isinstance(payload, dict) or payload.get("v") != INDEX_VERSION:
+            return None
+        return cls(payload["pages"], payload["post"], payload["len"])
+
+    # ----- queries -----
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def page(self, number: int) -> Optional[str]:
+        return self.pages[number - 1] if 1 <= number <= len(self.pages) else None
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float, str]]:
+        """Top-k (page number, score, snippet) for a free-text query."""
+        terms = set(tokenize(query))
+        n = len(self.pages)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting) // 2
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for i in range(0, len(posting), 2):
+                number, tf = posting[i], posting[i + 1]
+                norm = 1 - _B + _B * self.lengths[number - 1] / (self.avg_length or 1)
+                scores[number] += idf * tf * (_K1 + 1) / (tf + _K1 * norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(number, round(score, 3), self.snippet(number, terms)) for number, score in ranked]
+
+    def lookup(self, query: str = "", slide: int = 0, k: int = 3) -> str:
+        """Plain-text answer for the agent tool: one slide's text, or the best-matching snippets."""
+        if slide:
+            text = self.page(slide)
+            if text is None:
+                return f"The deck has {len(self)} slides; there is no slide {slide}."
+            return f"Slide {slide}: {text[:SLIDE_TEXT_CHARS] or '(no text on this slide)'}"
+        hits = self.search(query, k)
+        if not hits:
+            return "Nothing in the deck matches that."
+        return "\n\n".join(f"Slide {number}: {snippet}" for number, _, snippet in hits)
+
+    def snippet(self, number: int, terms: Optional[set] = None) -> str:
+        """The page's lines around the best-matching one, up to SNIPPET_CHARS."""
+        text = self.page(number) or ""
+        lines = text.splitlines()
+        if not lines:
+            return ""
+        start = 0
+        if terms:
+            hits = [len(terms.intersection(tokenize(line))) for line in lines]
+            start = max(range(len(lines)), key=lambda i: (hits[i], -i))
+            if start and hits[start]:
+                start -= 1  # keep the line above (usually the slide title or the bullet's lead-in)
+        out = ""
+        for line in lines[start:]:
+            if len(out) + len(line) + 1 > SNIPPET_CHARS:
+                out = out or line[:SNIPPET_CHARS]
+                break
+            out = f"{out}\n{line}" if out else line
+        return out
+
+
+def build_slide_index(pdf_path: str, data: Optional[PdfBuffer] = None) -> SlideIndex:
+    """Worker side: page texts via PyMuPDF (imported here; the agent only loads indexes)."""
+    import fitz  # PyMuPDF
+
+    with (fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(pdf_path)) as doc:
+        return SlideIndex.from_pages([page.get_text("text") for page in doc])
+
+
+# ========= Storage =========
+
+def index_key(deck_id: str) -> str:
+    return f"slide-index:v{INDEX_VERSION}:{deck_id}"
+
+
+def index_path(deck_id: str) -> Path:
+    return SLIDE_INDEX_DIR / deck_id[:2] / f"{deck_id}.idx"
+
+
+async def store_slide_index(deck_id: str, index: SlideIndex) -> None:
+    blob = index.to_bytes()
+    path = index_path(deck_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(blob)
+    os.replace(tmp, path)
+    try:
+        await get_async_redis().set(index_key(deck_id), blob, ex=INDEX_TTL_S)
+    except Exception as exc:
+        print(f"[slide_index] redis store failed for {deck_id}: {exc}")
+
+
+async def load_slide_index(deck_id: str) -> Optional[SlideIndex]:
+    """Redis first (shared across hosts), then the local file; None if the deck has no index."""
+    try:
+        blob = await get_async_redis().get(index_key(deck_id))
+        if blob:
+            return SlideIndex.from_bytes(blob)
+    except Exception as exc:
+        print(f"[slide_index] redis load failed for {deck_id}: {exc}")
+    try:
+        return SlideIndex.from_bytes(index_path(deck_id).read_bytes())
+    except FileNotFoundError:
+        return None
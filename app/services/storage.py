@@ -1,45 +1,295 @@
 # app/services/storage.py
+"""
+Deck PDF storage.
+
+Uploads are streamed to a staging file (hashed on the fly), validated, then committed to the
+configured backend under their sha256, so identical PDFs are stored once:
+  local  <UPLOAD_DIR>/<sha[:2]>/<sha[2:4]>/<sha>.pdf
+  s3     s3://<S3_BUCKET>/<S3_PREFIX>/<sha[:2]>/<sha>.pdf, with a local copy under S3_CACHE_DIR
+The returned key is what Deck.uploadPath stores; older rows hold plain paths (flat UPLOAD_DIR)
+and keep working with the local backend. Readers get a local file via deck_local_path(key), or
+a read-only memory map of it via open_deck(key) that every consumer in a job shares.
+"""
 from __future__ import annotations
 
+import hashlib
+import io
+import mmap
+import os
+import threading
 import uuid
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union, IO
+from typing import Optional, Union, IO
 
 from app.core.config import UPLOAD_DIR  # UPLOAD_DIR is a Path and mkdir is done in config
+from app.core.config import MAX_UPLOAD_BYTES, MAX_DECK_PAGES, UPLOAD_CHUNK_BYTES
+from app.core.config import S3_BUCKET, S3_CACHE_DIR, S3_ENDPOINT_URL, S3_PREFIX, S3_REGION, STORAGE_BACKEND
+
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_WINDOW = 1024  # the spec tolerates leading junk before the header
+STAGING_DIR = UPLOAD_DIR / ".staging"
+PdfBuffer = Union[bytes, memoryview]  # what fitz.open(stream=...) takes without copying
+S3_SCHEME = "s3://"
+
+
+class UploadRejected(Exception):
+    """Raised while streaming/inspecting an upload; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    sha256: str
+    size: int
 
 
-def _read_bytes(file_obj: Union[bytes, IO[bytes], object]) -> bytes:
+def _file_obj(file_obj: Union[bytes, IO[bytes], object]) -> IO[bytes]:
     # Already bytes
     if isinstance(file_obj, (bytes, bytearray)):
-        return bytes(file_obj)
+        return io.BytesIO(file_obj)
 
     # FastAPI UploadFile has .file (SpooledTemporaryFile)
     f = getattr(file_obj, "file", None)
     if f and hasattr(f, "read"):
-        return f.read()
+        return f
 
     # Any other file-like object with .read()
     if hasattr(file_obj, "read"):
-        return file_obj.read()
+        return file_obj
 
     raise TypeError("save_upload() expected bytes, an UploadFile, or a file-like object with .read().")
 
 
+def stream_upload(
+    file_or_bytes: Union[bytes, IO[bytes], object],
+    original_name: str,
+    *,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+) -> StoredUpload:
+    """
+    Copies an upload to a staging file chunk by chunk, hashing as it goes. Memory stays at one
+    chunk. Rejects (and removes the partial file) as soon as the header is wrong or max_bytes is
+    exceeded. For FastAPI uploads the body is already spooled by then (File(...)); only
+    BodySizeLimitMiddleware rejects before that. Validate it, then commit_upload() it (or unlink it). Blocking: call from a
+    threadpool in async code.
+    """
+    src = _file_obj(file_or_bytes)
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    path = STAGING_DIR / f"{uuid.uuid4().hex}.pdf"
+
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with path.open("wb") as out:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                if size == 0 and PDF_MAGIC not in chunk[:PDF_HEADER_WINDOW]:
+                    raise UploadRejected(400, "File is not a PDF (missing %PDF header)")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(413, f"PDF exceeds {max_bytes // (1024 * 1024)} MB limit")
+                h.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UploadRejected(400, "Empty upload")
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+    return StoredUpload(path=str(path), sha256=h.hexdigest(), size=size)
+
+
+def inspect_pdf(path: str, *, max_pages: int = MAX_DECK_PAGES) -> int:
+    """
+    Cheap structural check before a deck is enqueued; returns the page count.
+    Raises UploadRejected for unreadable, encrypted, empty or too-long decks.
+    """
+    import fitz  # PyMuPDF; imported lazily so the API only pays for it on upload
+
+    try:
+        with fitz.open(path) as doc:
+            encrypted = bool(doc.needs_pass or doc.is_encrypted)
+            pages = doc.page_count
+    except Exception:
+        raise UploadRejected(400, "PDF could not be parsed")
+
+    if encrypted:
+        raise UploadRejected(400, "Password-protected PDFs are not supported")
+    if pages == 0:
+        raise UploadRejected(400, "PDF has no pages")
+    if pages > max_pages:
+        raise UploadRejected(413, f"PDF has {pages} pages (limit {max_pages})")
+    return pages
+
+
 def save_upload(file_or_bytes: Union[bytes, IO[bytes], object], original_name: str) -> str:
     """
-    Saves an uploaded PDF to disk and returns its absolute path.
+    Saves an uploaded PDF to storage (unvalidated) and returns its storage key.
     Accepts:
       - raw bytes
       - FastAPI UploadFile
       - any file-like object with .read()
     """
-    ext = Path(original_name or "").suffix.lower() or ".pdf"
-    name = f"{uuid.uuid4().hex}{ext}"
-    path = UPLOAD_DIR / name
+    return commit_upload(stream_upload(file_or_bytes, original_name))
+
+
+# ========= Backends =========
+
+def _shard(root: Path, sha256: str) -> Path:
+    return root / sha256[:2] / sha256[2:4] / f"{sha256}.pdf"
+
+
+def _move_into(staged: Path, dest: Path) -> None:
+    # Content-addressed: an existing file already has these bytes
+    if dest.exists():
+        staged.unlink(missing_ok=True)
+        return
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(staged, dest)
+
+
+class LocalStorage:
+    """Hash-sharded directories under UPLOAD_DIR; the key is the absolute path."""
+
+    def __init__(self, root: Path = UPLOAD_DIR):
+        self.root = root
+
+    def commit(self, staged: Path, sha256: str) -> str:
+        dest = _shard(self.root, sha256)
+        _move_into(staged, dest)
+        return str(dest)
+
+    def local_path(self, key: str) -> Path:
+        return Path(key)
+
+
+class S3Storage:
+    """
+    S3-compatible object store (AWS, MinIO, or a local stand-in such as moto_server via
+    S3_ENDPOINT_URL). PyMuPDF needs a file, so objects are also kept in a content-addressed local
+    cache: the committing process keeps its staged copy, other hosts download on first use.
+    Credentials come from the usual AWS_* environment / config chain. Requires boto3.
+    """
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        prefix: str = S3_PREFIX,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        region: Optional[str] = S3_REGION,
+        cache_dir: Path = S3_CACHE_DIR,
+    ):
+        try:
+            import boto3
+        except ImportError as exc:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from exc
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        self.bucket, self.prefix, self.cache_dir = bucket, prefix.strip("/"), cache_dir
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+
+    def _object_key(self, sha256: str) -> str:
+        return "/".join(p for p in (self.prefix, sha256[:2], f"{sha256}.pdf") if p)
+
+    def commit(self, staged: Path, sha256: str) -> str:
+        from botocore.exceptions import ClientError
+
+        object_key = self._object_key(sha256)
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=object_key)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                raise
+            self.client.upload_file(str(staged), self.bucket, object_key,
+                                    ExtraArgs={"ContentType": "application/pdf"})
+        _move_into(staged, _shard(self.cache_dir, sha256))
+        return f"{S3_SCHEME}{self.bucket}/{object_key}"
+
+    def local_path(self, key: str) -> Path:
+        bucket, _, object_key = key[len(S3_SCHEME):].partition("/")
+        sha256 = Path(object_key).stem
+        path = _shard(self.cache_dir, sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                self.client.download_file(bucket, object_key, str(tmp))
+                os.replace(tmp, path)
+            finally:
+                tmp.unlink(missing_ok=True)
+        return path
+
+
+_backend: Optional[Union[LocalStorage, S3Storage]] = None
+_backend_lock = threading.Lock()
+
+
+def get_storage() -> Union[LocalStorage, S3Storage]:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if STORAGE_BACKEND == "s3":
+                _backend = S3Storage()
+            elif STORAGE_BACKEND == "local":
+                _backend = LocalStorage()
+            else:
+                raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r} (local|s3)")
+        return _backend
+
+
+def commit_upload(stored: StoredUpload) -> str:
+    """Moves a validated staged upload into storage; returns its key (Deck.uploadPath). Blocking."""
+    return get_storage().commit(Path(stored.path), stored.sha256)
+
+
+def deck_local_path(key: str) -> Path:
+    """A local file with the deck's bytes (may download it). Blocking."""
+    if key.startswith(S3_SCHEME):
+        return get_storage().local_path(key)
+    return Path(key)  # local backend, including pre-sharding flat paths
+
+
+# ========= Shared read buffer =========
+
+class DeckBuffer:
+    """
+    Read-only memory map of a stored deck. One mapping serves every reader in a job: hashing,
+    PyMuPDF (fitz.open(stream=buf.data)) and the model request, with no per-reader file reads.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with self.path.open("rb") as f:  # the mapping outlives the descriptor
+            self.data: Optional[memoryview] = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def sha256(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+    def close(self) -> None:
+        # Drop the reference instead of unmapping: a PyMuPDF document still reading the view (a
+        # to_thread call that outlived a cancelled job) keeps the mapping alive, and it's
+        # unmapped as soon as the last view is gone
+        self.data = None
+
+    def __enter__(self) -> "DeckBuffer":
+        return self
 
-    data = _read_bytes(file_or_bytes)
+    def __exit__(self, *exc) -> None:
+        self.close()
 
-    with path.open("wb") as out:
-        out.write(data)
 
-    return str(path)
+def open_deck(key: str) -> DeckBuffer:
+    """Blocking (may download from S3): call from a thread in async code."""
+    return DeckBuffer(deck_local_path(key))
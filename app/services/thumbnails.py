@@ -0,0 +1,170 @@
+# app/services/thumbnails.py
+"""
+Per-page slide thumbnails at a few fixed widths.
+
+Renders are cached on disk at <THUMB_CACHE_DIR>/<deck_id>/<page>-<size>.jpg (the API and the
+worker share it) and evicted oldest-first once the cache exceeds THUMB_CACHE_MAX_BYTES.
+The API renders misses in a process pool so PyMuPDF never runs on the event loop; the worker
+pre-renders every page right after a deck becomes ready.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from app.core.config import THUMB_CACHE_DIR, THUMB_CACHE_MAX_BYTES, THUMB_RENDER_PROCESSES
+from app.services.storage import PdfBuffer, deck_local_path
+
+THUMB_SIZES = {"sm": 160, "md": 320, "lg": 640}  # output width in px
+PRERENDER_SIZES = ("sm", "md")
+JPEG_QUALITY = 80
+RENDER_VERSION = 1  # bump when _render's output changes, so clients drop cached thumbnails
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_approx_bytes: Optional[int] = None
+_evict_lock = threading.Lock()
+
+
+class ThumbnailNotFound(Exception):
+    pass
+
+
+# ========= Rendering (runs in pool processes / worker threads) =========
+
+def _render(doc, page_index: int, width: int) -> bytes:
+    import fitz  # PyMuPDF
+
+    page = doc.load_page(page_index)
+    zoom = width / page.rect.width
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    return pix.tobytes("jpeg", jpg_quality=JPEG_QUALITY)
+
+
+def render_page_thumbnail(pdf_path: str, page_index: int, width: int) -> bytes:
+    """Top-level (picklable) so it can run in the process pool. page_index is 0-based."""
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        if not 0 <= page_index < doc.page_count:
+            raise ThumbnailNotFound(f"Page {page_index + 1} out of range")
+        return _render(doc, page_index, width)
+
+
+# ========= Disk cache =========
+
+def thumbnail_path(deck_id: str, page: int, size: str) -> Path:
+    return THUMB_CACHE_DIR / deck_id / f"{page}-{size}.jpg"
+
+
+def thumbnail_etag(deck_id: str, page: int, size: str) -> str:
+    """
+    A deck's PDF never changes, so a thumbnail is fully identified by what was rendered and how:
+    no need to read (or hash) the JPEG to answer a conditional request.
+    """
+    key = f"{deck_id}:{page}:{size}:{THUMB_SIZES.get(size)}:{JPEG_QUALITY}:{RENDER_VERSION}"
+    return '"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
+
+
+def _write(path: Path, data: bytes) -> None:
+    global _approx_bytes
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    with _evict_lock:
+        if _approx_bytes is not None:
+            _approx_bytes += len(data)
+    _maybe_evict()
+
+
+def _maybe_evict() -> None:
+    global _approx_bytes
+    with _evict_lock:
+        if _approx_bytes is not None and _approx_bytes <= THUMB_CACHE_MAX_BYTES:
+            return
+        files = [(p, p.stat()) for p in THUMB_CACHE_DIR.rglob("*.jpg")]
+        total = sum(st.st_size for _, st in files)
+        if total > THUMB_CACHE_MAX_BYTES:
+            # Evict least recently written/served down to 90% of the budget
+            files.sort(key=lambda f: max(f[1].st_atime, f[1].st_mtime))
+            target = int(THUMB_CACHE_MAX_BYTES * 0.9)
+            for p, st in files:
+                if total <= target:
+                    break
+                p.unlink(missing_ok=True)
+                total -= st.st_size
+        _approx_bytes = total
+
+
+# ========= API side =========
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process that is running an event loop and threads
+            _pool = ProcessPoolExecutor(max_workers=max(1, THUMB_RENDER_PROCESSES), mp_context=get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def get_thumbnail(deck_id: str, pdf_path: str, page: int, size: str) -> Tuple[bytes, str]:
+    """Returns (jpeg_bytes, strong_etag). page is 1-based; pdf_path is the deck's storage key. Raises ThumbnailNotFound."""
+    if size not in THUMB_SIZES:
+        raise ThumbnailNotFound(f"Unknown size {size!r}")
+    if page < 1:
+        raise ThumbnailNotFound("Pages are 1-based")
+
+    path = thumbnail_path(deck_id, page, size)
+    try:
+        data = await asyncio.to_thread(path.read_bytes)
+        return data, thumbnail_etag(deck_id, page, size)
+    except FileNotFoundError:
+        pass
+
+    loop = asyncio.get_running_loop()
+    local_path = str(await asyncio.to_thread(deck_local_path, pdf_path))  # a storage key; S3 may download
+    data = await loop.run_in_executor(_get_pool(), render_page_thumbnail, local_path, page - 1, THUMB_SIZES[size])
+    await asyncio.to_thread(_write, path, data)
+    return data, thumbnail_etag(deck_id, page, size)
+
+
+# ========= Worker side =========
+
+def prerender_deck(
+    deck_id: str,
+    pdf_path: str,
+    sizes: Iterable[str] = PRERENDER_SIZES,
+    *,
+    data: Optional[PdfBuffer] = None,
+) -> int:
+    """
+    Render every page at the given sizes with a single document open (from `data`, the job's
+    shared buffer, when given). Returns files written.
+    """
+    import fitz  # PyMuPDF
+
+    written = 0
+    with (fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(pdf_path)) as doc:
+        for page_index in range(doc.page_count):
+            for size in sizes:
+                path = thumbnail_path(deck_id, page_index + 1, size)
+                if path.exists():
+                    continue
+                _write(path, _render(doc, page_index, THUMB_SIZES[size]))
+                written += 1
+    return written
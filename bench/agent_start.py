@@ -0,0 +1,191 @@
+# bench/agent_start.py
+"""
+Shark agent job-start benchmark: runs agents.shark_agent.entrypoint in-process for --jobs
+synthetic LiveKit jobs and reports the JobTimer histogram (agents.latency) per phase.
+
+No LiveKit server or Google key is needed: each job gets a stand-in JobContext whose connect()
+takes --join-ms (lognormal, --join-sigma) and an unconnected rtc.Room, and the model comes from
+SHARK_MODEL_FACTORY, bench.fake_realtime:make_model unless set (--connect-ms / --sigma shape its
+handshake). Like the Gemini plugin, the fake connects in the background, so its handshake is not
+part of session_started. Jobs run on one event loop, --concurrency at a time; each gets its own
+prewarmed process state unless --cold, which leaves prewarm to the entrypoint (console mode).
+With --deck-id the slide index is loaded as in production (needs REDIS_URL / DATABASE_URL).
+
+    python -m bench.agent_start --jobs 200 --concurrency 8 --join-ms 80
+    python -m bench.agent_start --jobs 200 --cold
+    SHARK_MODEL_FACTORY= SHARK_REALTIME_BASE_URL=http://127.0.0.1:9000 python -m bench.agent_start
+
+Observations also go to SHARK_LATENCY_LOG (a fresh file under bench/results by default), so
+python -m agents.latency <file> [phase] re-renders them.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import gc
+import json
+import logging
+import math
+import os
+import random
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from bench.run import ROOT, _git_sha
+from bench.stats import summarize
+
+PHASES = ("instructions", "model_built", "connected", "session_started")
+
+_current_job: contextvars.ContextVar[Optional[SimpleNamespace]] = contextvars.ContextVar("_current_job", default=None)
+
+
+class FakeJobContext:
+    """What entrypoint() touches on a JobContext: proc.userdata, job.metadata, connect(), room."""
+
+    def __init__(self, userdata: Dict[str, Any], metadata: str, join_s: float):
+        from livekit import rtc
+
+        self.proc = SimpleNamespace(userdata=userdata)
+        self.job = SimpleNamespace(metadata=metadata)
+        self.room = rtc.Room()
+        self._join_s = join_s
+
+    async def connect(self) -> None:
+        await asyncio.sleep(self._join_s)
+
+
+def _instrument(shark_agent) -> None:
+    """Lets each job's driver see its AgentSession and when JobTimer.record() ran."""
+    from livekit.agents import voice
+
+    class RecordingTimer(shark_agent.JobTimer):
+        def record(self, **fields) -> None:
+            super().record(**fields)
+            job = _current_job.get()
+            if job is not None:
+                job.done.set()
+
+    class TrackedSession(voice.AgentSession):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            job = _current_job.get()
+            if job is not None:
+                job.sessions.append(self)
+
+    shark_agent.JobTimer = RecordingTimer
+    shark_agent.voice = SimpleNamespace(Agent=voice.Agent, AgentSession=TrackedSession)
+
+
+async def run_jobs(count: int, concurrency: int, metadata: str, join_ms: float, join_sigma: float,
+                   cold: bool, timeout_s: float, rng: random.Random) -> Dict[str, Any]:
+    from agents import shark_agent
+
+    _instrument(shark_agent)
+    prewarm_ms: List[float] = []
+    outcomes = {"ok": 0, "failed": 0, "timeout": 0}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        userdata: Dict[str, Any] = {}
+        if not cold:  # a prewarmed job process; not part of the job's own timings
+            started = time.perf_counter()
+            shark_agent.prewarm(SimpleNamespace(userdata=userdata))
+            prewarm_ms.append((time.perf_counter() - started) * 1000)
+        jitter = math.exp(rng.gauss(0, join_sigma)) if join_sigma else 1.0
+        ctx = FakeJobContext(userdata, metadata, join_ms * jitter / 1000)
+
+        async with sem:
+            state = SimpleNamespace(done=asyncio.Event(), sessions=[])
+            _current_job.set(state)  # copied into the entrypoint task's context
+            job = asyncio.create_task(shark_agent.entrypoint(ctx))
+            waiter = asyncio.create_task(state.done.wait())
+            # After record() the entrypoint only waits on the session, so stop it there
+            await asyncio.wait((job, waiter), timeout=timeout_s, return_when=asyncio.FIRST_COMPLETED)
+            if state.done.is_set():
+                outcomes["ok"] += 1
+            elif job.done():
+                outcomes["failed"] += 1
+                print(f"[bench] job failed before session start: {job.exception()!r}")
+            else:
+                outcomes["timeout"] += 1
+            for task in (job, waiter):
+                task.cancel()
+            await asyncio.gather(job, waiter, return_exceptions=True)
+            for session in state.sessions:
+                await session.aclose()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    wall_s = time.perf_counter() - started
+    gc.collect()  # release the rooms' FFI handles while the FFI client is still up
+    return {"jobs": count, "outcomes": outcomes, "wall_s": round(wall_s, 2),
+            "prewarm_ms": summarize(prewarm_ms) if prewarm_ms else None}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="jobs starting at once (one worker's load)")
+    parser.add_argument("--join-ms", type=float, default=50.0, help="stand-in room join (ctx.connect)")
+    parser.add_argument("--join-sigma", type=float, default=0.3)
+    parser.add_argument("--connect-ms", type=float, default=300.0, help="fake model handshake (background)")
+    parser.add_argument("--sigma", type=float, default=0.3, help="fake model handshake lognormal shape")
+    parser.add_argument("--persona", default="mark")
+    parser.add_argument("--deck-id", default=None)
+    parser.add_argument("--cold", action="store_true", help="no prewarm: the entrypoint builds process state")
+    parser.add_argument("--timeout-s", type=float, default=30.0, help="per job, until session_started")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="keep livekit's logs (the rooms never connect)")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    log_path = Path(os.environ.get("SHARK_LATENCY_LOG") or ROOT / "bench" / "results" / f"{stamp}-agent-start.jsonl")
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log_path.unlink(missing_ok=True)
+    # Before agents.shark_agent is imported / prewarm runs
+    os.environ["SHARK_LATENCY_LOG"] = str(log_path)
+    os.environ.setdefault("SHARK_MODEL_FACTORY", "bench.fake_realtime:make_model")
+    os.environ.setdefault("FAKE_REALTIME_CONNECT_MS", str(args.connect_ms))
+    os.environ.setdefault("FAKE_REALTIME_SIGMA", str(args.sigma))
+    os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_agent_start")
+    if not args.verbose:
+        logging.getLogger("livekit").setLevel(logging.CRITICAL)
+
+    from agents.latency import load_histogram
+
+    metadata = json.dumps({"persona": args.persona, "deckId": args.deck_id, "voice": "Puck"})
+    summary = asyncio.run(run_jobs(args.jobs, args.concurrency, metadata, args.join_ms, args.join_sigma,
+                                   args.cold, args.timeout_s, random.Random(args.seed)))
+
+    phases: Dict[str, Any] = {}
+    for phase in PHASES:
+        hist = load_histogram(str(log_path), phase) if log_path.exists() else None
+        phases[phase] = summarize(hist.samples) if hist else summarize([])
+        if hist and hist.samples:
+            print(f"[bench] {phase}\n{hist.render()}")
+
+    report = {
+        "label": "agent-start",
+        "git_sha": _git_sha(),
+        "params": {"jobs": args.jobs, "concurrency": args.concurrency, "join_ms": args.join_ms,
+                   "connect_ms": args.connect_ms, "persona": args.persona, "deck_id": args.deck_id,
+                   "cold": args.cold, "model_factory": os.environ["SHARK_MODEL_FACTORY"] or "default"},
+        "summary": {**summary, "phases_ms": phases},
+        "latency_log": str(log_path),
+    }
+    out = args.out or ROOT / "bench" / "results" / f"{stamp}-agent-start.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    started = phases["session_started"]
+    print(f"[bench] {summary['jobs']} jobs {summary['outcomes']} in {summary['wall_s']}s: session_started "
+          f"p50={started['p50']} p95={started['p95']} p99={started['p99']} ms")
+    print(f"[bench] wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
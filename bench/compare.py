@@ -0,0 +1,70 @@
+# bench/compare.py
+"""
+Diff two bench.run result files and flag regressions.
+
+    python -m bench.compare bench/results/base.json bench/results/new.json --threshold 10
+
+Exit status 1 when any tracked metric regresses by more than --threshold percent.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# (path into summary, higher_is_better)
+METRICS = (
+    (("decks_per_min",), True),
+    (("time_to_ready_ms", "p50"), False),
+    (("time_to_ready_ms", "p95"), False),
+    (("time_to_ready_ms", "p99"), False),
+    (("peak_rss_mb",), False),
+    (("failed",), False),
+)
+
+
+def _get(summary: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    node: Any = summary
+    for key in path:
+        if not isinstance(node, dict) or key not in node:
+            return None
+        node = node[key]
+    return node
+
+
+def _metrics(summary: Dict[str, Any]) -> Iterator[Tuple[str, Tuple[str, ...], bool]]:
+    yield from ((".".join(p), p, hib) for p, hib in METRICS)
+    for stage in summary.get("stages_ms", {}):
+        yield f"stages_ms.{stage}.p95", ("stages_ms", stage, "p95"), False
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold_pct: float) -> bool:
+    regressed = False
+    b_sum, n_sum = base["summary"], new["summary"]
+    print(f"{'metric':<28}{'base':>12}{'new':>12}{'change':>10}")
+    for name, path, higher_is_better in _metrics(n_sum):
+        b, n = _get(b_sum, path), _get(n_sum, path)
+        if b is None or n is None:
+            continue
+        change = (n - b) / b * 100 if b else (0.0 if n == b else float("inf"))
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold_pct and not (path == ("failed",) and n == b):
+            flag, regressed = "  REGRESSION", True
+        print(f"{name:<28}{b:>12}{n:>12}{change:>+9.1f}%{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression, percent")
+    args = parser.parse_args()
+
+    base, new = json.loads(args.base.read_text()), json.loads(args.new.read_text())
+    if (base.get("mode"), base.get("params", {}).get("decks")) != (new.get("mode"), new.get("params", {}).get("decks")):
+        print("[compare] warning: runs differ in mode or deck count")
+    sys.exit(1 if compare(base, new, args.threshold) else 0)
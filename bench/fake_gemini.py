@@ -0,0 +1,146 @@
+# bench/fake_gemini.py
+"""
+Local stand-in for the Gemini generateContent endpoint.
+
+Answers with a schema-valid analysis after a configurable latency (lognormal around a median,
+plus a per-page cost) and injects errors at configurable rates: 429, 500, malformed JSON and
+hung requests. Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:<port> (any
+GOOGLE_API_KEY works).
+
+    python -m bench.fake_gemini --port 8765 --median-ms 1500 --per-page-ms 40 --error-429 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+import fitz  # PyMuPDF
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+
+@dataclass
+class FakeProfile:
+    median_ms: float = 1500.0
+    sigma: float = 0.4          # lognormal shape; 0 = fixed latency
+    per_page_ms: float = 40.0
+    error_429: float = 0.0
+    error_500: float = 0.0
+    malformed: float = 0.0
+    hang: float = 0.0           # fraction of requests that stall for hang_s
+    hang_s: float = 600.0
+    seed: Optional[int] = None
+
+
+def _pdf_pages(body: Dict[str, Any]) -> int:
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            inline = part.get("inlineData") or part.get("inline_data")
+            if inline and "pdf" in (inline.get("mimeType") or inline.get("mime_type") or ""):
+                try:
+                    data = base64.urlsafe_b64decode(inline["data"].replace("+", "-").replace("/", "_"))
+                    with fitz.open(stream=data, filetype="pdf") as doc:
+                        return doc.page_count
+                except Exception:
+                    return 1
+    return 1
+
+
+def _analysis(rng: random.Random, pages: int) -> Dict[str, Any]:
+    def items(prefix: str, n: int):
+        return [f"{prefix} {rng.randint(1, 10_000)}" for _ in range(n)]
+
+    return {
+        "one_liner": f"Synthetic startup #{rng.randint(1, 10_000)}",
+        "themes": items("theme", 4),
+        "strengths": items("strength", 5),
+        "risks": items("risk", 5),
+        "questions_by_shark": {s: items(f"{s} question", 3) for s in ("kevin", "mark", "lori", "barbara", "robert")},
+        "evidence": [{"topic": f"topic {i}", "pages": [rng.randint(1, pages)]} for i in range(min(pages, 5))],
+        "meta": {},
+    }
+
+
+def _outcome(rng: random.Random, profile: FakeProfile) -> str:
+    roll = rng.random()
+    for outcome, rate in (("hang", profile.hang), ("429", profile.error_429),
+                          ("500", profile.error_500), ("malformed", profile.malformed)):
+        if roll < rate:
+            return outcome
+        roll -= rate
+    return "ok"
+
+
+def create_app(profile: FakeProfile) -> FastAPI:
+    app = FastAPI(title="fake-gemini")
+    rng = random.Random(profile.seed)
+    stats: Counter = Counter()
+
+    @app.get("/stats")
+    async def get_stats():
+        return {"profile": asdict(profile), "counts": dict(stats)}
+
+    @app.post("/{path:path}")
+    async def generate(path: str, request: Request):
+        if not path.endswith(":generateContent"):
+            return JSONResponse({"error": {"code": 404, "message": f"unsupported: {path}"}}, status_code=404)
+        body = await request.json()
+        pages = await asyncio.to_thread(_pdf_pages, body)
+        stats["requests"] += 1
+
+        outcome = _outcome(rng, profile)
+        stats[outcome] += 1
+        if outcome == "hang":
+            await asyncio.sleep(profile.hang_s)
+        jitter = math.exp(rng.gauss(0, profile.sigma)) if profile.sigma else 1.0
+        await asyncio.sleep((profile.median_ms * jitter + profile.per_page_ms * pages) / 1000)
+
+        if outcome == "429":
+            return JSONResponse({"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}}, status_code=429)
+        if outcome == "500":
+            return JSONResponse({"error": {"code": 500, "message": "Internal error", "status": "INTERNAL"}}, status_code=500)
+        text = json.dumps(_analysis(rng, pages))
+        if outcome == "malformed":
+            text = text[: len(text) // 2]  # truncated output
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": 258 * pages, "candidatesTokenCount": len(text) // 4},
+            "modelVersion": path.split("/")[-1].split(":")[0],
+        }
+
+    @app.get("/health")
+    async def health():
+        return PlainTextResponse("ok")
+
+    return app
+
+
+def profile_args(parser: argparse.ArgumentParser) -> None:
+    """Adds --median-ms, --sigma, ... (shared with bench.run, which forwards them)."""
+    for name, default in asdict(FakeProfile()).items():
+        if name == "seed":
+            parser.add_argument("--seed", type=int, default=None)
+            continue
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default)
+
+
+def profile_from_args(args: argparse.Namespace) -> FakeProfile:
+    return FakeProfile(**{k: getattr(args, k) for k in asdict(FakeProfile())})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    profile_args(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(profile_from_args(args)), host=args.host, port=args.port, log_level="warning")
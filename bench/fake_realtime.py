@@ -0,0 +1,140 @@
+# bench/fake_realtime.py
+"""
+Local stand-in for the Gemini Live realtime model, for measuring shark agent job starts
+without a Google key or network.
+
+Like livekit's Gemini plugin, building the model is cheap and each session connects in the
+background: after a lognormal "handshake" around FAKE_REALTIME_CONNECT_MS (FAKE_REALTIME_SIGMA
+shape, 0 = fixed) it reports connection_acquired through the usual metrics_collected event.
+Replies are never generated; audio and video are dropped. Point the agent at it with
+
+    SHARK_MODEL_FACTORY=bench.fake_realtime:make_model python -m agents.shark_agent dev
+
+or use python -m bench.agent_start, which drives the entrypoint in-process.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import random
+import time
+from typing import List, Literal, Optional
+
+from livekit import rtc
+from livekit.agents import llm
+from livekit.agents.types import NOT_GIVEN, NotGivenOr
+
+CAPABILITIES = llm.RealtimeCapabilities(
+    message_truncation=True,
+    turn_detection=True,
+    user_transcription=True,
+    auto_tool_reply_generation=True,
+    audio_output=True,
+    manual_function_calls=False,
+    mutable_chat_context=True,
+    mutable_instructions=True,
+    mutable_tools=True,
+)
+
+
+class FakeRealtimeModel(llm.RealtimeModel):
+    def __init__(self, *, voice: str, instructions: str, connect_ms: float = 300.0,
+                 sigma: float = 0.3, seed: Optional[int] = None):
+        super().__init__(capabilities=CAPABILITIES)
+        self.voice, self.instructions = voice, instructions
+        self.connect_ms, self.sigma = connect_ms, sigma
+        self._rng = random.Random(seed)
+
+    @property
+    def model(self) -> str:
+        return "fake-realtime"
+
+    @property
+    def provider(self) -> str:
+        return "bench"
+
+    def connect_delay_s(self) -> float:
+        jitter = math.exp(self._rng.gauss(0, self.sigma)) if self.sigma else 1.0
+        return self.connect_ms * jitter / 1000
+
+    def session(self, *, turn_detection_disabled: bool = False) -> "FakeRealtimeSession":
+        return FakeRealtimeSession(self)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeRealtimeSession(llm.RealtimeSession):
+    def __init__(self, model: FakeRealtimeModel):
+        super().__init__(model)
+        self._chat_ctx = llm.ChatContext.empty()
+        self._tools = llm.ToolContext.empty()
+        self.connected = asyncio.Event()
+        self._connect_task = asyncio.create_task(self._connect(model.connect_delay_s()),
+                                                 name="fake-realtime-connect")
+
+    async def _connect(self, delay_s: float) -> None:
+        started = time.perf_counter()
+        await asyncio.sleep(delay_s)
+        self._report_connection_acquired(time.perf_counter() - started)
+        self.connected.set()
+
+    @property
+    def chat_ctx(self) -> llm.ChatContext:
+        return self._chat_ctx.copy()
+
+    @property
+    def tools(self) -> llm.ToolContext:
+        return self._tools.copy()
+
+    async def update_instructions(self, instructions: str) -> None:
+        self._realtime_model.instructions = instructions
+
+    async def update_chat_ctx(self, chat_ctx: llm.ChatContext) -> None:
+        self._chat_ctx = chat_ctx.copy()
+
+    async def update_tools(self, tools: List[llm.Tool]) -> None:
+        self._tools = llm.ToolContext(tools)
+
+    def update_options(self, *, tool_choice: NotGivenOr[Optional[llm.ToolChoice]] = NOT_GIVEN) -> None:
+        pass
+
+    def push_audio(self, frame: rtc.AudioFrame) -> None:
+        pass
+
+    def push_video(self, frame: rtc.VideoFrame) -> None:
+        pass
+
+    def generate_reply(self, *, instructions: NotGivenOr[str] = NOT_GIVEN,
+                       tool_choice: NotGivenOr[llm.ToolChoice] = NOT_GIVEN,
+                       tools: NotGivenOr[List[llm.Tool]] = NOT_GIVEN) -> asyncio.Future:
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        fut.set_exception(llm.RealtimeError("fake realtime model does not generate replies"))
+        return fut
+
+    def commit_audio(self) -> None:
+        pass
+
+    def clear_audio(self) -> None:
+        pass
+
+    def interrupt(self) -> None:
+        pass
+
+    def truncate(self, *, message_id: str, modalities: List[Literal["text", "audio"]],
+                 audio_end_ms: int, audio_transcript: NotGivenOr[str] = NOT_GIVEN) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        self._connect_task.cancel()
+
+
+def make_model(*, voice_name: str, instructions: str) -> FakeRealtimeModel:
+    """SHARK_MODEL_FACTORY entry point; same signature as the agent's default factory."""
+    return FakeRealtimeModel(
+        voice=voice_name,
+        instructions=instructions,
+        connect_ms=float(os.getenv("FAKE_REALTIME_CONNECT_MS", "300")),
+        sigma=float(os.getenv("FAKE_REALTIME_SIGMA", "0.3")),
+    )
@@ -0,0 +1,129 @@
+# bench/import_budget.py
+"""
+Startup/import-time regression check for the API process.
+
+Imports a module (default app.main) in fresh interpreters and fails when
+  - a worker-only module is loaded (PyMuPDF, google-genai, deck_processor, the task module ...),
+  - `import` wall time exceeds --budget-ms (best of --runs),
+  - peak RSS after import exceeds --rss-budget-mb (when given).
+The slowest imports from `-X importtime` are printed to show where the time goes.
+
+    python -m bench.import_budget --out bench/results/import.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Must never be imported by the API process (they're only needed to *run* deck jobs)
+WORKER_ONLY = (
+    "fitz",
+    "pymupdf",
+    "google.genai",
+    "app.background.tasks",
+    "app.background.runtime",
+    "app.services.deck_processor",
+    "app.services.analysis_cache",
+    "app.services.genai_client",
+)
+
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "import_ms": round(elapsed * 1000, 1),
+    "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "modules": sorted(sys.modules),
+}}))
+"""
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("CLERK_SECRET_KEY", "sk_test_import_budget")  # app.security.clerk refuses to import without one
+    env.setdefault("PROMETHEUS_MULTIPROC_DIR", str(ROOT / "data" / "metrics-import-budget"))
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def probe(module: str) -> Dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=ROOT, env=_env(), capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        raise SystemExit(f"[import_budget] importing {module} failed:\n{out.stderr[-3000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int) -> List[Tuple[str, float]]:
+    """Top-level (depth 0/1) imports by cumulative time, from -X importtime."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match and len(match.group(3)) <= 2:
+            rows.append((match.group(4), int(match.group(2)) / 1000))
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    parser.add_argument("--rss-budget-mb", type=float, default=None)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    runs = [probe(args.module) for _ in range(max(1, args.runs))]
+    best = min(runs, key=lambda r: r["import_ms"])
+    loaded = set(best["modules"])
+    leaked = sorted(m for m in WORKER_ONLY if m in loaded)
+
+    print(f"[import_budget] import {args.module}: best {best['import_ms']}ms of {len(runs)} "
+          f"(budget {args.budget_ms:.0f}ms), max RSS {best['max_rss_mb']}MB, {len(loaded)} modules")
+    for name, ms in slowest_imports(args.module, args.top):
+        print(f"[import_budget]   {ms:9.1f}ms  {name}")
+
+    failures = []
+    if leaked:
+        failures.append(f"worker-only modules imported: {', '.join(leaked)}")
+    if best["import_ms"] > args.budget_ms:
+        failures.append(f"import took {best['import_ms']}ms > {args.budget_ms:.0f}ms")
+    if args.rss_budget_mb is not None and best["max_rss_mb"] > args.rss_budget_mb:
+        failures.append(f"max RSS {best['max_rss_mb']}MB > {args.rss_budget_mb:.0f}MB")
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps({
+            "module": args.module,
+            "import_ms": [r["import_ms"] for r in runs],
+            "max_rss_mb": best["max_rss_mb"],
+            "modules": len(loaded),
+            "worker_only_loaded": leaked,
+            "failures": failures,
+        }, indent=2))
+
+    for failure in failures:
+        print(f"[import_budget] FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# bench/incremental.py
+"""
+Incremental re-analysis benchmark: full analysis vs. changed-pages-only for revised decks.
+
+For each deck, a revision with --changed slides rewritten is generated; both versions are
+analyzed in full, then the revision is re-analyzed incrementally on top of the original's
+result (fingerprint match + analyze_pdf_incremental), against a local fake Gemini.
+
+    python -m bench.incremental --decks 6 --pages 20 --changed 3 --median-ms 3000 --per-page-ms 80
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bench.fake_gemini import profile_args, profile_from_args
+from bench.run import ROOT, _free_port, _git_sha, start_fake_gemini
+from bench.stats import summarize
+from bench.synth_pdf import IMAGE_WEIGHTS, DeckSpec, write_decks
+
+
+async def run(pairs: List[Dict[str, Path]], concurrency: int) -> List[Dict[str, Any]]:
+    from app.services.deck_processor import analyze_deck_async, analyze_pdf_incremental
+    from app.services.page_fingerprints import fingerprint_pdf, pick_base
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def timed(coro) -> Dict[str, Any]:
+        started = time.perf_counter()
+        data = await coro
+        return {"ms": round((time.perf_counter() - started) * 1000, 1), "data": data}
+
+    async def one(pair: Dict[str, Path]) -> Dict[str, Any]:
+        async with sem:
+            base = await timed(analyze_deck_async(str(pair["base"])))
+            full = await timed(analyze_deck_async(str(pair["revision"])))
+
+            started = time.perf_counter()
+            old, new = await asyncio.gather(asyncio.to_thread(fingerprint_pdf, str(pair["base"])),
+                                            asyncio.to_thread(fingerprint_pdf, str(pair["revision"])))
+            fingerprint_ms = round((time.perf_counter() - started) * 1000 / 2, 1)
+            match = pick_base(new, [("base", old)])
+            if match is None:
+                return {"deck": pair["revision"].name, "ok": False, "error": "no fingerprint match"}
+            inc = await timed(analyze_pdf_incremental(str(pair["revision"]), base["data"], match[1]))
+
+        meta = inc["data"]["meta"]
+        return {
+            "deck": pair["revision"].name,
+            "ok": True,
+            "pages": meta["pages_count"],
+            "reused_pages": len(meta["incremental"]["reused_pages"]),
+            "fingerprint_ms": fingerprint_ms,
+            "full_ms": full["ms"],
+            "incremental_ms": inc["ms"],
+            "full_model_ms": full["data"]["meta"]["model_ms"],
+            "incremental_model_ms": meta["model_ms"],
+            "est_tokens_saved": meta["incremental"]["est_tokens_saved"],
+        }
+
+    return list(await asyncio.gather(*(one(p) for p in pairs)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decks", type=int, default=6)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--changed", type=int, default=3, help="slides rewritten per revision")
+    parser.add_argument("--images", default="light", choices=sorted(IMAGE_WEIGHTS))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deck-dir", type=Path, default=ROOT / "data" / "bench_decks")
+    parser.add_argument("--out", type=Path, default=None)
+    profile_args(parser)
+    args = parser.parse_args()
+
+    port = _free_port()
+    os.environ.update({"GEMINI_BASE_URL": f"http://127.0.0.1:{port}",
+                       "GOOGLE_API_KEY": os.getenv("BENCH_GOOGLE_API_KEY", "bench-key")})
+
+    seed = int(time.time())
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(args.decks):
+        spec = DeckSpec(pages=args.pages, images=args.images, seed=seed + i)
+        revision = spec.revise(tuple(rng.sample(range(args.pages), min(args.changed, args.pages))))
+        base_path, revision_path = write_decks(args.deck_dir, [spec, revision])
+        pairs.append({"base": base_path, "revision": revision_path})
+
+    profile = profile_from_args(args)
+    fake = start_fake_gemini(profile, port)
+    try:
+        results = asyncio.run(run(pairs, args.concurrency))
+    finally:
+        fake.terminate()
+        fake.wait(10)
+
+    ok = [r for r in results if r["ok"]]
+    summary = {
+        "decks": len(results),
+        "ok": len(ok),
+        **{key: summarize([r[key] for r in ok])
+           for key in ("full_ms", "incremental_ms", "fingerprint_ms", "reused_pages", "est_tokens_saved")},
+    }
+    report = {
+        "label": "incremental",
+        "git_sha": _git_sha(),
+        "params": {"decks": args.decks, "pages": args.pages, "changed": args.changed, "images": args.images,
+                   "fake_gemini": asdict(profile)},
+        "summary": summary,
+        "decks": results,
+    }
+    out = args.out or ROOT / "bench" / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}-incremental.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    full, inc = summary["full_ms"], summary["incremental_ms"]
+    print(f"[bench] {len(ok)}/{len(results)} revisions matched; full p50={full['p50']} p95={full['p95']} ms, "
+          f"incremental p50={inc['p50']} p95={inc['p95']} ms; reused {summary['reused_pages']['mean']} "
+          f"pages/deck, ~{summary['est_tokens_saved']['mean']} tokens saved/deck, "
+          f"fingerprint {summary['fingerprint_ms']['p50']} ms/deck")
+    print(f"[bench] wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+# bench/run.py
+"""
+End-to-end deck pipeline benchmark against a local fake Gemini (bench.fake_gemini).
+
+Modes
+  pipeline  upload_deck (in-process ASGI app, auth overridden to a bench user) -> Celery
+            process_deck in a real worker subprocess -> DeckAnalysis. Needs DATABASE_URL and
+            REDIS_URL pointing at a scratch Postgres/Redis. Stage timings come from the deck
+            events the worker publishes; peak RSS is sampled over the worker process tree.
+  analyzer  analyze_deck_async in this process only (no DB/Redis/Celery): measures
+            preprocessing + the model call layer.
+
+    python -m bench.run --mode analyzer --decks 40 --concurrency 8 --pages 10 40 --images light heavy
+    python -m bench.run --mode pipeline --decks 100 --concurrency 10 --median-ms 3000 --error-429 0.02
+    python -m bench.run --mode pipeline --decks 60 --noisy-share 0.8   # one owner uploads 80% of decks
+    python -m bench.compare bench/results/base.json bench/results/new.json
+
+Results are written as JSON (bench/results/<timestamp>-<mode>.json by default).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench.fake_gemini import FakeProfile, profile_args, profile_from_args
+from bench.stats import peak_rss_mb, summarize, tree_rss_mb
+from bench.synth_pdf import IMAGE_WEIGHTS, deck_mix, write_decks
+
+RESULTS_FORMAT = 1
+ROOT = Path(__file__).resolve().parents[1]
+STAGE_SPANS = (
+    ("queue_wait", "queued", "preprocessing"),
+    ("preprocess", "preprocessing", "model_call"),
+    ("model", "model_call", "persisting"),
+    ("persist", "persisting", "ready"),
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"fake Gemini did not come up on :{port}")
+
+
+def start_fake_gemini(profile: FakeProfile, port: int) -> subprocess.Popen:
+    argv = [sys.executable, "-m", "bench.fake_gemini", "--port", str(port)]
+    for name, value in asdict(profile).items():
+        if value is not None:
+            argv += [f"--{name.replace('_', '-')}", str(value)]
+    proc = subprocess.Popen(argv, cwd=ROOT)
+    _wait_for_port(port)
+    return proc
+
+
+def _git_sha() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+class RssSampler:
+    """Samples the RSS of a process tree in a thread; keeps the peak."""
+
+    def __init__(self, pid: int, interval_s: float = 0.25):
+        self.pid, self.interval_s, self.peak_mb = pid, interval_s, 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, tree_rss_mb(self.pid))
+            self._stop.wait(self.interval_s)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+# ========= analyzer mode =========
+
+async def run_analyzer(paths: List[Path], concurrency: int) -> List[Dict[str, Any]]:
+    from app.services.deck_processor import analyze_deck_async
+    from app.services.storage import DeckBuffer
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(path: Path) -> Dict[str, Any]:
+        async with sem:
+            started = time.perf_counter()
+            try:
+                # Same as the worker: one mapping of the file shared by every reader
+                with DeckBuffer(path) as buf:
+                    data = await analyze_deck_async(str(path), data=buf.data)
+            except Exception as exc:
+                return {"deck": path.name, "ok": False, "error": str(exc)[:300],
+                        "total_ms": round((time.perf_counter() - started) * 1000, 1)}
+            meta = data["meta"]
+            calls = meta.get("calls", {})
+            return {
+                "deck": path.name,
+                "ok": True,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                "stages": {
+                    "preprocess": meta.get("preprocess", {}).get("ms", 0.0),
+                    "model": meta.get("model_ms", 0.0),
+                    "connect": calls.get("connect_ms", 0.0),
+                    "upload": calls.get("upload_ms", 0.0),
+                    "generate": calls.get("generate_ms", 0.0),
+                },
+                "attempts": calls.get("attempts", 1),
+            }
+
+    return list(await asyncio.gather(*(one(p) for p in paths)))
+
+
+# ========= pipeline mode =========
+
+def start_worker(env: Dict[str, str]) -> subprocess.Popen:
+    argv = [sys.executable, "-m", "celery", "-A", "app.core.celery_app.celery_app", "worker",
+            "-Q", "deck,deck_bulk", "-l", "warning", "--pool=threads"]
+    return subprocess.Popen(argv, cwd=ROOT, env=env)
+
+
+def _collect_events(events: Dict[str, Dict[str, float]], stop: threading.Event) -> None:
+    # Keyed by every deckId seen: the worker can report a stage before the upload response lands
+    from app.core.redis import get_redis
+    from app.services.deck_events import CHANNEL
+
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(CHANNEL)
+    try:
+        while not stop.is_set():
+            msg = pubsub.get_message(timeout=0.5)
+            if not msg:
+                continue
+            event = json.loads(msg["data"])
+            events.setdefault(event.get("deckId"), {}).setdefault(event["stage"], event["ts"])
+    finally:
+        pubsub.close()
+
+
+def assign_owners(count: int, noisy_share: float) -> List[Tuple[str, str]]:
+    """(owner id, owner class) per deck: a share goes to one noisy owner, the rest to light owners."""
+    run = uuid.uuid4().hex[:8]
+    noisy = round(count * noisy_share)
+    owners = [(f"bench-{run}-noisy", "noisy")] * noisy
+    owners += [(f"bench-{run}-light{i}", "light") for i in range(count - noisy)]
+    # Noisy uploads go first so the light ones land behind its backlog
+    return owners
+
+
+async def run_pipeline(paths: List[Path], concurrency: int, timeout_s: float,
+                       noisy_share: float = 0.0) -> List[Dict[str, Any]]:
+    import httpx
+    from fastapi import Request
+    from app.main import app
+    from app.security.clerk import get_auth_claims
+
+    def bench_claims(request: Request) -> Dict[str, str]:
+        owner = request.headers["x-bench-owner"]
+        return {"sub": owner, "user_id": owner}
+
+    app.dependency_overrides[get_auth_claims] = bench_claims
+    owners = assign_owners(len(paths), noisy_share)
+
+    events: Dict[str, Dict[str, float]] = {}
+    uploads: Dict[str, Dict[str, Any]] = {}
+    stop = threading.Event()
+    collector = threading.Thread(target=_collect_events, args=(events, stop), daemon=True)
+    collector.start()
+    time.sleep(0.5)  # let the subscription settle
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            sem = asyncio.Semaphore(concurrency)
+
+            async def upload(path: Path, owner: str, owner_class: str) -> None:
+                async with sem:
+                    submitted = time.time()
+                    resp = await client.post(
+                        "/api/decks", files={"file": (path.name, path.read_bytes(), "application/pdf")},
+                        headers={"x-bench-owner": owner},
+                    )
+                    if resp.status_code != 202:
+                        uploads[path.name] = {"deck": path.name, "ok": False, "error": resp.text[:300]}
+                        return
+                    deck_id = resp.json()["deckId"]
+                    uploads[deck_id] = {"deck": path.name, "owner": owner_class, "submitted": submitted,
+                                        "upload_ms": round((time.time() - submitted) * 1000, 1)}
+
+            await asyncio.gather(*(upload(p, *o) for p, o in zip(paths, owners)))
+
+            deadline = time.monotonic() + timeout_s
+            pending = [d for d in uploads if "submitted" in uploads[d]]
+            while pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.5)
+                pending = [d for d in pending if not ({"ready", "failed"} & events.get(d, {}).keys())]
+    finally:
+        stop.set()
+        await app.router.shutdown()
+        app.dependency_overrides.pop(get_auth_claims, None)
+
+    results = []
+    for deck_id, info in uploads.items():
+        if "submitted" not in info:
+            results.append(info)
+            continue
+        stages = events.get(deck_id, {})
+        end = stages.get("ready") or stages.get("failed")
+        results.append({
+            "deck": info["deck"],
+            "deckId": deck_id,
+            "owner": info["owner"],
+            "ok": "ready" in stages,
+            "error": None if "ready" in stages else ("failed" if "failed" in stages else "timeout"),
+            "total_ms": round((end - info["submitted"]) * 1000, 1) if end else None,
+            "stages": {
+                "upload": info["upload_ms"],
+                **{name: round((stages[b] - stages[a]) * 1000, 1)
+                   for name, a, b in STAGE_SPANS if a in stages and b in stages},
+            },
+        })
+    return results
+
+
+# ========= report =========
+
+def summarize_run(results: List[Dict[str, Any]], wall_s: float, peak_mb: float) -> Dict[str, Any]:
+    ok = [r for r in results if r.get("ok")]
+    stage_names = sorted({k for r in ok for k in r.get("stages", {})})
+    return {
+        "decks": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "wall_s": round(wall_s, 2),
+        "decks_per_min": round(len(ok) / wall_s * 60, 2) if wall_s else 0.0,
+        "time_to_ready_ms": summarize([r["total_ms"] for r in ok]),
+        "time_to_ready_ms_by_owner": {
+            cls: summarize([r["total_ms"] for r in ok if r.get("owner") == cls])
+            for cls in sorted({r["owner"] for r in ok if r.get("owner")})
+        },
+        "stages_ms": {name: summarize([r["stages"][name] for r in ok if name in r["stages"]]) for name in stage_names},
+        "peak_rss_mb": peak_mb,
+        "attempts": sum(r.get("attempts", 1) for r in ok),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("pipeline", "analyzer"), default="pipeline")
+    parser.add_argument("--decks", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8, help="uploads (pipeline) / analyses (analyzer) in flight")
+    parser.add_argument("--pages", type=int, nargs="+", default=[12, 40])
+    parser.add_argument("--images", nargs="+", default=["light"], choices=sorted(IMAGE_WEIGHTS))
+    parser.add_argument("--deck-seed", type=int, default=None, help="default: random, so the analysis cache misses")
+    parser.add_argument("--deck-dir", type=Path, default=ROOT / "data" / "bench_decks")
+    parser.add_argument("--timeout-s", type=float, default=900)
+    parser.add_argument("--noisy-share", type=float, default=0.0,
+                        help="pipeline: share of decks uploaded by a single owner, the rest by one owner each")
+    parser.add_argument("--label", default="")
+    parser.add_argument("--out", type=Path, default=None)
+    profile_args(parser)
+    args = parser.parse_args()
+
+    profile = profile_from_args(args)
+    port = _free_port()
+    overrides = {
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{port}",
+        "GOOGLE_API_KEY": os.getenv("BENCH_GOOGLE_API_KEY", "bench-key"),
+    }
+    os.environ.update(overrides)  # before any app.* import reads config
+
+    deck_seed = args.deck_seed if args.deck_seed is not None else int(time.time())
+    specs = deck_mix(args.decks, args.pages, args.images, seed=deck_seed)
+    print(f"[bench] generating {len(specs)} decks in {args.deck_dir}")
+    paths = write_decks(args.deck_dir, specs)
+
+    fake = start_fake_gemini(profile, port)
+    worker = None
+    try:
+        if args.mode == "pipeline":
+            worker = start_worker({**os.environ, **overrides})
+            time.sleep(float(os.getenv("BENCH_WORKER_WARMUP_S", "5")))
+            sampler_pid = worker.pid
+        else:
+            sampler_pid = os.getpid()
+
+        with RssSampler(sampler_pid) as sampler:
+            started = time.perf_counter()
+            if args.mode == "pipeline":
+                results = asyncio.run(run_pipeline(paths, args.concurrency, args.timeout_s, args.noisy_share))
+            else:
+                results = asyncio.run(run_analyzer(paths, args.concurrency))
+            wall_s = time.perf_counter() - started
+        peak = max(sampler.peak_mb, peak_rss_mb() if args.mode == "analyzer" else 0.0)
+    finally:
+        if worker is not None:
+            worker.terminate()
+            worker.wait(30)
+        fake.terminate()
+        fake.wait(10)
+
+    report = {
+        "format": RESULTS_FORMAT,
+        "label": args.label,
+        "mode": args.mode,
+        "git_sha": _git_sha(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {"cpus": os.cpu_count(), "python": sys.version.split()[0]},
+        "params": {
+            "decks": args.decks, "concurrency": args.concurrency, "pages": args.pages,
+            "images": args.images, "deck_seed": deck_seed, "noisy_share": args.noisy_share,
+            "fake_gemini": asdict(profile),
+        },
+        "summary": summarize_run(results, wall_s, peak),
+        "decks": results,
+    }
+    out = args.out or ROOT / "bench" / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}-{args.mode}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    summary = report["summary"]
+    ttr = summary["time_to_ready_ms"]
+    print(f"[bench] {summary['ok']}/{summary['decks']} ok in {summary['wall_s']}s "
+          f"-> {summary['decks_per_min']} decks/min; time-to-ready p50={ttr['p50']} p95={ttr['p95']} "
+          f"p99={ttr['p99']} ms; peak RSS {summary['peak_rss_mb']} MB")
+    for cls, s in summary["time_to_ready_ms_by_owner"].items():
+        print(f"[bench]   {cls} owners: time-to-ready p50={s['p50']} p95={s['p95']} ms")
+    for name, s in summary["stages_ms"].items():
+        print(f"[bench]   {name:<11} p50={s['p50']} p95={s['p95']} mean={s['mean']}")
+    print(f"[bench] wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
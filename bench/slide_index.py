@@ -0,0 +1,62 @@
+# bench/slide_index.py
+"""
+Slide index benchmark: build time (worker), stored size, load time and lookup latency (agent).
+
+    python -m bench.slide_index --pages 8 20 60 --queries 2000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from bench.run import ROOT, _git_sha
+from bench.stats import summarize
+from bench.synth_pdf import WORDS, DeckSpec, make_deck
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[8, 20, 60])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    from app.services.slide_index import SlideIndex, build_slide_index
+
+    rng = random.Random(0)
+    rows = []
+    for pages in args.pages:
+        data = make_deck(DeckSpec(pages=pages, images="light", seed=pages))
+        started = time.perf_counter()
+        index = build_slide_index("", data)
+        build_ms = (time.perf_counter() - started) * 1000
+        blob = index.to_bytes()
+        started = time.perf_counter()
+        SlideIndex.from_bytes(blob)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        lookup_us = []
+        for i in range(args.queries):
+            query, slide = (" ".join(rng.choices(WORDS, k=rng.randint(1, 4))), 0) if i % 4 else ("", rng.randint(1, pages))
+            started = time.perf_counter()
+            index.lookup(query, slide)
+            lookup_us.append((time.perf_counter() - started) * 1e6)
+
+        rows.append({"pages": pages, "build_ms": round(build_ms, 1), "load_ms": round(load_ms, 2),
+                     "stored_bytes": len(blob), "lookup_us": summarize(lookup_us)})
+        lookup = rows[-1]["lookup_us"]
+        print(f"[bench] {pages} pages: build {build_ms:.1f}ms, {len(blob)} bytes stored, load {load_ms:.2f}ms, "
+              f"lookup p50={lookup['p50']} p99={lookup['p99']} us")
+
+    out = args.out or ROOT / "bench" / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}-slide-index.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"label": "slide-index", "git_sha": _git_sha(), "queries": args.queries,
+                               "decks": rows}, indent=2))
+    print(f"[bench] wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench/stats.py
+"""Small helpers shared by the bench scripts: percentiles and peak RSS from /proc."""
+from __future__ import annotations
+
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(ordered)))  # nearest-rank
+    return round(ordered[min(rank, len(ordered)) - 1], 1)
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "n": len(values),
+        "mean": round(sum(values) / len(values), 1) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 1) if values else None,
+    }
+
+
+def _status_kb(pid: int, field: str) -> int:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _children(pid: int) -> List[int]:
+    out: List[int] = []
+    try:
+        for task in Path(f"/proc/{pid}/task").iterdir():
+            text = (task / "children").read_text().split()
+            out.extend(int(c) for c in text)
+    except OSError:
+        pass
+    return out
+
+
+def process_tree(pid: int) -> List[int]:
+    pids, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        pids.append(p)
+        stack.extend(_children(p))
+    return pids
+
+
+def tree_rss_mb(pid: int) -> float:
+    """Current RSS of a process and its descendants (Linux; 0 elsewhere)."""
+    return round(sum(_status_kb(p, "VmRSS") for p in process_tree(pid)) / 1024, 1)
+
+
+def peak_rss_mb(pid: Optional[int] = None) -> float:
+    """High-water-mark RSS of a single process (VmHWM)."""
+    return round(_status_kb(pid or os.getpid(), "VmHWM") / 1024, 1)
@@ -0,0 +1,104 @@
+# bench/synth_pdf.py
+"""
+Synthetic pitch decks for benchmarks (PyMuPDF only).
+
+Each slide gets a title, a few bullet lines and, depending on the image weight, a noise image
+(incompressible, so file size tracks the weight). Same seed -> same bytes.
+
+    python -m bench.synth_pdf out/ --pages 8 20 60 --images none light heavy
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+import fitz  # PyMuPDF
+
+# Noise image edge in pixels per weight, drawn in a 5in box: heavy (240 DPI) triggers downsampling
+IMAGE_WEIGHTS = {"none": 0, "light": 200, "medium": 500, "heavy": 1200}
+
+WORDS = (
+    "market traction revenue growth churn margin runway pipeline customers retention pricing "
+    "platform moat team roadmap unit economics acquisition channel enterprise pilot launch"
+).split()
+
+
+@dataclass(frozen=True)
+class DeckSpec:
+    pages: int
+    images: str = "light"
+    seed: int = 0
+    changed: Tuple[int, ...] = ()  # 0-based slides rewritten in this revision (same deck otherwise)
+
+    @property
+    def name(self) -> str:
+        revision = f"_r{'-'.join(map(str, self.changed))}" if self.changed else ""
+        return f"deck_p{self.pages}_{self.images}_s{self.seed}{revision}.pdf"
+
+    def revise(self, changed: Tuple[int, ...]) -> "DeckSpec":
+        return DeckSpec(self.pages, self.images, self.seed, tuple(sorted(changed)))
+
+
+def _noise_pixmap(rng: random.Random, edge: int) -> fitz.Pixmap:
+    data = rng.randbytes(edge * edge * 3)
+    return fitz.Pixmap(fitz.csRGB, edge, edge, data, False)
+
+
+def make_deck(spec: DeckSpec) -> bytes:
+    rng = random.Random(f"{spec.seed}:{spec.pages}:{spec.images}")
+    edge = IMAGE_WEIGHTS[spec.images]
+    doc = fitz.open()
+    try:
+        for i in range(spec.pages):
+            # Revised slides draw from their own stream; `rng` advances the same either way,
+            # so every other slide of a revision is byte-identical to the original's
+            alt = random.Random(f"{spec.seed}:{i}:revised") if i in spec.changed else None
+            page = doc.new_page(width=960, height=540)  # 16:9 slide
+            title = rng.choices(WORDS, k=3)
+            page.insert_text((48, 64), f"Slide {i + 1}: {' '.join(alt.choices(WORDS, k=3) if alt else title).title()}",
+                             fontsize=28)
+            for line in range(4):
+                words = rng.choices(WORDS, k=8)
+                page.insert_text((64, 130 + line * 34), "- " + " ".join(alt.choices(WORDS, k=8) if alt else words),
+                                 fontsize=16)
+            if edge:
+                pixmap = _noise_pixmap(rng, edge)
+                page.insert_image(fitz.Rect(560, 140, 920, 500), pixmap=_noise_pixmap(alt, edge) if alt else pixmap)
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+
+def write_decks(out_dir: Path, specs: List[DeckSpec]) -> List[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for spec in specs:
+        path = out_dir / spec.name
+        if not path.exists():
+            path.write_bytes(make_deck(spec))
+        paths.append(path)
+    return paths
+
+
+def deck_mix(count: int, pages: List[int], images: List[str], seed: int = 0) -> List[DeckSpec]:
+    """`count` specs cycling through the page/image combinations; every deck has distinct content."""
+    combos = [(p, w) for p in pages for w in images]
+    return [DeckSpec(pages=combos[i % len(combos)][0], images=combos[i % len(combos)][1], seed=seed + i)
+            for i in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--count", type=int, default=0, help="decks to write (default: one per combination)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--images", nargs="+", default=["light"], choices=sorted(IMAGE_WEIGHTS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    specs = deck_mix(args.count or len(args.pages) * len(args.images), args.pages, args.images, args.seed)
+    for path in write_decks(args.out_dir, specs):
+        print(f"{path}  {path.stat().st_size / 1024:.0f} KB")
@@ -0,0 +1,269 @@
+# bench/webhook_replay.py
+"""
+Clerk webhook ingestion benchmark: replays a burst of signed user events against the in-process
+ASGI app (POST /api/webhooks/clerk) and measures ack latency (an ack waits for the event's batch
+to commit), request throughput and how long until everything is applied.
+
+Events come from --events (JSONL of recorded deliveries: {"svix_id": ..., "payload": {...}} or
+bare payloads) or are synthesized: --users sign-ups, some email updates and deletions, shuffled
+locally and with --dup-share of deliveries repeated under the same svix-id (Clerk retries).
+503s (writer queue full, failed write) are retried with backoff, as svix would.
+By default the User table is an in-memory fake with --db-latency-ms per round trip, and the
+final table is checked against the newest event per user; --db real writes through Prisma
+(needs DATABASE_URL). Without REDIS_URL the svix-id dedupe runs process-local.
+
+    python -m bench.webhook_replay --users 2000 --concurrency 64
+    python -m bench.webhook_replay --users 2000 --batch-max 1 --flush-ms 0   # ~ one write per event
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench.run import ROOT, _git_sha
+from bench.stats import summarize
+
+BENCH_SECRET = "whsec_" + base64.b64encode(b"bench-webhook-secret-0123456789ab").decode()
+
+
+# ========= Events =========
+
+def _user_payload(event_type: str, clerk_id: str, email: Optional[str], ts: int) -> Dict[str, Any]:
+    if event_type == "user.deleted":
+        data = {"id": clerk_id, "object": "user", "deleted": True}
+    else:
+        address_id = f"idn_{clerk_id[5:]}"
+        data = {"id": clerk_id, "object": "user", "primary_email_address_id": address_id, "updated_at": ts,
+                "email_addresses": [{"id": address_id, "object": "email_address", "email_address": email}]}
+    return {"object": "event", "type": event_type, "timestamp": ts, "data": data}
+
+
+def synth_events(users: int, update_share: float, delete_share: float, dup_share: float,
+                 rng: random.Random) -> List[Tuple[str, Dict[str, Any]]]:
+    """(svix_id, payload) deliveries of a sign-up burst, roughly in order with local reordering."""
+    events: List[Tuple[int, str, Dict[str, Any]]] = []
+    ts = int(time.time() * 1000)
+    for i in range(users):
+        clerk_id = f"user_{uuid.uuid4().hex[:24]}"
+        ts += rng.randint(1, 20)
+        events.append((ts, clerk_id, _user_payload("user.created", clerk_id, f"founder{i}@example.com", ts)))
+        for n in range(rng.randint(1, 3) if rng.random() < update_share else 0):
+            t = ts + rng.randint(50, 5000)
+            events.append((t, clerk_id, _user_payload("user.updated", clerk_id, f"founder{i}+{n}@example.com", t)))
+        if rng.random() < delete_share:
+            t = ts + rng.randint(6000, 9000)
+            events.append((t, clerk_id, _user_payload("user.deleted", clerk_id, None, t)))
+    events.sort(key=lambda e: e[0] + rng.randint(0, 2000))  # delivery order != event order
+    deliveries = [(f"msg_{uuid.uuid4().hex}", payload) for _, _, payload in events]
+    for delivery in rng.sample(deliveries, int(len(deliveries) * dup_share)):
+        deliveries.insert(rng.randint(0, len(deliveries)), delivery)
+    return deliveries
+
+
+def load_events(path: Path) -> List[Tuple[str, Dict[str, Any]]]:
+    deliveries = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            item = json.loads(line)
+            payload = item.get("payload", item)
+            deliveries.append((item.get("svix_id") or f"msg_{uuid.uuid4().hex}", payload))
+    return deliveries
+
+
+def expected_users(deliveries: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Optional[str]]:
+    """clerkId -> email (None: deleted) according to the newest event per user."""
+    from app.services.clerk_sync import parse_user_event
+
+    newest: Dict[str, Any] = {}
+    for _, payload in deliveries:
+        event = parse_user_event(payload)
+        if event and (event.clerk_id not in newest or event.ts >= newest[event.clerk_id].ts):
+            newest[event.clerk_id] = event
+    return {cid: (None if e.deleted else e.email) for cid, e in newest.items()}
+
+
+# ========= Fake User table =========
+
+class _FakeUserActions:
+    def __init__(self, db: "FakeUserDb", batched: bool):
+        self.db, self.batched = db, batched
+
+    def _run(self, fn):
+        if self.batched:
+            self.db.pending.append(fn)
+            return None
+        return self.db.round_trip([fn])
+
+    def upsert(self, *, where: Dict[str, Any], data: Dict[str, Any]):
+        def apply():
+            self.db.users[where["clerkId"]] = (data["update"] if where["clerkId"] in self.db.users else data["create"])["email"]
+        return self._run(apply)
+
+    def delete_many(self, *, where: Dict[str, Any]):
+        ids = where["clerkId"]["in"] if isinstance(where["clerkId"], dict) else [where["clerkId"]]
+
+        def apply():
+            for cid in ids:
+                self.db.users.pop(cid, None)
+        return self._run(apply)
+
+
+class FakeUserDb:
+    """Enough of the Prisma client for UserEventWriter; every statement or transaction is one round trip."""
+
+    def __init__(self, latency_ms: float):
+        self.latency_s = latency_ms / 1000
+        self.users: Dict[str, str] = {}
+        self.pending: List[Any] = []
+        self.round_trips = 0
+        self.user = _FakeUserActions(self, batched=False)
+
+    async def round_trip(self, fns: List[Any]) -> None:
+        self.round_trips += 1
+        await asyncio.sleep(self.latency_s)
+        for fn in fns:
+            fn()
+
+    @asynccontextmanager
+    async def batch_(self):
+        batcher = type("Batcher", (), {"user": _FakeUserActions(self, batched=True)})()
+        yield batcher
+        fns, self.pending = self.pending, []
+        await self.round_trip(fns)
+
+
+# ========= Replay =========
+
+async def replay(deliveries: List[Tuple[str, Dict[str, Any]]], concurrency: int,
+                 retry_s: float = 0.1, max_retries: int = 8) -> Dict[str, Any]:
+    import httpx
+    from svix.webhooks import Webhook
+
+    from app.main import app
+    from app.services.clerk_sync import user_event_writer
+
+    signer = Webhook(BENCH_SECRET)
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    outcomes: Dict[str, int] = {}
+
+    async def send(client: httpx.AsyncClient, svix_id: str, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, separators=(",", ":"))
+        for attempt in range(1 + max_retries):
+            now = datetime.now(timezone.utc)
+            headers = {"svix-id": svix_id, "svix-timestamp": str(int(now.timestamp())),
+                       "svix-signature": signer.sign(svix_id, now, body), "content-type": "application/json"}
+            async with sem:
+                started = time.perf_counter()
+                response = await client.post("/api/webhooks/clerk", content=body, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code < 500:
+                break
+            await asyncio.sleep(retry_s * random.uniform(0.5, 1.5) * 2 ** attempt)  # svix-style backoff, scaled down
+        if response.status_code == 200:
+            word = response.json()["message"].rsplit(" ", 1)[-1].rstrip(".")  # applied / received / ignored
+            outcomes[word] = outcomes.get(word, 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(send(client, svix_id, payload) for svix_id, payload in deliveries))
+        acked_s = time.perf_counter() - started
+        await user_event_writer.close(timeout_s=600)
+        applied_s = time.perf_counter() - started
+
+    return {
+        "deliveries": len(deliveries),
+        "statuses": statuses,
+        "outcomes": outcomes,
+        "ack_ms": summarize(latencies),
+        "acked_s": round(acked_s, 3),
+        "applied_s": round(applied_s, 3),
+        "requests_per_s": round(len(deliveries) / acked_s, 1),
+        "events_applied_per_s": round(len(deliveries) / applied_s, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=Path, default=None, help="JSONL of recorded deliveries")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--update-share", type=float, default=0.3)
+    parser.add_argument("--delete-share", type=float, default=0.05)
+    parser.add_argument("--dup-share", type=float, default=0.1, help="deliveries repeated with the same svix-id")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--db", choices=("fake", "real"), default="fake")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="fake DB: per round trip")
+    parser.add_argument("--retry-ms", type=float, default=100.0, help="first retry delay after a 503 (doubles)")
+    parser.add_argument("--batch-max", type=int, default=None)
+    parser.add_argument("--flush-ms", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    # Before app.core.config is imported
+    os.environ["CLERK_WEBHOOK_SECRET"] = BENCH_SECRET
+    os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_webhook_replay")
+    if args.batch_max is not None:
+        os.environ["USER_SYNC_BATCH_MAX"] = str(args.batch_max)
+    if args.flush_ms is not None:
+        os.environ["USER_SYNC_FLUSH_MS"] = str(args.flush_ms)
+
+    from app.services.clerk_sync import user_event_writer
+
+    deliveries = load_events(args.events) if args.events else synth_events(
+        args.users, args.update_share, args.delete_share, args.dup_share, random.Random(args.seed))
+
+    fake = FakeUserDb(args.db_latency_ms) if args.db == "fake" else None
+
+    async def run() -> Dict[str, Any]:
+        if fake is not None:
+            user_event_writer.client = fake
+            return await replay(deliveries, args.concurrency, args.retry_ms / 1000)
+        await user_event_writer.client.connect()
+        try:
+            return await replay(deliveries, args.concurrency, args.retry_ms / 1000)
+        finally:
+            await user_event_writer.client.disconnect()
+
+    summary = asyncio.run(run())
+    if fake is not None:
+        expected = {cid: email for cid, email in expected_users(deliveries).items() if email is not None}
+        summary["db_round_trips"] = fake.round_trips
+        summary["final_state_ok"] = fake.users == expected
+
+    report = {
+        "label": "webhook-replay",
+        "git_sha": _git_sha(),
+        "params": {"events": str(args.events) if args.events else None, "users": args.users,
+                   "dup_share": args.dup_share, "concurrency": args.concurrency, "db": args.db,
+                   "db_latency_ms": args.db_latency_ms, "batch_max": user_event_writer.batch_max,
+                   "flush_ms": user_event_writer.flush_s * 1000},
+        "summary": summary,
+    }
+    out = args.out or ROOT / "bench" / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}-webhook-replay.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    ack = summary["ack_ms"]
+    print(f"[bench] {summary['deliveries']} deliveries {summary['statuses']} {summary['outcomes']}: "
+          f"{summary['requests_per_s']} req/s, ack p50={ack['p50']} p99={ack['p99']} ms, all applied after "
+          f"{summary['applied_s']}s" + (f", {summary['db_round_trips']} DB round trips, final state "
+                                        f"{'OK' if summary['final_state_ok'] else 'MISMATCH'}" if fake else ""))
+    print(f"[bench] wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
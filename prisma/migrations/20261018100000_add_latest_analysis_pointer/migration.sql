@@ -0,0 +1,14 @@
+-- AlterTable
+ALTER TABLE "Pitch" ADD COLUMN     "latestAnalysisId" TEXT;
+
+-- CreateIndex
+CREATE INDEX "DeckAnalysis_pitchId_createdAt_idx" ON "DeckAnalysis"("pitchId", "createdAt");
+
+-- Backfill the pointer for decks analyzed before this migration
+UPDATE "Pitch" p
+SET "latestAnalysisId" = (
+    SELECT a."id" FROM "DeckAnalysis" a
+    WHERE a."pitchId" = p."id"
+    ORDER BY a."createdAt" DESC
+    LIMIT 1
+);
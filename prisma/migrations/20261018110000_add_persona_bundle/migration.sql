@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "DeckAnalysis" ADD COLUMN     "personaBundle" JSONB;
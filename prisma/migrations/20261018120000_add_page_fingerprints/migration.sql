@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "Pitch" ADD COLUMN     "pageFingerprints" JSONB;
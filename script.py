@@ -1,17 +1,18 @@
 # view_full_analysis.py
 import asyncio, json
 from prisma import Prisma
+from app.db.queries import get_latest_analysis
 
 PITCH_ID = "cmh51jfcn0000lj340ru0mmtq"  # <-- your pitch id
 
 async def main():
     db = Prisma(); await db.connect()
-    p = await db.deck.find_unique(where={"id": PITCH_ID}, include={"analyses": True})
-    if not p or not p.analyses:
+    latest = await get_latest_analysis(db, PITCH_ID)
+    if not latest:
         print("No analysis found.")
         await db.disconnect(); return
 
-    analysis = sorted(p.analyses, key=lambda a: a.createdAt)[-1].resultJson
+    analysis = latest.resultJson
     print("Meta:", json.dumps(analysis["meta"], indent=2))
     print("\nOne-liner:\n", analysis.get("one_liner", ""))
 
@@ -0,0 +1,94 @@
+# tests/test_analysis_bodies.py
+"""
+Content negotiation and revalidation for GET /api/decks/{id}/analysis: Accept-Encoding parsing
+(q-values, wildcards, server preference) and If-None-Match against the per-encoding ETags, plus
+a store/load round trip of the pre-compressed bodies.
+
+    python -m pytest -q tests/test_analysis_bodies.py
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import tempfile
+
+import pytest
+
+# Before app.core.config is imported
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_analysis_bodies")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="bodies-metrics-"))
+
+from app.services import analysis_bodies  # noqa: E402
+from app.services.analysis_bodies import IDENTITY, choose_encoding, etag_for, etag_matches  # noqa: E402
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # Negotiation only; the server prefers br when brotli is installed
+    monkeypatch.setattr(analysis_bodies, "ENCODINGS", ("br", "gzip"))
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(analysis_bodies, "ENCODINGS", ("gzip",))
+
+
+# ========= choose_encoding =========
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "br"),         # server preference, not the client's q order
+    ("br;q=0, gzip", "gzip"),
+    ("deflate", IDENTITY),
+    ("*", "br"),
+    ("*;q=0", IDENTITY),
+    ("*, br;q=0", "gzip"),                   # an explicit refusal beats the wildcard
+    ("GZIP", "gzip"),
+    ("gzip;q=abc", IDENTITY),                # unparseable q counts as refused
+    ("", IDENTITY),
+    (None, IDENTITY),
+])
+def test_choose_encoding(with_brotli, header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_without_brotli_br_is_never_chosen(gzip_only):
+    assert choose_encoding("br") == IDENTITY
+    assert choose_encoding("br, gzip") == "gzip"
+
+
+# ========= etag_matches =========
+
+def test_etags_differ_per_encoding():
+    assert etag_for("abc") == '"a-abc"'
+    assert len({etag_for("abc", e) for e in (IDENTITY, "gzip", "br")}) == 3
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"a-abc"', True),
+    ('"a-abc-gz"', True),                    # any encoding of the same analysis
+    ('W/"a-abc-br"', True),                  # weak comparison
+    ('"other", "a-abc-gz"', True),
+    ('  *  ', True),
+    ('"a-abd"', False),
+    ('a-abc', False),                        # unquoted isn't an entity tag
+    ("", False),
+    (None, False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, "abc") is expected
+
+
+# ========= Disk store =========
+
+def test_bodies_round_trip_and_are_byte_stable(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_bodies, "ANALYSIS_BODY_DIR", tmp_path)
+    result = {"one_liner": "Café robots", "themes": ["a", "b"], "meta": {"pages_count": 3}}
+    bodies = analysis_bodies.store_bodies("abc123", result)
+
+    assert analysis_bodies.load_body("abc123", IDENTITY) == bodies[IDENTITY]
+    assert json.loads(gzip.decompress(analysis_bodies.load_body("abc123", "gzip"))) == result
+    # jsonb reorders keys on the way back from Postgres; the bytes must not change
+    assert analysis_bodies.serialize(dict(reversed(list(result.items())))) == bodies[IDENTITY]
+    assert analysis_bodies.load_body("missing", IDENTITY) is None
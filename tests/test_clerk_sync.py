@@ -0,0 +1,97 @@
+# tests/test_clerk_sync.py
+"""
+Clerk user event batching: parsing webhook payloads, coalescing a batch per user (newest event
+wins, ties go to the later arrival, events older than what was applied are dropped), and a
+burst through UserEventWriter against bench.webhook_replay's in-memory User table.
+
+    python -m pytest -q tests/test_clerk_sync.py
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+# Before app.core.config is imported
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_clerk_sync")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="clerk-sync-metrics-"))
+
+from app.services.clerk_sync import UserEvent, UserEventWriter, parse_user_event  # noqa: E402
+from bench.webhook_replay import FakeUserDb  # noqa: E402
+
+
+def _upsert(clerk_id: str, email: str, ts: int) -> UserEvent:
+    return UserEvent(clerk_id, email, False, ts)
+
+
+def _delete(clerk_id: str, ts: int) -> UserEvent:
+    return UserEvent(clerk_id, None, True, ts)
+
+
+def _payload(event_type: str, clerk_id: Optional[str] = "user_1", **data: Any) -> Dict[str, Any]:
+    return {"type": event_type, "timestamp": 1700, "data": {"id": clerk_id, **data}}
+
+
+# ========= parse_user_event =========
+
+def test_primary_email_is_used():
+    payload = _payload("user.created", primary_email_address_id="e2", email_addresses=[
+        {"id": "e1", "email_address": "old@example.test"}, {"id": "e2", "email_address": "new@example.test"}])
+    assert parse_user_event(payload) == UserEvent("user_1", "new@example.test", False, 1700)
+
+
+def test_delete_needs_no_email_and_unusable_events_are_skipped():
+    assert parse_user_event(_payload("user.deleted")) == UserEvent("user_1", None, True, 1700)
+    assert parse_user_event(_payload("user.updated", email_addresses=[])) is None   # phone-only
+    assert parse_user_event(_payload("session.created")) is None
+    assert parse_user_event(_payload("user.created", clerk_id=None)) is None
+
+
+# ========= UserEventWriter._coalesce =========
+
+def test_newest_event_per_user_wins():
+    writer = UserEventWriter(client=None)
+    merged = writer._coalesce([
+        _upsert("a", "a1@x.test", 10),
+        _upsert("b", "b1@x.test", 10),
+        _upsert("a", "a2@x.test", 30),
+        _upsert("a", "a-late@x.test", 20),   # arrived last but older
+    ])
+    assert merged == [_upsert("a", "a2@x.test", 30), _upsert("b", "b1@x.test", 10)]
+
+
+def test_ties_go_to_the_later_arrival():
+    writer = UserEventWriter(client=None)
+    assert writer._coalesce([_upsert("a", "first@x.test", 5), _delete("a", 5)]) == [_delete("a", 5)]
+    # Payloads without a timestamp (ts=0) fall back to arrival order
+    assert writer._coalesce([_upsert("a", "x@x.test", 0), _upsert("a", "y@x.test", 0)]) == [_upsert("a", "y@x.test", 0)]
+
+
+def test_events_older_than_what_was_applied_are_dropped():
+    writer = UserEventWriter(client=None)
+    writer._mark_applied(_upsert("a", "applied@x.test", 50))
+    merged = writer._coalesce([_upsert("a", "retry@x.test", 40), _upsert("b", "b@x.test", 1), _delete("a", 50)])
+    assert merged == [_upsert("b", "b@x.test", 1), _delete("a", 50)]
+    assert writer._coalesce([_upsert("a", "retry@x.test", 49)]) == []
+    assert writer._coalesce([_upsert("a", "no-ts@x.test", 0)]) == [_upsert("a", "no-ts@x.test", 0)]
+
+
+# ========= UserEventWriter =========
+
+def test_burst_is_applied_in_one_transaction():
+    async def run():
+        db = FakeUserDb(latency_ms=1)
+        writer = UserEventWriter(db, batch_max=100, flush_ms=20)
+        events = [_upsert("a", "a1@x.test", 1), _upsert("b", "b@x.test", 1), _upsert("a", "a2@x.test", 2),
+                  _delete("c", 3), _upsert("c", "c-old@x.test", 2)]
+        db.users["c"] = "c@x.test"
+        acks = [writer.submit(event) for event in events]
+        results = await asyncio.gather(*acks)
+        await writer.close()
+        return db, results
+
+    db, results = asyncio.run(run())
+    assert results == [True] * 5  # superseded events are acknowledged with the one that won
+    assert db.users == {"a": "a2@x.test", "b": "b@x.test"}
+    assert db.round_trips == 1
@@ -0,0 +1,204 @@
+# tests/test_jwks.py
+"""
+LocalVerifier against a locally generated RSA key and a stub JWKS fetch, plus the Clerk SDK
+fallback in get_auth_claims when the key set can't be fetched.
+
+    python -m pytest -q tests/test_jwks.py
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+# Before app.core.config is imported (app.security.clerk refuses to load without a secret)
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_jwks")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="jwks-metrics-"))
+
+from app.security.jwks import ClaimsCache, JWKSCache, JWKSUnavailable, LocalVerifier  # noqa: E402
+
+ISSUER = "https://clerk.example.test"
+AZP = "http://localhost:3000"
+
+
+def _key_pair(kid: str):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private.public_key()))
+    jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return private, jwk
+
+
+class StubJWKS:
+    """fetch() for JWKSCache: serves whatever keys the test put in, counts calls, can fail."""
+
+    def __init__(self, *jwks: Dict[str, Any]):
+        self.keys: List[Dict[str, Any]] = list(jwks)
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self) -> Dict[str, Any]:
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("jwks endpoint down")
+        return {"keys": list(self.keys)}
+
+
+def _token(private, kid: str, **overrides: Any) -> str:
+    now = int(time.time())
+    claims = {"sub": "user_123", "iat": now, "exp": now + 60, "iss": ISSUER, "azp": AZP}
+    claims.update(overrides)
+    return jwt.encode(claims, private, algorithm="RS256", headers={"kid": kid})
+
+
+def _verifier(stub: StubJWKS, **kwargs: Any) -> LocalVerifier:
+    return LocalVerifier(
+        JWKSCache(stub, min_refresh_interval_s=kwargs.pop("min_refresh_interval_s", 0)),
+        authorized_parties=[AZP], issuer=ISSUER, leeway_s=0, claims_cache=ClaimsCache(), **kwargs,
+    )
+
+
+@pytest.fixture(scope="module")
+def key_a():
+    return _key_pair("kid-a")
+
+
+# ========= LocalVerifier =========
+
+def test_valid_token_is_verified_once_then_cached(key_a):
+    private, jwk = key_a
+    stub = StubJWKS(jwk)
+    verifier = _verifier(stub)
+    token = _token(private, "kid-a")
+
+    claims = verifier.verify(token)
+    assert claims["sub"] == "user_123"
+    assert claims["user_id"] == "user_123"
+    assert stub.calls == 1  # unknown kid on the first request -> one fetch
+
+    assert verifier.cached(token) is claims
+    assert verifier.verify(token) is claims
+    assert stub.calls == 1
+
+
+def test_expired_token_is_rejected(key_a):
+    private, jwk = key_a
+    verifier = _verifier(StubJWKS(jwk))
+    now = int(time.time())
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(_token(private, "kid-a", iat=now - 120, exp=now - 60))
+
+
+def test_wrong_authorized_party_is_rejected(key_a):
+    private, jwk = key_a
+    verifier = _verifier(StubJWKS(jwk))
+    token = _token(private, "kid-a", azp="https://evil.example.test")
+    with pytest.raises(jwt.InvalidTokenError, match="authorized party"):
+        verifier.verify(token)
+    assert verifier.cached(token) is None
+
+
+def test_wrong_issuer_is_rejected(key_a):
+    private, jwk = key_a
+    verifier = _verifier(StubJWKS(jwk))
+    with pytest.raises(jwt.InvalidIssuerError):
+        verifier.verify(_token(private, "kid-a", iss="https://other-instance.example.test"))
+
+
+def test_unknown_kid_is_rejected_after_one_refresh(key_a):
+    private, jwk = key_a
+    stub = StubJWKS(jwk)
+    verifier = _verifier(stub)
+    verifier.jwks.refresh()
+    with pytest.raises(jwt.InvalidTokenError, match="Signing key not found"):
+        verifier.verify(_token(private, "kid-unknown"))
+    assert stub.calls == 2  # the unknown kid forced a refresh, which didn't have it either
+
+
+def test_signature_from_another_key_is_rejected(key_a):
+    _, jwk = key_a
+    impostor, _ = _key_pair("kid-a")
+    verifier = _verifier(StubJWKS(jwk))
+    with pytest.raises(jwt.InvalidSignatureError):
+        verifier.verify(_token(impostor, "kid-a"))
+
+
+def test_rotated_key_is_picked_up(key_a):
+    private_a, jwk_a = key_a
+    private_b, jwk_b = _key_pair("kid-b")
+    stub = StubJWKS(jwk_a)
+    verifier = _verifier(stub)
+    verifier.verify(_token(private_a, "kid-a"))
+
+    stub.keys = [jwk_b]  # rotation: kid-a retired
+    assert verifier.verify(_token(private_b, "kid-b"))["sub"] == "user_123"
+    assert not verifier.jwks.has_key("kid-a")
+
+
+def test_unreachable_jwks_raises_unavailable(key_a):
+    private, _ = key_a
+    stub = StubJWKS()
+    stub.fail = True
+    verifier = _verifier(stub)
+    with pytest.raises(JWKSUnavailable):
+        verifier.verify(_token(private, "kid-a"))
+
+
+# ========= get_auth_claims: Clerk SDK fallback =========
+
+def _request(token: str):
+    from starlette.requests import Request
+
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+def _credentials(token: str):
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_falls_back_to_clerk_sdk_when_jwks_unavailable(key_a, monkeypatch):
+    from app.security import clerk
+
+    private, _ = key_a
+    stub = StubJWKS()
+    stub.fail = True
+    sdk_calls = []
+
+    def fake_sdk(request, auth):
+        sdk_calls.append(auth.credentials)
+        return {"sub": "user_123", "user_id": "user_123"}
+
+    monkeypatch.setattr(clerk, "CLERK_LOCAL_VERIFY", True)
+    monkeypatch.setattr(clerk, "local_verifier", _verifier(stub))
+    monkeypatch.setattr(clerk, "_authenticate_with_clerk", fake_sdk)
+
+    token = _token(private, "kid-a")
+    claims = asyncio.run(clerk.get_auth_claims(_request(token), _credentials(token)))
+    assert claims["sub"] == "user_123"
+    assert sdk_calls == [token]
+
+
+def test_invalid_token_is_not_retried_with_clerk_sdk(key_a, monkeypatch):
+    from fastapi import HTTPException
+
+    from app.security import clerk
+
+    private, jwk = key_a
+    monkeypatch.setattr(clerk, "CLERK_LOCAL_VERIFY", True)
+    monkeypatch.setattr(clerk, "local_verifier", _verifier(StubJWKS(jwk)))
+    monkeypatch.setattr(clerk, "_authenticate_with_clerk", lambda *a: pytest.fail("SDK called for a bad token"))
+
+    token = _token(private, "kid-a", iss="https://other-instance.example.test")
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(clerk.get_auth_claims(_request(token), _credentials(token)))
+    assert err.value.status_code == 401
@@ -0,0 +1,79 @@
+# tests/test_merge_analyses.py
+"""
+The map-reduce merge for batched deck analysis: round-robin interleaving with case/punctuation
+dedupe, per-field limits, and evidence pages shifted from batch-local to deck page numbers.
+
+    python -m pytest -q tests/test_merge_analyses.py
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Any, Dict
+
+# Before app.core.config is imported
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_merge")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="merge-metrics-"))
+
+from app.services.deck_processor import MERGE_LIMITS, _interleave_unique, merge_analyses  # noqa: E402
+
+
+def _partial(**fields: Any) -> Dict[str, Any]:
+    base: Dict[str, Any] = {"one_liner": "", "themes": [], "strengths": [], "risks": [],
+                            "questions_by_shark": {}, "evidence": []}
+    base.update(fields)
+    return base
+
+
+# ========= _interleave_unique =========
+
+def test_interleave_round_robins_across_batches():
+    assert _interleave_unique([["a1", "a2", "a3"], ["b1"], ["c1", "c2"]], 10) == ["a1", "b1", "c1", "a2", "c2", "a3"]
+
+
+def test_interleave_drops_case_and_punctuation_variants():
+    merged = _interleave_unique([["Strong team!", "Big market"], ["strong   TEAM", "big market."]], 10)
+    assert merged == ["Strong team!", "Big market"]  # the first spelling wins
+
+
+def test_interleave_skips_blank_items_and_stops_at_limit():
+    assert _interleave_unique([["", "  ", "x"], ["!!", "y", "z"]], 2) == ["y", "x"]
+    assert _interleave_unique([], 5) == []
+
+
+# ========= merge_analyses =========
+
+def test_evidence_pages_are_shifted_to_deck_numbers():
+    parts = [
+        (10, _partial(evidence=[{"topic": "Traction", "pages": [1, 3]}])),
+        (0, _partial(evidence=[{"topic": "traction", "pages": [2]}, {"topic": "Team", "pages": [10]}])),
+    ]
+    merged = merge_analyses(parts, pages_count=20)
+    assert merged["evidence"] == [
+        {"topic": "traction", "pages": [2, 11, 13]},  # batches merge by normalized topic, in page order
+        {"topic": "Team", "pages": [10]},
+    ]
+
+
+def test_out_of_range_and_blank_evidence_is_dropped():
+    parts = [(5, _partial(evidence=[{"topic": "Market", "pages": [-6, 1, 4]}, {"topic": " ", "pages": [1]}]))]
+    assert merge_analyses(parts, pages_count=8)["evidence"] == [{"topic": "Market", "pages": [6]}]  # -1 and 9 are off the deck
+
+
+def test_one_liner_comes_from_the_first_batch_that_has_one():
+    parts = [(8, _partial(one_liner="Later batch")), (4, _partial(one_liner="  Middle  ")), (0, _partial())]
+    assert merge_analyses(parts, pages_count=12)["one_liner"] == "Middle"
+
+
+def test_lists_are_interleaved_and_capped():
+    parts = [(i * 4, _partial(themes=[f"theme {i}-{j}" for j in range(5)],
+                              questions_by_shark={"kevin": [f"q{i}-{j}" for j in range(8)]}))
+             for i in range(3)]
+    merged = merge_analyses(parts, pages_count=12)
+
+    assert merged["themes"][:3] == ["theme 0-0", "theme 1-0", "theme 2-0"]
+    assert len(merged["themes"]) == MERGE_LIMITS["themes"]
+    assert len(merged["questions_by_shark"]["kevin"]) == MERGE_LIMITS["questions"]
+    assert merged["questions_by_shark"]["mark"] == []
+    assert set(merged["questions_by_shark"]) == {"kevin", "mark", "lori", "barbara", "robert"}
+    assert merged["meta"] == {}
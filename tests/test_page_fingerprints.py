@@ -0,0 +1,84 @@
+# tests/test_page_fingerprints.py
+"""
+Page matching for incremental re-analysis: text hashes must be equal, render hashes within
+max_distance bits, each old page used once, and the base deck is the candidate with the most
+unchanged pages above the min_match share.
+
+    python -m pytest -q tests/test_page_fingerprints.py
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Dict, List
+
+# Before app.core.config is imported
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_fingerprints")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="fingerprints-metrics-"))
+
+from app.services.page_fingerprints import fingerprint_pdf, match_pages, pick_base  # noqa: E402
+from bench.synth_pdf import DeckSpec, make_deck  # noqa: E402
+
+
+def _fp(text: str, render: int = 0) -> Dict[str, str]:
+    return {"t": text, "i": f"{render:016x}"}
+
+
+def _deck(*texts: str) -> List[Dict[str, str]]:
+    return [_fp(t) for t in texts]
+
+
+# ========= match_pages =========
+
+def test_unchanged_pages_match_across_inserts_and_reorders():
+    old = _deck("cover", "problem", "market", "team")
+    new = _deck("cover", "new slide", "team", "problem")
+    assert match_pages(new, old, max_distance=4) == {0: 0, 2: 3, 3: 1}
+
+
+def test_render_distance_threshold():
+    old = [_fp("chart", 0)]
+    assert match_pages([_fp("chart", 0b1111)], old, max_distance=4) == {0: 0}    # 4 bits: re-export noise
+    assert match_pages([_fp("chart", 0b11111)], old, max_distance=4) == {}       # 5 bits: a changed chart
+    assert match_pages([_fp("other text", 0)], old, max_distance=4) == {}
+
+
+def test_duplicated_slides_pair_up_in_order():
+    old = _deck("divider", "a", "divider", "b", "divider")
+    new = _deck("divider", "a", "divider", "b", "divider")
+    assert match_pages(new, old, max_distance=4) == {i: i for i in range(5)}
+
+
+def test_each_old_page_is_used_once():
+    assert match_pages(_deck("thanks", "thanks"), _deck("thanks"), max_distance=4) == {0: 0}
+
+
+def test_closest_render_wins_over_closest_position():
+    old = [_fp("logo", 0b111), _fp("logo", 0)]
+    assert match_pages([_fp("logo", 0)], old, max_distance=4) == {0: 1}
+
+
+# ========= pick_base =========
+
+def test_pick_base_prefers_the_most_unchanged_pages():
+    new = _deck("a", "b", "c", "d", "e")
+    candidates = [("v1", _deck("a", "b", "c", "x", "y")), ("v2", _deck("a", "b", "c", "d", "y")), ("empty", [])]
+    base, mapping = pick_base(new, candidates, min_match=0.6)
+    assert base == "v2"
+    assert mapping == {0: 0, 1: 1, 2: 2, 3: 3}
+
+
+def test_pick_base_requires_min_match():
+    new = _deck("a", "b", "c", "d", "e")
+    assert pick_base(new, [("v1", _deck("a", "b", "x", "y", "z"))], min_match=0.6) is None
+    assert pick_base([], [("v1", _deck("a"))], min_match=0.0) is None
+
+
+# ========= fingerprint_pdf =========
+
+def test_revised_pdf_matches_its_unchanged_pages():
+    spec = DeckSpec(pages=6, images="light", seed=3)
+    old = fingerprint_pdf("", data=make_deck(spec))
+    new = fingerprint_pdf("", data=make_deck(spec.revise((1, 4))))
+    assert len(old) == len(new) == 6
+    assert match_pages(new, old, max_distance=4) == {0: 0, 2: 2, 3: 3, 5: 5}
@@ -0,0 +1,99 @@
+# tests/test_slide_index.py
+"""
+The boardroom agent's slide index: tokenization (money/percent/multiples as one token, stopwords,
+plural folding), BM25 ranking, snippets and the deck_lookup answers, and the stored blob format.
+
+    python -m pytest -q tests/test_slide_index.py
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import zlib
+
+# Before app.core.config is imported
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_slide_index")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="slide-index-metrics-"))
+
+from app.services.slide_index import SNIPPET_CHARS, SlideIndex, tokenize  # noqa: E402
+
+PAGES = [
+    "Acme Robotics\nWarehouse picking robots for mid-size retailers",
+    "Traction\nRevenue grew 40% to $2.5m ARR\n120 customers, net retention 3x",
+    "Team\nFounders from Kiva and Amazon Robotics",
+    "",
+    "Competition\nLocus, Fetch and other robots\nOur robots pick 3x faster",
+]
+
+
+# ========= tokenize =========
+
+def test_money_percent_and_multiples_stay_whole():
+    assert tokenize("Revenue grew 40% to $2.5m, 3x faster; 1,200 units") == [
+        "revenue", "grew", "40%", "$2.5m", "3x", "faster", "1,200", "unit"]
+
+
+def test_stopwords_and_deck_words_are_dropped():
+    assert tokenize("What does the deck say about the team?") == ["team"]
+
+
+def test_plurals_fold_but_not_double_s():
+    assert tokenize("Customers business robots bus") == ["customer", "business", "robot", "bus"]
+
+
+# ========= SlideIndex.search =========
+
+def test_search_ranks_the_page_with_the_terms_first():
+    index = SlideIndex.from_pages(PAGES)
+    hits = index.search("how many customers", k=3)
+    assert [number for number, _, _ in hits] == [2]
+    number, score, snippet = hits[0]
+    assert score > 0
+    assert "120 customers" in snippet
+
+
+def test_rarer_terms_weigh_more():
+    index = SlideIndex.from_pages(PAGES)
+    # "robots" is on three pages, "Kiva" only on the team slide
+    assert index.search("robots kiva", k=1)[0][0] == 3
+
+
+def test_ties_break_by_page_number_and_k_caps_results():
+    index = SlideIndex.from_pages(["alpha", "alpha", "alpha"])
+    assert [n for n, _, _ in index.search("alpha", k=2)] == [1, 2]
+
+
+def test_search_without_known_terms_is_empty():
+    index = SlideIndex.from_pages(PAGES)
+    assert index.search("the of and") == []
+    assert index.search("blockchain") == []
+
+
+def test_snippet_keeps_the_line_above_the_best_match_and_is_capped():
+    index = SlideIndex.from_pages(PAGES)
+    assert index.snippet(5, set(tokenize("faster"))) == "Locus, Fetch and other robots\nOur robots pick 3x faster"
+    long_page = SlideIndex.from_pages(["title\n" + "word " * 200])
+    assert len(long_page.snippet(1, {"word"})) <= SNIPPET_CHARS
+
+
+# ========= lookup / serialization =========
+
+def test_lookup_by_slide_number_and_query():
+    index = SlideIndex.from_pages(PAGES)
+    assert index.lookup(slide=3).startswith("Slide 3: Team")
+    assert index.lookup(slide=4) == "Slide 4: (no text on this slide)"
+    assert index.lookup(slide=9) == "The deck has 5 slides; there is no slide 9."
+    assert index.lookup("kiva").startswith("Slide 3: ")
+    assert index.lookup("blockchain") == "Nothing in the deck matches that."
+
+
+def test_round_trip_through_bytes():
+    index = SlideIndex.from_pages(PAGES)
+    restored = SlideIndex.from_bytes(index.to_bytes())
+    assert restored is not None
+    assert restored.search("customers") == index.search("customers")
+
+
+def test_other_versions_and_garbage_are_rejected():
+    assert SlideIndex.from_bytes(b"not zlib") is None
+    assert SlideIndex.from_bytes(zlib.compress(b'{"v": 999, "pages": [], "len": [], "post": {}}')) is None
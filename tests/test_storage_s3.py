@@ -0,0 +1,96 @@
+# tests/test_storage_s3.py
+"""
+S3Storage round trip against moto's in-process S3: save_upload -> open_deck from a cold cache ->
+delete. Skipped when boto3 or moto isn't installed (neither is a runtime requirement).
+
+    python -m pytest -q tests/test_storage_s3.py
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+# Before app.core.config is imported
+os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_storage")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="storage-metrics-"))
+
+from app.services import storage  # noqa: E402
+from app.services.storage import S3_SCHEME, S3Storage  # noqa: E402
+from bench.synth_pdf import DeckSpec, make_deck  # noqa: E402
+
+BUCKET = "decks-test"
+REGION = "us-east-1"
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    # moto intercepts botocore; fake credentials so nothing reaches a real account
+    for name, value in (("AWS_ACCESS_KEY_ID", "testing"), ("AWS_SECRET_ACCESS_KEY", "testing"),
+                        ("AWS_SESSION_TOKEN", "testing"), ("AWS_DEFAULT_REGION", REGION)):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        boto3.client("s3", region_name=REGION).create_bucket(Bucket=BUCKET)
+        backend = S3Storage(bucket=BUCKET, prefix="decks", endpoint_url=None, region=REGION,
+                            cache_dir=tmp_path / "s3_cache")
+        monkeypatch.setattr(storage, "_backend", backend)  # what get_storage() returns
+        monkeypatch.setattr(storage, "STAGING_DIR", tmp_path / "staging")
+        yield backend
+
+
+@pytest.fixture(scope="module")
+def pdf() -> bytes:
+    return make_deck(DeckSpec(pages=3, images="light", seed=7))
+
+
+# ========= S3Storage =========
+
+def test_save_then_open_deck_from_cold_cache(s3, pdf):
+    key = storage.save_upload(pdf, "deck.pdf")
+    assert key.startswith(f"{S3_SCHEME}{BUCKET}/decks/")
+
+    sha256 = key.rsplit("/", 1)[1][:-len(".pdf")]
+    head = s3.client.head_object(Bucket=BUCKET, Key=s3._object_key(sha256))
+    assert head["ContentLength"] == len(pdf)
+    assert head["ContentType"] == "application/pdf"
+
+    # Another host: nothing cached locally, so open_deck has to download it
+    cached = storage.deck_local_path(key)
+    cached.unlink()
+    with storage.open_deck(key) as buf:
+        assert bytes(buf.data) == pdf
+        assert buf.sha256() == sha256
+    assert cached.exists()
+    assert not list(cached.parent.glob("*.tmp"))
+
+
+def test_identical_upload_is_stored_once(s3, pdf):
+    first = storage.save_upload(pdf, "a.pdf")
+    second = storage.save_upload(pdf, "b.pdf")
+    assert first == second
+    listing = s3.client.list_objects_v2(Bucket=BUCKET, Prefix="decks/")
+    assert listing["KeyCount"] == 1
+    assert not list(storage.STAGING_DIR.glob("*.pdf"))  # the duplicate's staged copy is dropped
+
+
+def test_deleted_object_is_not_served_from_a_cold_cache(s3, pdf):
+    from botocore.exceptions import ClientError
+
+    key = storage.save_upload(pdf, "deck.pdf")
+    object_key = key[len(f"{S3_SCHEME}{BUCKET}/"):]
+    s3.client.delete_object(Bucket=BUCKET, Key=object_key)
+    assert s3.client.list_objects_v2(Bucket=BUCKET, Prefix="decks/")["KeyCount"] == 0
+
+    storage.deck_local_path(key).unlink()
+    with pytest.raises(ClientError):
+        storage.open_deck(key)
+    assert not list(s3.cache_dir.rglob("*.tmp"))  # the failed download left nothing behind
+
+
+def test_missing_bucket_config_is_rejected():
+    with pytest.raises(RuntimeError, match="S3_BUCKET"):
+        S3Storage(bucket="", region=REGION)